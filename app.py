@@ -1,50 +1,364 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional
 from flask import Flask, render_template, request, jsonify
 from src.lexer import Lexer
 from src.parser import Parser
-from src.codegen import CodeGenerator
+from src.optimizer import optimize_program
+from src.cache import LRUCache
+from src.interpreter import Interpreter, OutputBuffer, VoltRuntimeError
+from src.fragments import FRAGMENT_CACHE_BYTES
+from src.incremental import EditSession
+from src.service import COMPILE_TARGETS, compile_source
 
 app = Flask(__name__)
+app.config['COMPILE_CACHE_SIZE'] = int(os.environ.get('VOLT_COMPILE_CACHE_SIZE', 512))
+app.config['COMPILE_CACHE_TTL'] = float(os.environ.get('VOLT_COMPILE_CACHE_TTL', 3600))
+app.config['RUN_MAX_ITERATIONS'] = int(os.environ.get('VOLT_RUN_MAX_ITERATIONS', 1000000))
+app.config['RUN_MAX_OUTPUT'] = int(os.environ.get('VOLT_RUN_MAX_OUTPUT', 1 << 20))
+app.config['RUN_MAX_STRING'] = int(os.environ.get('VOLT_RUN_MAX_STRING', 1 << 20))
+app.config['RUN_TIME_LIMIT'] = float(os.environ.get('VOLT_RUN_TIME_LIMIT', 5))
+app.config['SESSION_COUNT'] = int(os.environ.get('VOLT_SESSION_COUNT', 256))
+app.config['SESSION_TTL'] = float(os.environ.get('VOLT_SESSION_TTL', 1800))
+app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('VOLT_FRAGMENT_CACHE_SIZE', 65536))
+app.config['FRAGMENT_CACHE_BYTES'] = int(os.environ.get('VOLT_FRAGMENT_CACHE_BYTES', FRAGMENT_CACHE_BYTES))
+app.config['BATCH_MAX_PROGRAMS'] = int(os.environ.get('VOLT_BATCH_MAX_PROGRAMS', 100))
+app.config['BATCH_MAX_BYTES'] = int(os.environ.get('VOLT_BATCH_MAX_BYTES', 4 << 20))
+app.config['BATCH_WORKERS'] = int(os.environ.get('VOLT_BATCH_WORKERS', os.cpu_count() or 1))
+
+# Serialized /compile responses keyed by the optimization level, the target
+# and a hash of the source. Compilation is deterministic, so errors are
+# cached along with successful results.
+compile_cache = LRUCache(app.config['COMPILE_CACHE_SIZE'], app.config['COMPILE_CACHE_TTL'])
+
+# Editor sessions by id. An evicted or expired session is recreated by the
+# client from its full buffer.
+sessions = LRUCache(app.config['SESSION_COUNT'], app.config['SESSION_TTL'])
+
+# Generated C++ per top-level statement, keyed by its text, so a program
+# that differs from earlier ones in a few statements only parses those.
+fragment_cache = LRUCache(app.config['FRAGMENT_CACHE_SIZE'], max_bytes=app.config['FRAGMENT_CACHE_BYTES'])
+
+# Worker processes for /compile/batch, started by the first batch that
+# needs more than one and replaced when a worker dies.
+batch_pool: Optional[ProcessPoolExecutor] = None
+batch_pool_lock = threading.Lock()
+
+def get_batch_pool() -> ProcessPoolExecutor:
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is None:
+            batch_pool = ProcessPoolExecutor(max_workers=app.config['BATCH_WORKERS'])
+        return batch_pool
+
+def discard_batch_pool(pool: ProcessPoolExecutor):
+    # Called with a pool that has broken; the next batch starts a new one.
+    # Other batches may have seen the same pool break and replaced it already.
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is pool:
+            batch_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def request_error(source_code: str, target: str) -> Optional[str]:
+    if not source_code.strip():
+        return 'No code provided'
+    if target not in COMPILE_TARGETS:
+        return f"Unknown target '{target}' (expected one of: {', '.join(COMPILE_TARGETS)})"
+    return None
+
 @app.route('/compile', methods=['POST'])
 def compile_code():
     try:
         data = request.get_json()
         source_code = data.get('code', '')
+        opt_level = int(data.get('optimize') or 0)
+        target = data.get('target') or 'cpp'
         
-        if not source_code.strip():
+        error = request_error(source_code, target)
+        if error is not None:
             return jsonify({
                 'success': False,
-                'error': 'No code provided'
+                'error': error
             })
         
-        lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
+        # Profiled compiles are always run, and their timings never cached.
+        if data.get('profile'):
+            response = compile_source(source_code, opt_level, target, fragment_cache, profile=True)
+            return jsonify(response)
         
-        parser = Parser(tokens)
-        ast = parser.parse()
+        key = (opt_level, target, hashlib.sha256(source_code.encode()).hexdigest())
+        body = compile_cache.get(key)
+        if body is None:
+            body = json.dumps(compile_source(source_code, opt_level, target, fragment_cache))
+            compile_cache.put(key, body)
         
-        codegen = CodeGenerator()
-        cpp_code = codegen.generate(ast)
+        return app.response_class(body, mimetype='application/json')
         
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'cpp_code': cpp_code
+            'success': False,
+            'error': f'Error: {str(e)}'
         })
+
+def parse_batch(data: bytes, ndjson: bool) -> list:
+    # A JSON array of programs, {"programs": [...]}, or one program per line
+    # of NDJSON. A program is a /compile body or just its source.
+    if ndjson:
+        programs = [json.loads(line) for line in data.splitlines() if line.strip()]
+    else:
+        programs = json.loads(data)
+        if isinstance(programs, dict):
+            programs = programs.get('programs')
+    if not isinstance(programs, list):
+        raise ValueError("expected an array of programs")
+    return [{'code': program} if isinstance(program, str) else program for program in programs]
+
+def batch_line(index: int, body: str) -> str:
+    return f'{{"index": {index}, {body[1:]}\n'
+
+def compile_batch(programs: List[dict]) -> Iterator[str]:
+    # One NDJSON line per program, tagged with its index, in the order they
+    # finish. Cached responses come first; identical programs are compiled
+    # once; the rest are spread over the batch pool. A program whose worker
+    # dies gets an error line like any other failure.
+    jobs = {}
+    for index, data in enumerate(programs):
+        try:
+            source_code = data.get('code', '')
+            opt_level = int(data.get('optimize') or 0)
+            target = data.get('target') or 'cpp'
+            error = request_error(source_code, target)
+        except Exception as e:
+            error = f'Error: {str(e)}'
+        if error is not None:
+            yield batch_line(index, json.dumps({'success': False, 'error': error}))
+            continue
         
-    except SyntaxError as e:
+        key = (opt_level, target, hashlib.sha256(source_code.encode()).hexdigest())
+        body = compile_cache.get(key)
+        if body is not None:
+            yield batch_line(index, body)
+        elif key in jobs:
+            jobs[key][1].append(index)
+        else:
+            jobs[key] = ((source_code, opt_level, target), [index])
+    
+    if app.config['BATCH_WORKERS'] <= 1 or len(jobs) <= 1:
+        for key, (job, indexes) in jobs.items():
+            body = json.dumps(compile_source(*job, fragment_cache))
+            compile_cache.put(key, body)
+            for index in indexes:
+                yield batch_line(index, body)
+        return
+    
+    pool = get_batch_pool()
+    futures = {}
+    unsubmitted = []
+    failed = None
+    for key, (job, indexes) in jobs.items():
+        if failed is None:
+            try:
+                futures[pool.submit(compile_source, *job)] = key
+                continue
+            except BrokenProcessPool as e:
+                discard_batch_pool(pool)
+                failed = json.dumps({'success': False, 'error': f'Error: {str(e)}'})
+        unsubmitted.extend(indexes)
+    try:
+        for index in unsubmitted:
+            yield batch_line(index, failed)
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                body = json.dumps(future.result())
+                compile_cache.put(key, body)
+            except BrokenProcessPool as e:
+                discard_batch_pool(pool)
+                body = json.dumps({'success': False, 'error': f'Error: {str(e)}'})
+            except Exception as e:
+                body = json.dumps({'success': False, 'error': f'Error: {str(e)}'})
+            for index in jobs[key][1]:
+                yield batch_line(index, body)
+    finally:
+        # The client may have gone away before the batch finished.
+        for future in futures:
+            future.cancel()
+
+@app.route('/compile/batch', methods=['POST'])
+def compile_batch_code():
+    try:
+        limit = app.config['BATCH_MAX_BYTES']
+        data = request.stream.read(limit + 1)
+        if len(data) > limit:
+            return jsonify({
+                'success': False,
+                'error': f'Batch is larger than {limit} bytes'
+            }), 413
+        
+        programs = parse_batch(data, request.mimetype in ('application/x-ndjson', 'application/jsonl'))
+        if not programs:
+            return jsonify({
+                'success': False,
+                'error': 'No programs provided'
+            })
+        if len(programs) > app.config['BATCH_MAX_PROGRAMS']:
+            return jsonify({
+                'success': False,
+                'error': f"Batch has {len(programs)} programs (limit {app.config['BATCH_MAX_PROGRAMS']})"
+            }), 413
+        
+        return app.response_class(compile_batch(programs), mimetype='application/x-ndjson')
+        
+    except Exception as e:
         return jsonify({
+            'success': False,
+            'error': f'Error: {str(e)}'
+        })
+
+def run_source(source_code: str, opt_level: int = 0) -> dict:
+    # Runs the program in-process. Loop iterations, running time, string
+    # length and output are capped so a runaway program cannot tie up the
+    # worker.
+    output = OutputBuffer(app.config['RUN_MAX_OUTPUT'])
+    try:
+        ast = Parser(Lexer(source_code).tokenize()).parse()
+        ast = optimize_program(ast, opt_level)
+        interpreter = Interpreter(output, app.config['RUN_MAX_ITERATIONS'], app.config['RUN_MAX_STRING'],
+                                  app.config['RUN_TIME_LIMIT'])
+        exit_code = interpreter.run(ast)
+        return {
+            'success': True,
+            'output': output.getvalue(),
+            'exit_code': exit_code
+        }
+        
+    except SyntaxError as e:
+        return {
             'success': False,
             'error': f'Syntax Error: {str(e)}'
+        }
+    except VoltRuntimeError as e:
+        return {
+            'success': False,
+            'error': f'Runtime Error: {str(e)}',
+            'output': output.getvalue()
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Error: {str(e)}'
+        }
+
+@app.route('/run', methods=['POST'])
+def run_code():
+    try:
+        data = request.get_json()
+        source_code = data.get('code', '')
+        opt_level = int(data.get('optimize') or 0)
+        
+        if not source_code.strip():
+            return jsonify({
+                'success': False,
+                'error': 'No code provided'
+            })
+        
+        return jsonify(run_source(source_code, opt_level))
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error: {str(e)}'
         })
+
+def compile_session(session: EditSession, opt_level: int) -> dict:
+    if not session.source.strip():
+        return {
+            'success': False,
+            'error': 'No code provided',
+            'version': session.version
+        }
+    return session.compile(opt_level)
+
+@app.route('/session', methods=['POST'])
+def create_session():
+    try:
+        data = request.get_json()
+        source_code = data.get('code', '')
+        opt_level = int(data.get('optimize') or 0)
+        
+        session = EditSession(source_code)
+        session_id = uuid.uuid4().hex
+        sessions.put(session_id, session)
+        
+        response = compile_session(session, opt_level)
+        response['session_id'] = session_id
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error: {str(e)}'
+        })
+
+@app.route('/session/<session_id>', methods=['POST'])
+def edit_session(session_id):
+    # Applies {start, end, text} edits made since the version the client
+    # last saw. A client that is out of step is told to resync, i.e. start a
+    # new session with its whole buffer.
+    try:
+        data = request.get_json()
+        opt_level = int(data.get('optimize') or 0)
+        
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown or expired session',
+                'resync': True
+            })
+        
+        with session.lock:
+            if data.get('version') != session.version:
+                return jsonify({
+                    'success': False,
+                    'error': f'Session is at version {session.version}',
+                    'resync': True
+                })
+            try:
+                session.apply(data.get('edits') or [])
+            except (KeyError, TypeError, ValueError) as e:
+                sessions.discard(session_id)
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid edit: {str(e)}',
+                    'resync': True
+                })
+            
+            return jsonify(compile_session(session, opt_level))
+            
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'Error: {str(e)}'
         })
 
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'compile_cache': compile_cache.stats(),
+        'fragment_cache': fragment_cache.stats(),
+        'sessions': sessions.stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
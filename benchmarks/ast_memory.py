@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import synthetic_program
+from src.ast_nodes import ASTNode
+from src.codegen import CodeGenerator
+from src.flat_ast import NODE_TYPES, FlatAST
+from src.lexer import Lexer
+from src.parser import Parser
+
+# Non-slotted mirrors of every node class, to show what the tree cost before.
+DICT_TYPES = {
+    node_type: make_dataclass(node_type.__name__, [(field.name, field.type) for field in fields(node_type)])
+    for node_type in NODE_TYPES
+}
+SLOTTED_TYPES = {node_type: node_type for node_type in NODE_TYPES}
+
+def copy_tree(node, node_types):
+    if isinstance(node, list):
+        return [copy_tree(item, node_types) for item in node]
+    if not isinstance(node, ASTNode):
+        return node
+    return node_types[type(node)](*(copy_tree(getattr(node, field.name), node_types) for field in fields(node)))
+
+def count_tree(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for field in fields(node):
+            value = getattr(node, field.name)
+            if isinstance(value, list):
+                stack.extend(value)
+            elif isinstance(value, ASTNode):
+                stack.append(value)
+    return count
+
+def allocated(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per AST node and traversal speed for tree vs flat encodings")
+    parser.add_argument('--size', type=float, default=1, help="input size in MB")
+    args = parser.parse_args()
+
+    source = synthetic_program(int(args.size * 1024 * 1024))
+    tokens = Lexer(source).tokenize_compact()
+
+    tree = Parser(tokens).parse()
+    nodes = count_tree(tree)
+
+    # Every encoding is built from the same parsed tree, so identifier and
+    # literal strings are shared and only the structure itself is measured.
+    dict_tree, dict_bytes = allocated(lambda: copy_tree(tree, DICT_TYPES))
+    del dict_tree
+    slotted_tree, tree_bytes = allocated(lambda: copy_tree(tree, SLOTTED_TYPES))
+    del slotted_tree
+
+    def flatten():
+        flat = FlatAST.from_tree(tree)
+        flat.string_ids = {}
+        return flat
+    flat, flat_bytes = allocated(flatten)
+
+    print(f"{nodes} nodes from {len(source) / (1024 * 1024):.2f} MB of source")
+    print(f"{'encoding':<26} {'bytes/node':>11}")
+    print(f"{'dataclass with __dict__':<26} {dict_bytes / nodes:>11.1f}")
+    print(f"{'slotted dataclass':<26} {tree_bytes / nodes:>11.1f}")
+    print(f"{'FlatAST columns':<26} {flat_bytes / nodes:>11.1f}")
+
+    print(f"{'traversal':<26} {'ns/node':>11}")
+    print(f"{'walk tree':<26} {timed(lambda: count_tree(tree)) / nodes * 1e9:>11.0f}")
+    print(f"{'walk FlatAST':<26} {timed(lambda: sum(1 for _ in flat.walk())) / nodes * 1e9:>11.0f}")
+    print(f"{'codegen from tree':<26} {timed(lambda: CodeGenerator().generate(tree)) / nodes * 1e9:>11.0f}")
+    print(f"{'codegen from FlatAST':<26} {timed(lambda: CodeGenerator().generate(flat)) / nodes * 1e9:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import fields
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import synthetic_program
+from src.ast_nodes import ASTNode
+from src.codegen import CodeGenerator
+from src.lexer import Lexer
+from src.parser import Parser
+
+def node_counts(root) -> Counter:
+    counts = Counter()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        counts[type(node).__name__] += 1
+        for field in fields(node):
+            value = getattr(node, field.name)
+            if isinstance(value, list):
+                stack.extend(value)
+            elif isinstance(value, ASTNode):
+                stack.append(value)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-node code generation time on a large generated AST")
+    parser.add_argument('--size', type=float, default=2, help="input size in MB")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    source = synthetic_program(int(args.size * 1024 * 1024))
+    ast = Parser(Lexer(source).tokenize_compact()).parse()
+    counts = node_counts(ast)
+    nodes = sum(counts.values())
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        CodeGenerator().generate(ast)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{nodes} nodes: " + ", ".join(f"{name} {count}" for name, count in counts.most_common()))
+    print(f"codegen: {best:.3f}s total, {best / nodes * 1e9:.0f} ns/node")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import SHAPES
+from src.ast_nodes import *
+from src.codegen import CodeGenerator
+from src.diagnostics import VoltSyntaxError
+from src.lexer import Lexer, TokenType
+from src.parser import Parser
+
+ATOMS = ['x', 'y', 'total', '0', '42', '3.5', '"text"', 'true', 'false']
+BINARY = ['+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&&', '||']
+NOISE = ['(', ')', ',', ';', '!', '-', '+', '&', 'f(', '=', 'int', '{']
+
+class RecursiveParser(Parser):
+    # The parser as it was: one method per precedence level, recursing into
+    # parse_expression again for parentheses and call arguments. Kept here
+    # as the reference the iterative parser is checked against.
+    def parse_expression(self) -> ASTNode:
+        return self.parse_logical_or()
+
+    def parse_logical_or(self) -> ASTNode:
+        left = self.parse_logical_and()
+
+        while self.current_token().type == TokenType.OPERATOR and self.current_token().value == '||':
+            op = self.current_token().value
+            self.advance()
+            right = self.parse_logical_and()
+            left = BinaryOp(left, op, right)
+
+        return left
+
+    def parse_logical_and(self) -> ASTNode:
+        left = self.parse_equality()
+
+        while self.current_token().type == TokenType.OPERATOR and self.current_token().value == '&&':
+            op = self.current_token().value
+            self.advance()
+            right = self.parse_equality()
+            left = BinaryOp(left, op, right)
+
+        return left
+
+    def parse_equality(self) -> ASTNode:
+        left = self.parse_comparison()
+
+        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['==', '!=']:
+            op = self.current_token().value
+            self.advance()
+            right = self.parse_comparison()
+            left = BinaryOp(left, op, right)
+
+        return left
+
+    def parse_comparison(self) -> ASTNode:
+        left = self.parse_term()
+
+        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['<', '>', '<=', '>=']:
+            op = self.current_token().value
+            self.advance()
+            right = self.parse_term()
+            left = BinaryOp(left, op, right)
+
+        return left
+
+    def parse_term(self) -> ASTNode:
+        left = self.parse_factor()
+
+        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['+', '-']:
+            op = self.current_token().value
+            self.advance()
+            right = self.parse_factor()
+            left = BinaryOp(left, op, right)
+
+        return left
+
+    def parse_factor(self) -> ASTNode:
+        left = self.parse_unary()
+
+        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['*', '/', '%']:
+            op = self.current_token().value
+            self.advance()
+            right = self.parse_unary()
+            left = BinaryOp(left, op, right)
+
+        return left
+
+    def parse_unary(self) -> ASTNode:
+        if self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['-', '!']:
+            op = self.current_token().value
+            self.advance()
+            operand = self.parse_unary()
+            return UnaryOp(op, operand)
+
+        return self.parse_primary()
+
+    def parse_primary(self) -> ASTNode:
+        token = self.current_token()
+
+        if token.type == TokenType.NUMBER:
+            self.advance()
+            return Number(token.value)
+
+        if token.type == TokenType.STRING:
+            self.advance()
+            return String(token.value)
+
+        if token.type == TokenType.IDENTIFIER:
+            if self.peek_token().type == TokenType.LPAREN:
+                return self.parse_function_call()
+            self.advance()
+            return Identifier(token.value)
+
+        if token.type == TokenType.KEYWORD and token.value in ['true', 'false']:
+            self.advance()
+            return Identifier(token.value)
+
+        if token.type == TokenType.LPAREN:
+            self.advance()
+            expr = self.parse_expression()
+            self.expect(TokenType.RPAREN)
+            return expr
+
+        raise VoltSyntaxError(f"Unexpected token {token.value}", token.line, token.column)
+
+def recursive_cpp(node: ASTNode) -> str:
+    if isinstance(node, BinaryOp):
+        return f"({recursive_cpp(node.left)} {node.operator} {recursive_cpp(node.right)})"
+    if isinstance(node, UnaryOp):
+        return f"({node.operator}{recursive_cpp(node.operand)})"
+    if isinstance(node, FunctionCall):
+        return f"{node.name}({', '.join(recursive_cpp(argument) for argument in node.arguments)})"
+    return CodeGenerator().generate_expression(node)
+
+def random_expression(rng: random.Random, depth: int) -> str:
+    if depth <= 0 or rng.random() < 0.25:
+        return rng.choice(ATOMS)
+    choice = rng.random()
+    if choice < 0.15:
+        return rng.choice(['-', '!', '- ', '!!']) + random_expression(rng, depth - 1)
+    if choice < 0.3:
+        return f"({random_expression(rng, depth - 1)})"
+    if choice < 0.45:
+        arguments = [random_expression(rng, depth - 1) for _ in range(rng.randint(0, 3))]
+        return f"{rng.choice(['f', 'g'])}({', '.join(arguments)})"
+    return f"{random_expression(rng, depth - 1)} {rng.choice(BINARY)} {random_expression(rng, depth - 1)}"
+
+def mutate(rng: random.Random, text: str) -> str:
+    # Breaks a valid expression by dropping, inserting or truncating, so the
+    # error paths get compared too.
+    words = text.replace('(', ' ( ').replace(')', ' ) ').replace(',', ' , ').split()
+    for _ in range(rng.randint(1, 3)):
+        choice = rng.random()
+        position = rng.randint(0, len(words))
+        if choice < 0.4 and words:
+            del words[min(position, len(words) - 1)]
+        elif choice < 0.8:
+            words.insert(position, rng.choice(NOISE + BINARY + ATOMS))
+        else:
+            words = words[:position]
+    return ' '.join(words)
+
+def parse_with(parser_class, source: str):
+    # The tree (or error) and how many tokens were consumed, for one
+    # expression parsed in statement position.
+    parser = parser_class(Lexer(source).tokenize())
+    try:
+        tree = parser.parse_expression()
+    except SyntaxError as e:
+        return ('error', str(e)), parser.stream.position
+    return tree, parser.stream.position
+
+def check_random(count: int, depth: int, seed: int) -> int:
+    rng = random.Random(seed)
+    mismatches = 0
+    errors = 0
+    for index in range(count):
+        source = random_expression(rng, depth)
+        if index % 2:
+            source = mutate(rng, source)
+        try:
+            Lexer(source).tokenize()
+        except SyntaxError:
+            continue
+        expected = parse_with(RecursiveParser, source)
+        actual = parse_with(Parser, source)
+        same = expected == actual
+        if isinstance(actual[0], tuple):
+            errors += 1
+        elif same:
+            same = CodeGenerator().generate_expression(actual[0]) == recursive_cpp(expected[0])
+        if not same:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH {source!r}\n    recursive: {expected}\n    iterative: {actual}")
+    print(f"random     {count:>8} expressions, {errors} of them errors, {mismatches} mismatches")
+    return mismatches
+
+def deep_sources(depth: int) -> dict:
+    return {
+        'parentheses': '(' * depth + 'x' + ')' * depth,
+        'unary': '-!' * (depth // 2) + 'x',
+        'calls': 'f(' * depth + 'x' + ')' * depth,
+        'right-nested': '(x + ' * depth + 'y' + ')' * depth,
+        'chain': ' + '.join(['x'] * depth),
+    }
+
+def check_deep(depth: int) -> int:
+    failures = 0
+    for name, source in deep_sources(depth).items():
+        try:
+            cpp = CodeGenerator().generate_expression(Parser(Lexer(source).tokenize()).parse_expression())
+            result = f"ok, {len(cpp)} bytes of C++"
+        except RecursionError:
+            result = "RecursionError"
+            failures += 1
+        try:
+            RecursiveParser(Lexer(source).tokenize()).parse_expression()
+            before = "ok"
+        except RecursionError:
+            before = "RecursionError"
+        print(f"deep       {name:<13} depth {depth}: {result} (recursive parser: {before})")
+    return failures
+
+def time_parse(parser_class, source: str, repeat: int) -> float:
+    tokens = Lexer(source).tokenize()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser_class(tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the iterative expression parser and code generator against "
+                                                 "the recursive ones on random and deeply nested expressions, and "
+                                                 "time both parsers")
+    parser.add_argument('--count', type=int, default=20000, help="random expressions to compare")
+    parser.add_argument('--depth', type=int, default=6, help="nesting depth of the random expressions")
+    parser.add_argument('--deep', type=int, default=100000, help="nesting depth of the deep expressions")
+    parser.add_argument('--size', type=int, default=200000, help="bytes of each program shape to time")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check_random(args.count, args.depth, args.seed)
+    failures += check_deep(args.deep)
+
+    print(f"\n{'shape':<13} {'recursive ms':>13} {'iterative ms':>13} {'speedup':>8}")
+    for shape, generate in SHAPES.items():
+        source = generate(args.size, args.seed)
+        recursive = time_parse(RecursiveParser, source, args.repeat)
+        iterative = time_parse(Parser, source, args.repeat)
+        print(f"{shape:<13} {recursive:>13.1f} {iterative:>13.1f} {recursive / iterative:>7.2f}x")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
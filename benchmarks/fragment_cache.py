@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.incremental_latency import program_with_lines
+from src.cache import LRUCache
+from src.codegen import CodeGenerator
+from src.fragments import FRAGMENT_CACHE_BYTES, generate_cached, split_statements
+from src.lexer import Lexer
+from src.parser import Parser
+
+def variants(source: str, count: int, changes: int, rng: random.Random):
+    # Near-identical builds of one program, as produced by a generator whose
+    # input changed slightly: each rewrites a few numeric literals.
+    spans = split_statements(source)
+    for _ in range(count):
+        text = source
+        for start, end in sorted(rng.sample(spans, changes), reverse=True):
+            statement = text[start:end]
+            digits = [index for index, char in enumerate(statement) if char.isdigit()]
+            if digits:
+                index = rng.choice(digits)
+                statement = statement[:index] + str((int(statement[index]) + 1) % 10) + statement[index + 1:]
+            text = text[:start] + statement + text[end:]
+        yield text
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile time of near-identical programs with the statement fragment cache")
+    parser.add_argument('--lines', type=int, default=10000, help="lines per program")
+    parser.add_argument('--builds', type=int, default=10, help="variants compiled after the first build")
+    parser.add_argument('--changes', type=int, nargs='+', default=[1, 10, 100],
+                        help="statements changed in each variant")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    source = program_with_lines(args.lines, args.seed)
+    print(f"program: {source.count(chr(10))} lines, {len(source)} bytes, "
+          f"{len(split_statements(source))} top-level statements")
+
+    cache = LRUCache(65536, max_bytes=FRAGMENT_CACHE_BYTES)
+    full_time, expected = timed(lambda: CodeGenerator().generate(Parser(Lexer(source).tokenize()).parse()))
+    cold_time, output = timed(lambda: generate_cached(source, cache))
+    warm_time, _ = timed(lambda: generate_cached(source, cache))
+    print(f"full compile {full_time * 1000:.1f} ms, cold cache {cold_time * 1000:.1f} ms, "
+          f"unchanged program {warm_time * 1000:.1f} ms")
+    failures = output != expected
+
+    print(f"\n{'changed':>8} {'full ms':>9} {'cached ms':>10} {'speedup':>8}")
+    for changes in args.changes:
+        full_times = []
+        cached_times = []
+        for text in variants(source, args.builds, changes, rng):
+            full_time, expected = timed(lambda: CodeGenerator().generate(Parser(Lexer(text).tokenize()).parse()))
+            cached_time, output = timed(lambda: generate_cached(text, cache))
+            full_times.append(full_time)
+            cached_times.append(cached_time)
+            failures += output != expected
+        full_median = statistics.median(full_times)
+        cached_median = statistics.median(cached_times)
+        print(f"{changes:>8} {full_median * 1000:>9.1f} {cached_median * 1000:>10.1f} {full_median / cached_median:>7.1f}x")
+
+    stats = cache.stats()
+    print(f"\ncache: {stats['entries']} entries, hit rate {stats['hit_rate']:.1%}")
+    if failures:
+        print(f"outputs differing from a full compile: {failures}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
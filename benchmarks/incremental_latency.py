@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import synthetic_program
+from src.codegen import CodeGenerator
+from src.incremental import EditSession
+from src.lexer import Lexer
+from src.parser import Parser
+
+def program_with_lines(lines: int, seed: int) -> str:
+    # synthetic_program is sized in bytes; rescale until it has enough lines.
+    target = lines * 30
+    while True:
+        source = synthetic_program(target, seed)
+        count = source.count('\n')
+        if count >= lines:
+            return source
+        target = int(target * lines / count) + 1024
+
+def full_compile(source: str) -> str:
+    # What /compile does for every request without a session.
+    try:
+        response = {'success': True, 'cpp_code': CodeGenerator().generate(Parser(Lexer(source).tokenize()).parse())}
+    except SyntaxError as e:
+        response = {'success': False, 'error': f'Syntax Error: {e}'}
+    return json.dumps(response)
+
+def keystrokes(source: str, count: int, rng: random.Random):
+    # Single-character edits, each undone by the next one, as when retyping
+    # a digit or a letter: replace a digit, or insert a letter into a name
+    # and delete it again.
+    for _ in range(count // 2):
+        position = rng.randrange(len(source))
+        while not source[position].isalnum():
+            position = rng.randrange(len(source))
+        if source[position].isdigit():
+            digit = str((int(source[position]) + 1) % 10)
+            yield {'start': position, 'end': position + 1, 'text': digit}
+            yield {'start': position, 'end': position + 1, 'text': source[position]}
+        else:
+            yield {'start': position, 'end': position, 'text': 'z'}
+            yield {'start': position, 'end': position + 1, 'text': ''}
+
+# Edits that turn a statement into the continuation of the one before it,
+# each checked against a full compile after every step.
+CONTINUATIONS = [
+    ("int a = 1;\nif (a > 0) {\n print(a);\n}\nprint(2);\n",
+     [('print(2)', 0, 'else { '), ('print(2);', len('print(2);'), ' }')]),
+    ("int a = 1;\nprint(a);\n",
+     [('print(a)', 0, 'a = a + '), ('print(a)', 0, '1;\n')]),
+]
+
+def check_continuations() -> int:
+    mismatches = 0
+    for source, steps in CONTINUATIONS:
+        session = EditSession(source)
+        for anchor, offset, text in steps:
+            position = session.source.index(anchor) + offset
+            session.apply([{'start': position, 'end': position, 'text': text}])
+            response = session.compile()
+            expected = json.loads(full_compile(session.source))
+            if response.get('cpp_code') != expected.get('cpp_code') or response.get('error') != expected.get('error'):
+                mismatches += 1
+                print(f"  MISMATCH after inserting {text!r}:\n    session: {response.get('error')}\n"
+                      f"    full compile: {expected.get('error')}")
+    return mismatches
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"{p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {samples[-1] * 1000:>8.2f}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of single-character edits: incremental session vs full recompile")
+    parser.add_argument('--lines', type=int, default=10000, help="lines in the edited program")
+    parser.add_argument('--edits', type=int, default=200, help="number of single-character edits")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verify', action='store_true', help="check every session response against a full compile")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    source = program_with_lines(args.lines, args.seed)
+    print(f"program: {source.count(chr(10))} lines, {len(source)} bytes")
+
+    start = time.perf_counter()
+    session = EditSession(source)
+    session.compile()
+    print(f"session created in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{len(session.statements)} top-level statements")
+
+    session_times = []
+    full_times = []
+    reparsed = []
+    mismatches = 0
+    for edit in keystrokes(source, args.edits, rng):
+        # Server-side end to end: apply the edit, produce the C++ and
+        # serialize the response the route would send.
+        start = time.perf_counter()
+        session.apply([edit])
+        body = json.dumps(session.compile())
+        session_times.append(time.perf_counter() - start)
+        reparsed.append(session.stats['reparsed'])
+
+        start = time.perf_counter()
+        expected = full_compile(session.source)
+        full_times.append(time.perf_counter() - start)
+
+        if args.verify:
+            response = json.loads(body)
+            mismatches += response.get('cpp_code') != json.loads(expected).get('cpp_code')
+
+    print(f"\n{'per edit':<22} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    print(f"{'full recompile':<22} {percentiles(full_times)}")
+    print(f"{'incremental session':<22} {percentiles(session_times)}")
+    print(f"\nstatements re-parsed per edit: {statistics.mean(reparsed):.2f} on average, {max(reparsed)} at most")
+    print(f"median speedup: {statistics.median(full_times) / statistics.median(session_times):.1f}x")
+    if args.verify:
+        mismatches += check_continuations()
+        print(f"responses differing from a full compile: {mismatches}")
+        if mismatches:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
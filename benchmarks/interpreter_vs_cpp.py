@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import counting_program
+from src.codegen import CodeGenerator
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.parser import Parser
+
+def interpret(source: str):
+    start = time.perf_counter()
+    program = Parser(Lexer(source).tokenize()).parse()
+    output = io.StringIO()
+    run = Interpreter(output).compile(program)
+    compiled = time.perf_counter()
+    run()
+    finished = time.perf_counter()
+    return output.getvalue(), compiled - start, finished - compiled
+
+def compile_and_run(source: str, workdir: str, cxx: str, flags: list):
+    # The demo.sh path: VoltScript -> C++ -> g++ -> run the binary.
+    cpp_file = os.path.join(workdir, 'program.cpp')
+    binary = os.path.join(workdir, 'program')
+    start = time.perf_counter()
+    program = Parser(Lexer(source).tokenize()).parse()
+    with open(cpp_file, 'w') as f:
+        CodeGenerator().write(program, f)
+    translated = time.perf_counter()
+    subprocess.run([cxx, *flags, '-o', binary, cpp_file], check=True)
+    built = time.perf_counter()
+    output = subprocess.run([binary], capture_output=True, text=True, check=True).stdout
+    finished = time.perf_counter()
+    return output, translated - start, built - translated, finished - built
+
+def main():
+    parser = argparse.ArgumentParser(description="Run time of the interpreter vs translating and building with a C++ compiler")
+    parser.add_argument('--iterations', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help="loop iterations per workload")
+    parser.add_argument('--cxx', default='g++', help="C++ compiler (default: g++)")
+    parser.add_argument('--cxx-flags', default='-O0', help="C++ compiler flags (default: -O0, as in demo.sh)")
+    args = parser.parse_args()
+
+    if shutil.which(args.cxx) is None:
+        print(f"{args.cxx} not found; only the interpreter can be timed")
+    flags = args.cxx_flags.split()
+
+    print(f"{'iterations':>10} {'interp setup':>13} {'interp run':>11} {'interp total':>13}"
+          f" {'translate':>10} {'c++ build':>10} {'binary run':>11} {'c++ total':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for iterations in args.iterations:
+            source = counting_program(iterations)
+            output, setup, run = interpret(source)
+            line = f"{iterations:>10} {setup * 1000:>11.1f}ms {run * 1000:>9.1f}ms {(setup + run) * 1000:>11.1f}ms"
+            if shutil.which(args.cxx) is not None:
+                expected, translate, build, execute = compile_and_run(source, workdir, args.cxx, flags)
+                line += (f" {translate * 1000:>8.1f}ms {build * 1000:>8.1f}ms {execute * 1000:>9.1f}ms"
+                         f" {(translate + build + execute) * 1000:>8.1f}ms")
+                if output != expected:
+                    line += "  OUTPUT DIFFERS"
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import synthetic_program
+from src.lexer import Lexer
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare char-at-a-time and regex lexer throughput")
+    parser.add_argument('--sizes', type=float, nargs='+', default=[0.5, 2, 8], help="input sizes in MB")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size (MB)':>10} {'tokens':>10} {'chars MB/s':>12} {'regex MB/s':>12} {'speedup':>8}")
+    for size_mb in args.sizes:
+        source = synthetic_program(int(size_mb * 1024 * 1024))
+        megabytes = len(source) / (1024 * 1024)
+
+        reference = Lexer(source).tokenize_chars()
+        tokens = Lexer(source).tokenize()
+        if tokens != reference:
+            print("Token streams differ between lexers")
+            sys.exit(1)
+
+        chars_time = best_time(lambda: Lexer(source).tokenize_chars(), args.repeat)
+        regex_time = best_time(lambda: Lexer(source).tokenize(), args.repeat)
+        print(f"{megabytes:>10.2f} {len(tokens):>10} {megabytes / chars_time:>12.2f} "
+              f"{megabytes / regex_time:>12.2f} {chars_time / regex_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.workloads import SHAPES
+from src.codegen import CodeGenerator
+from src.driver import file_tokens
+from src.lexer import Lexer
+from src.parser import Parser
+
+MODES = ('read', 'chunked', 'mmap')
+
+def write_source(path: str, size_mb: int, shape: str, seed: int):
+    # The program is a generated block repeated up to size, so generating
+    # it never holds more than one block.
+    block = SHAPES[shape](8 << 20, seed)
+    target = size_mb << 20
+    with open(path, 'w') as f:
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_mode(mode: str, path: str, phase: str) -> dict:
+    # One measurement, in the process that runs it, so its peak RSS is
+    # its own. 'read' decodes the whole file into one str first, as
+    # compiles of small files do; the others stream through file_tokens.
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as sink:
+        if mode == 'read':
+            with open(path) as f:
+                source = f.read()
+            tokens = Lexer(source).iter_tokens()
+            count = consume(tokens, phase, sink)
+        else:
+            with file_tokens(path, use_mmap=mode == 'mmap') as tokens:
+                count = consume(tokens, phase, sink)
+    elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'peak_rss_mb': peak_rss_mb(), 'baseline_rss_mb': baseline, 'count': count}
+
+def consume(tokens, phase: str, sink) -> int:
+    if phase == 'lex':
+        return sum(1 for _ in tokens)
+    return CodeGenerator().write_statements(Parser(tokens).iter_statements(), sink)
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS and throughput of reading a source whole, in text chunks, "
+                                                 "or memory-mapped and lexed as bytes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256], help="source sizes in MB")
+    parser.add_argument('--phase', choices=['lex', 'compile'], default='compile',
+                        help="lex only, or lex, parse and stream C++ statement by statement (default)")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--shape', choices=sorted(SHAPES), default='mixed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--measure', nargs=3, metavar=('MODE', 'PATH', 'PHASE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        mode, path, phase = args.measure
+        print(json.dumps(run_mode(mode, path, phase)))
+        return
+
+    print(f"{'MB':>6} {'mode':<8} {'seconds':>8} {'MB/s':>7} {'peak RSS MB':>12} {'above start':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"program-{size}.volt")
+            write_source(path, size, args.shape, args.seed)
+            source_mb = os.path.getsize(path) / (1 << 20)
+            counts = set()
+            for mode in args.modes:
+                # A fresh process per measurement, so each peak is its own.
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', mode, path, args.phase],
+                                        capture_output=True, text=True, check=True).stdout
+                result = json.loads(output)
+                counts.add(result['count'])
+                print(f"{size:>6} {mode:<8} {result['seconds']:>8.1f} {source_mb / result['seconds']:>7.2f}"
+                      f" {result['peak_rss_mb']:>12.1f} {result['peak_rss_mb'] - result['baseline_rss_mb']:>12.1f}")
+            if len(counts) > 1:
+                print(f"modes disagree: {sorted(counts)} {'tokens' if args.phase == 'lex' else 'characters of C++'}")
+                sys.exit(1)
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
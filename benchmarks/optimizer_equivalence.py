@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import loop_program
+from src.codegen import CodeGenerator
+from src.lexer import Lexer
+from src.optimizer import optimize_program
+from src.parser import Parser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Logical operators whose right operand is the deciding constant while the
+# left one is impure, which the folder must keep rather than reduce to
+# either operand.
+LOGICAL_PROGRAMS = [
+    ("impure-or-true", "int x = 5;\nif (((x % 2) == 0) || true) {\n    print(1);\n}\n"
+                       "bool b = (x / 2 > 5) || true;\nprint(b);\n"),
+    ("impure-and-false", "int x = 4;\nif (((x % 2) == 0) && false) {\n    print(1);\n}\n"
+                         "bool b = (x / 2 == 2) && false;\nprint(b);\n"),
+]
+
+def translate(source: str, level: int):
+    stats = {}
+    ast = optimize_program(Parser(Lexer(source).tokenize()).parse(), level, stats)
+    return CodeGenerator().generate(ast), stats
+
+def build_and_run(cpp_code: str, workdir: str, name: str, cxx: str, timeout: float):
+    # -fwrapv keeps integer overflow in generated expressions well defined,
+    # so both builds must agree on it.
+    cpp_file = os.path.join(workdir, name + '.cpp')
+    binary = os.path.join(workdir, name)
+    with open(cpp_file, 'w') as f:
+        f.write(cpp_code)
+
+    start = time.perf_counter()
+    subprocess.run([cxx, '-O0', '-fwrapv', '-w', '-o', binary, cpp_file], check=True)
+    build_time = time.perf_counter() - start
+
+    run = subprocess.run([binary], capture_output=True, timeout=timeout)
+    return (run.stdout, run.returncode), build_time, os.path.getsize(binary)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that optimized programs print the same output as unoptimized ones")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 3], help="optimization levels to compare with -O0")
+    parser.add_argument('--programs', type=int, default=10, help="number of generated loop programs")
+    parser.add_argument('--statements', type=int, default=40, help="top-level statements per generated program")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cxx', default='g++', help="C++ compiler (default: g++)")
+    parser.add_argument('--timeout', type=float, default=10, help="seconds each binary may run")
+    args = parser.parse_args()
+
+    if shutil.which(args.cxx) is None:
+        print(f"{args.cxx} not found; a C++ compiler is needed to run the programs")
+        sys.exit(1)
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'examples', '*.volt'))):
+        with open(path) as f:
+            programs.append((os.path.basename(path), f.read()))
+    programs.extend(LOGICAL_PROGRAMS)
+    for index in range(args.programs):
+        seed = args.seed + index
+        programs.append((f"loops-{seed}", loop_program(args.statements, seed)))
+
+    failures = 0
+    print(f"{'program':<20} {'level':>5} {'result':>7} {'C++ lines':>10} {'build ms':>9} {'binary':>8}  optimizer")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, source in programs:
+            cpp_code, _ = translate(source, 0)
+            expected, build_time, size = build_and_run(cpp_code, workdir, 'O0', args.cxx, args.timeout)
+            print(f"{name:<20} {'-O0':>5} {'':>7} {cpp_code.count(chr(10)) + 1:>10} {build_time * 1000:>9.0f} {size:>8}")
+
+            for level in args.levels:
+                cpp_code, stats = translate(source, level)
+                actual, build_time, size = build_and_run(cpp_code, workdir, f'O{level}', args.cxx, args.timeout)
+                result = 'same' if actual == expected else 'DIFFERS'
+                failures += actual != expected
+                summary = ", ".join(f"{key} {value}" for key, value in stats.items() if value)
+                print(f"{'':<20} {f'-O{level}':>5} {result:>7} {cpp_code.count(chr(10)) + 1:>10} "
+                      f"{build_time * 1000:>9.0f} {size:>8}  {summary}")
+
+    if failures:
+        print(f"\n{failures} optimized builds changed the program's output")
+        sys.exit(1)
+    print(f"\nAll {len(programs) * len(args.levels)} optimized builds match -O0")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import branch_program, counting_program
+from src.bytecode import compile_bytecode
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.parser import Parser
+from src.pycodegen import PythonGenerator, code_cache, compile_source, run_code
+from src.vm import VM
+
+WORKLOADS = {
+    'loop': counting_program,
+    'branch': branch_program,
+}
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def capture(run) -> str:
+    output = io.StringIO()
+    run(output)
+    return output.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run time of the Python backend vs the interpreter and the bytecode VM")
+    parser.add_argument('--iterations', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="loop iterations per workload")
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    args = parser.parse_args()
+
+    print(f"{'workload':<8} {'iterations':>10} {'interp run':>11} {'vm run':>10} {'python run':>11} {'speedup':>8}"
+          f" {'translate':>10} {'compile()':>10} {'cached':>9}")
+    failures = 0
+    for name in args.workloads:
+        for iterations in args.iterations:
+            program = Parser(Lexer(WORKLOADS[name](iterations)).tokenize()).parse()
+            interp_time, expected = timed(lambda: capture(lambda output: Interpreter(output).run(program)))
+            bytecode = compile_bytecode(program)
+            vm_time, vm_output = timed(lambda: capture(lambda output: VM(output).run(bytecode)))
+
+            translate_time, source = timed(lambda: PythonGenerator().generate(program))
+            code_cache.clear()
+            compile_time, code = timed(lambda: compile_source(source))
+            cached_time, _ = timed(lambda: compile_source(source))
+            python_time, python_output = timed(lambda: capture(lambda output: run_code(code, output)))
+
+            line = (f"{name:<8} {iterations:>10} {interp_time * 1000:>9.1f}ms {vm_time * 1000:>8.1f}ms"
+                    f" {python_time * 1000:>9.1f}ms {interp_time / python_time:>7.1f}x"
+                    f" {translate_time * 1000:>8.2f}ms {compile_time * 1000:>8.2f}ms {cached_time * 1000:>7.3f}ms")
+            if not expected == vm_output == python_output:
+                line += "  OUTPUT DIFFERS"
+                failures += 1
+            print(line)
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
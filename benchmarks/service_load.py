@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.workloads import synthetic_program
+
+async def post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str, body: bytes) -> int:
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def load(host: str, port: int, bodies: list, concurrency: int):
+    # concurrency clients, each on its own keep-alive connection, send the
+    # bodies between them as fast as the service answers.
+    latencies = []
+    statuses = {}
+    remaining = iter(bodies)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for body in remaining:
+                start = time.perf_counter()
+                status = await post(reader, writer, '/compile', body)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def start_service(args):
+    command = [sys.executable, os.path.join(ROOT, 'voltc.py'), 'serve', '--port', '0',
+               '--workers', str(args.workers), '--queue', str(args.queue), '--timeout', str(args.timeout)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    match = re.search(r'http://([^:]+):(\d+)', line)
+    if match is None:
+        process.kill()
+        sys.exit(f"service did not start: {line.strip()}")
+    return process, match.group(1), int(match.group(2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput of the compile service at increasing concurrency")
+    parser.add_argument('--url', help="host:port of a running 'voltc.py serve' (default: start one)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--requests', type=int, default=200, help="requests per concurrency level")
+    parser.add_argument('--size', type=int, default=4096, help="bytes per program")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="workers of the started service")
+    parser.add_argument('--queue', type=int, default=64, help="queue size of the started service")
+    parser.add_argument('--timeout', type=float, default=10.0, help="timeout of the started service")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        host, _, port = args.url.rpartition(':')
+        port = int(port)
+    else:
+        process, host, port = start_service(args)
+        print(f"service: {args.workers} workers, queue {args.queue}, timeout {args.timeout:g} s")
+
+    try:
+        print(f"{args.requests} distinct {args.size}-byte programs per level\n")
+        print(f"{'clients':>7} {'ok':>6} {'429':>6} {'504':>6} {'other':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for level, concurrency in enumerate(args.concurrency):
+            # Distinct programs at every level, so the response cache never answers.
+            seeds = range(level * args.requests, (level + 1) * args.requests)
+            bodies = [json.dumps({'code': synthetic_program(args.size, seed)}).encode() for seed in seeds]
+            elapsed, latencies, statuses = asyncio.run(load(host, port, bodies, concurrency))
+            ok = statuses.pop(200, 0)
+            rejected = statuses.pop(429, 0)
+            timed_out = statuses.pop(504, 0)
+            print(f"{concurrency:>7} {ok:>6} {rejected:>6} {timed_out:>6} {sum(statuses.values()):>6}"
+                  f" {len(latencies) / elapsed:>8.1f} {statistics.median(latencies) * 1000:>8.1f}"
+                  f" {percentile(latencies, 0.99) * 1000:>8.1f}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.workloads import SHAPES
+from src.fragments import fragment_cache
+from src.profiling import Profile, compile_profiled
+from voltc import compile_volt
+
+PHASES = ('lex', 'parse', 'codegen')
+
+def measure_phases(source: str, repeat: int) -> dict:
+    # Best time of each phase over repeat runs, then one traced run for the
+    # peak allocation, since tracing slows the phases down.
+    best = {}
+    for _ in range(repeat):
+        profile = Profile()
+        compile_profiled(source, profile)
+        report = profile.finish()
+        for name in PHASES:
+            best[name] = min(best.get(name, float('inf')), report['phases'][name]['ms'])
+    profile = Profile(memory=True)
+    compile_profiled(source, profile)
+    report = profile.finish()
+    phases = {}
+    for name in PHASES:
+        phases[name] = {'ms': round(best[name], 3), 'peak_bytes': report['phases'][name]['peak_bytes']}
+    sizes = {key: report[key] for key in ('tokens', 'nodes', 'output_bytes')}
+    return {'phases': phases, **sizes}
+
+def measure_end_to_end(source: str, repeat: int) -> float:
+    # voltc's single-file path, in-process, without the output cache. The
+    # statement fragment cache is cleared so every run compiles from scratch.
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = os.path.join(directory, 'program.volt')
+        with open(input_file, 'w') as f:
+            f.write(source)
+        best = float('inf')
+        for _ in range(repeat):
+            fragment_cache.clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                compile_volt(input_file)
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run_case(shape: str, size: int, repeat: int, seed: int) -> dict:
+    source = SHAPES[shape](size, seed)
+    source_mb = len(source.encode()) / 1e6
+    result = {'shape': shape, 'bytes': size, 'source_bytes': len(source.encode()), 'lines': source.count('\n')}
+    result.update(measure_phases(source, repeat))
+    for name, entry in result['phases'].items():
+        entry['mb_per_s'] = round(source_mb / (entry['ms'] / 1000), 3)
+    end_to_end = measure_end_to_end(source, repeat)
+    result['end_to_end'] = {'ms': round(end_to_end, 3), 'mb_per_s': round(source_mb / (end_to_end / 1000), 3)}
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def case_times(result: dict) -> dict:
+    times = {name: entry['ms'] for name, entry in result['phases'].items()}
+    times['end_to_end'] = result['end_to_end']['ms']
+    return times
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    # Prints each phase's time against the baseline run and returns how
+    # many got slower by more than threshold.
+    cases = {(result['shape'], result['bytes']): result for result in baseline['results']}
+    print(f"\nagainst {baseline['meta']['commit']} ({baseline['meta']['timestamp']}), "
+          f"regression threshold {threshold:.0%}")
+    print(f"{'shape':<13} {'bytes':>9} {'phase':<11} {'base ms':>9} {'ms':>9} {'change':>8}")
+    regressions = 0
+    for result in current['results']:
+        base = cases.get((result['shape'], result['bytes']))
+        if base is None:
+            continue
+        base_times = case_times(base)
+        for name, ms in case_times(result).items():
+            if name not in base_times:
+                continue
+            change = ms / base_times[name] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{result['shape']:<13} {result['bytes']:>9} {name:<11} {base_times[name]:>9.2f} {ms:>9.2f}"
+                  f" {change:>+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexer, parser, codegen and end-to-end compile throughput and memory "
+                                                 "across program shapes and sizes")
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help="program sizes in bytes")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the best is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="compare against results written earlier with --json")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown reported as a regression with --compare (default: 0.10)")
+    args = parser.parse_args()
+    sys.setrecursionlimit(10000)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': [],
+    }
+    print(f"{'shape':<13} {'bytes':>9} {'tokens':>8} {'nodes':>8} {'lex MB/s':>9} {'parse MB/s':>11}"
+          f" {'codegen MB/s':>13} {'compile MB/s':>13} {'peak MB':>8}")
+    for shape in args.shapes:
+        for size in args.sizes:
+            result = run_case(shape, size, args.repeat, args.seed)
+            report['results'].append(result)
+            phases = result['phases']
+            peak = max(entry['peak_bytes'] for entry in phases.values()) / 1e6
+            print(f"{shape:<13} {size:>9} {result['tokens']:>8} {result['nodes']:>8}"
+                  f" {phases['lex']['mb_per_s']:>9.2f} {phases['parse']['mb_per_s']:>11.2f}"
+                  f" {phases['codegen']['mb_per_s']:>13.2f} {result['end_to_end']['mb_per_s']:>13.2f} {peak:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{regressions} measurements regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import synthetic_program
+from src.lexer import Lexer, TokenType
+from src.parser import Parser
+
+@dataclass
+class DictToken:
+    # Layout of Token before it was slotted: a __dict__ per instance.
+    type: TokenType
+    value: str
+    line: int
+    column: int
+
+def measure(build):
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per token for each token representation")
+    parser.add_argument('--size', type=float, default=2, help="input size in MB")
+    args = parser.parse_args()
+
+    source = synthetic_program(int(args.size * 1024 * 1024))
+
+    def dict_tokens():
+        # Fresh value strings, as the old lexer built them by concatenation.
+        return [DictToken(token.type, (token.value + ' ')[:-1], token.line, token.column)
+                for token in Lexer(source).iter_tokens()]
+
+    legacy, legacy_bytes, _ = measure(dict_tokens)
+    count = len(legacy)
+    del legacy
+
+    slotted, slotted_bytes, slotted_time = measure(lambda: Lexer(source).tokenize())
+    del slotted
+
+    store, store_bytes, store_time = measure(lambda: Lexer(source).tokenize_compact())
+
+    print(f"{count} tokens from {len(source) / (1024 * 1024):.2f} MB of source")
+    print(f"{'representation':<28} {'bytes/token':>12} {'lex time (s)':>13}")
+    print(f"{'dataclass with __dict__':<28} {legacy_bytes / count:>12.1f} {'-':>13}")
+    print(f"{'slotted, interned Token':<28} {slotted_bytes / count:>12.1f} {slotted_time:>13.2f}")
+    print(f"{'TokenStore columns':<28} {store_bytes / count:>12.1f} {store_time:>13.2f}")
+
+    start = time.perf_counter()
+    Parser(store).parse()
+    print(f"parse from TokenStore: {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
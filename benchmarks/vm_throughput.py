@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.workloads import branch_program, counting_program
+from src.bytecode import Bytecode, compile_bytecode
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.parser import Parser
+from src.vm import VM
+
+WORKLOADS = {
+    'loop': counting_program,
+    'branch': branch_program,
+}
+
+def best_of(repeat: int, function):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def run_vm(bytecode: Bytecode) -> str:
+    output = io.StringIO()
+    VM(output).run(bytecode)
+    return output.getvalue()
+
+def run_interpreter(run, output: io.StringIO) -> str:
+    output.seek(0)
+    output.truncate()
+    run()
+    return output.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytecode VM instructions per second vs the tree interpreter")
+    parser.add_argument('--iterations', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="loop iterations per workload")
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'workload':<8} {'iterations':>10} {'instructions':>13} {'vm run':>10} {'M instr/s':>10}"
+          f" {'interp run':>11} {'speedup':>8} {'parse+compile':>14} {'load .voltc':>12} {'size':>8}")
+    failures = 0
+    for name in args.workloads:
+        for iterations in args.iterations:
+            source = WORKLOADS[name](iterations)
+
+            start = time.perf_counter()
+            bytecode = compile_bytecode(Parser(Lexer(source).tokenize()).parse())
+            compile_time = time.perf_counter() - start
+            data = bytecode.to_bytes()
+            load_time, _ = best_of(args.repeat, lambda: Bytecode.from_bytes(data))
+
+            counter = VM(io.StringIO(), count_instructions=True)
+            counter.run(bytecode)
+            vm_time, vm_output = best_of(args.repeat, lambda: run_vm(bytecode))
+
+            output = io.StringIO()
+            run = Interpreter(output).compile(Parser(Lexer(source).tokenize()).parse())
+            interp_time, interp_output = best_of(args.repeat, lambda: run_interpreter(run, output))
+
+            line = (f"{name:<8} {iterations:>10} {counter.instructions:>13} {vm_time * 1000:>8.1f}ms"
+                    f" {counter.instructions / vm_time / 1e6:>10.2f} {interp_time * 1000:>9.1f}ms"
+                    f" {interp_time / vm_time:>7.2f}x {compile_time * 1000:>12.2f}ms"
+                    f" {load_time * 1000:>10.3f}ms {len(data):>8}")
+            if vm_output != interp_output:
+                line += "  OUTPUT DIFFERS"
+                failures += 1
+            print(line)
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import random
+from typing import List
+
+TYPES = ['int', 'float', 'string', 'bool']
+
+def random_expression(rng: random.Random, names: List[str], depth: int = 3) -> str:
+    if depth <= 0 or rng.random() < 0.3:
+        choice = rng.random()
+        if choice < 0.5 and names:
+            return rng.choice(names)
+        if choice < 0.8:
+            return str(rng.randint(0, 1000))
+        return f"{rng.randint(0, 99)}.{rng.randint(0, 99)}"
+
+    if rng.random() < 0.1:
+        return f"-{random_expression(rng, names, depth - 1)}"
+    if rng.random() < 0.15:
+        return f"({random_expression(rng, names, depth - 1)})"
+
+    op = rng.choice(['+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&&', '||'])
+    left = random_expression(rng, names, depth - 1)
+    right = random_expression(rng, names, depth - 1)
+    return f"{left} {op} {right}"
+
+def synthetic_program(target_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    names = [f"var_{i}" for i in range(64)]
+    parts = [f"int {name} = {i};\n" for i, name in enumerate(names)]
+    size = sum(len(part) for part in parts)
+    counter = 0
+
+    while size < target_bytes:
+        counter += 1
+        kind = rng.random()
+        if kind < 0.3:
+            chunk = f"int tmp_{counter} = {random_expression(rng, names)};\n"
+        elif kind < 0.5:
+            chunk = f"{rng.choice(names)} = {random_expression(rng, names)};\n"
+        elif kind < 0.6:
+            chunk = f'print("line {counter}: \\"quoted\\" text");\n'
+        elif kind < 0.7:
+            chunk = f"// generated comment {counter}\n"
+        elif kind < 0.8:
+            name = rng.choice(names)
+            chunk = (
+                f"if ({random_expression(rng, names, 2)}) {{\n"
+                f"    {name} = {name} + 1;\n"
+                f"}} else {{\n"
+                f"    print({name});\n"
+                f"}}\n"
+            )
+        elif kind < 0.9:
+            name = rng.choice(names)
+            chunk = (
+                f"while ({name} < {rng.randint(1, 100)}) {{\n"
+                f"    {name} = {name} + 1;\n"
+                f"}}\n"
+            )
+        else:
+            chunk = (
+                f"for (int i_{counter} = 0; i_{counter} < {rng.randint(1, 100)}; i_{counter} = i_{counter} + 1) {{\n"
+                f"    print(i_{counter} * {rng.randint(1, 9)});\n"
+                f"}}\n"
+            )
+        parts.append(chunk)
+        size += len(chunk)
+
+    return "".join(parts)
+
+def loop_program(statements: int, seed: int = 0) -> str:
+    # A program that compiles with g++ and terminates: nested if/for/while
+    # over int variables, with loop-invariant products and induction
+    # variable multiplications for the loop optimizer, dead stores for the
+    # dead-code pass, and prints so every run has observable output.
+    rng = random.Random(seed)
+    counter = 0
+
+    def fresh() -> str:
+        nonlocal counter
+        counter += 1
+        return f"v_{counter}"
+
+    def expression(names: List[str], depth: int = 2) -> str:
+        if depth <= 0 or rng.random() < 0.3:
+            if names and rng.random() < 0.7:
+                return rng.choice(names)
+            return str(rng.randint(0, 9))
+        op = rng.choice(['+', '-', '*', '<', '==', '%'])
+        if op == '%':
+            return f"({expression(names, depth - 1)} % {rng.randint(1, 5)})"
+        return f"({expression(names, depth - 1)} {op} {expression(names, depth - 1)})"
+
+    def block(names: List[str], fixed: List[str], depth: int, count: int) -> List[str]:
+        # Loop counters are in names (readable) but not in fixed, so the
+        # body never assigns them and every loop terminates.
+        lines = []
+        names = list(names)
+        for _ in range(count):
+            kind = rng.random()
+            writable = [name for name in names if name not in fixed]
+            if kind < 0.25 or not writable:
+                name = fresh()
+                lines.append(f"int {name} = {expression(names)};")
+                names.append(name)
+            elif kind < 0.45:
+                lines.append(f"{rng.choice(writable)} = {expression(names)} % 1000;")
+            elif kind < 0.6:
+                lines.append(f"print({expression(names)});")
+            elif kind < 0.7 and depth > 0:
+                lines.append(f"if ({expression(names)}) {{")
+                lines.extend(block(names, fixed, depth - 1, rng.randint(0, 4)))
+                if rng.random() < 0.5:
+                    lines.append("} else {")
+                    lines.extend(block(names, fixed, depth - 1, rng.randint(0, 4)))
+                lines.append("}")
+            elif kind < 0.85 and depth > 0:
+                index = fresh()
+                factor = rng.choice(names) if names else "3"
+                lines.append(f"for (int {index} = 0; {index} < {rng.randint(1, 6)}; {index} = {index} + 1) {{")
+                lines.append(f"print({index} * {rng.randint(2, 9)} + {factor} * {rng.randint(2, 9)});")
+                lines.extend(block(names + [index], fixed + [index], depth - 1, rng.randint(0, 4)))
+                lines.append("}")
+            elif depth > 0:
+                index = fresh()
+                lines.append(f"int {index} = 0;")
+                lines.append(f"while ({index} < {rng.randint(1, 4)}) {{")
+                lines.extend(block(names + [index], fixed + [index], depth - 1, rng.randint(0, 3)))
+                lines.append(f"print({index} * {rng.randint(2, 9)});")
+                lines.append(f"{index} = {index} + 1;")
+                lines.append("}")
+                names.append(index)
+                fixed = fixed + [index]
+            else:
+                lines.append(f"print({expression(names)});")
+        return lines
+
+    return "\n".join(block([], [], 3, statements)) + "\n"
+
+def counting_program(iterations: int) -> str:
+    # examples/loop.volt scaled up: a while and a for loop that each run
+    # iterations times, folding their counters into checksums so the work
+    # cannot be skipped and the output is small.
+    return (
+        f"int i = 0;\n"
+        f"int total = 0;\n"
+        f"while(i < {iterations}) {{\n"
+        f"    total = (total + i * 7) % 1000003;\n"
+        f"    i = i + 1;\n"
+        f"}}\n"
+        f"print(total);\n"
+        f"float sum = 0.0;\n"
+        f"for(int j = 0; j < {iterations}; j = j + 1) {{\n"
+        f"    if(j % 3 == 0) {{\n"
+        f"        sum = sum + j / 2.0;\n"
+        f"    }} else {{\n"
+        f"        sum = sum - 1;\n"
+        f"    }}\n"
+        f"}}\n"
+        f"print(sum);\n"
+    )
+
+def branch_program(iterations: int) -> str:
+    # Mostly conditionals: an if/else ladder and short-circuit && and ||
+    # tests per iteration, so the run is dominated by compares and jumps
+    # rather than arithmetic.
+    return (
+        f"int evens = 0;\n"
+        f"int odds = 0;\n"
+        f"int fizz = 0;\n"
+        f"int mixed = 0;\n"
+        f"for(int i = 0; i < {iterations}; i = i + 1) {{\n"
+        f"    int r = i % 15;\n"
+        f"    if(r == 0) {{\n"
+        f"        fizz = fizz + 3;\n"
+        f"    }} else {{\n"
+        f"        if(r == 5 || r == 10) {{\n"
+        f"            fizz = fizz + 2;\n"
+        f"        }} else {{\n"
+        f"            if(r == 3 || r == 6 || r == 9 || r == 12) {{\n"
+        f"                fizz = fizz + 1;\n"
+        f"            }}\n"
+        f"        }}\n"
+        f"    }}\n"
+        f"    if(i % 2 == 0 && i % 3 != 0) {{\n"
+        f"        evens = evens + 1;\n"
+        f"    }} else {{\n"
+        f"        odds = odds + 1;\n"
+        f"    }}\n"
+        f"    if(i % 5 == 0 || i % 7 == 0 && r > 7) {{\n"
+        f"        mixed = mixed + 1;\n"
+        f"    }}\n"
+        f"}}\n"
+        f"print(evens);\n"
+        f"print(odds);\n"
+        f"print(fizz);\n"
+        f"print(mixed);\n"
+    )
+
+def nested_if_program(target_bytes: int, seed: int = 0, depth: int = 16) -> str:
+    # examples/conditional.volt scaled up: grade ladders nested depth levels
+    # deep through their else blocks, repeated until the target size.
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    counter = 0
+    while size < target_bytes:
+        counter += 1
+        name = f"score_{counter}"
+        lines = [f"int {name} = {rng.randint(0, 100)};"]
+        for level in range(depth):
+            indent = "    " * level
+            lines.append(f"{indent}if({name} >= {100 - (level + 1) * 100 // (depth + 1)}) {{")
+            lines.append(f'{indent}    print("grade {level}");')
+            lines.append(f"{indent}}} else {{")
+        lines.append(f"{'    ' * depth}print(\"fail\");")
+        for level in reversed(range(depth)):
+            lines.append(f"{'    ' * level}}}")
+        chunk = "\n".join(lines) + "\n\n"
+        parts.append(chunk)
+        size += len(chunk)
+    return "".join(parts)
+
+def declarations_program(target_bytes: int, seed: int = 0) -> str:
+    # Long straight-line code: declarations of every type, initialised from
+    # literals or from earlier variables of the same type.
+    rng = random.Random(seed)
+    names = {var_type: [] for var_type in TYPES}
+    parts = []
+    size = 0
+    counter = 0
+    while size < target_bytes:
+        counter += 1
+        var_type = rng.choice(TYPES)
+        name = f"{var_type[0]}_{counter}"
+        earlier = names[var_type]
+        if earlier and rng.random() < 0.5:
+            value = rng.choice(earlier)
+        elif var_type == 'int':
+            value = str(rng.randint(0, 100000))
+        elif var_type == 'float':
+            value = f"{rng.randint(0, 999)}.{rng.randint(0, 99)}"
+        elif var_type == 'string':
+            value = f'"value {counter}"'
+        else:
+            value = rng.choice(['true', 'false'])
+        earlier.append(name)
+        chunk = f"{var_type} {name} = {value};\n"
+        parts.append(chunk)
+        size += len(chunk)
+    return "".join(parts)
+
+def expression_chain_program(target_bytes: int, seed: int = 0, length: int = 64) -> str:
+    # Deep expressions: alternately a flat left-associative chain of length
+    # operators and a right-nested one, parenthesised length levels deep.
+    rng = random.Random(seed)
+    names = [f"x_{i}" for i in range(16)]
+    parts = [f"int {name} = {i + 1};\n" for i, name in enumerate(names)]
+    size = sum(len(part) for part in parts)
+    counter = 0
+    while size < target_bytes:
+        counter += 1
+        operands = [rng.choice(names) if rng.random() < 0.6 else str(rng.randint(1, 99)) for _ in range(length + 1)]
+        operators = [rng.choice(['+', '-', '*', '<', '==', '&&', '||']) for _ in range(length)]
+        if counter % 2:
+            expression = operands[0] + "".join(f" {op} {operand}" for op, operand in zip(operators, operands[1:]))
+        else:
+            expression = operands[-1]
+            for op, operand in zip(reversed(operators), reversed(operands[:-1])):
+                expression = f"({operand} {op} {expression})"
+        chunk = f"int e_{counter} = {expression};\n"
+        parts.append(chunk)
+        size += len(chunk)
+    return "".join(parts)
+
+def many_loops_program(target_bytes: int, seed: int = 0, depth: int = 3) -> str:
+    # Many loops: for and while loops nested depth deep, each updating a
+    # counter and an accumulator.
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    counter = 0
+
+    def loop(level: int) -> List[str]:
+        nonlocal counter
+        counter += 1
+        index = f"i_{counter}"
+        indent = "    " * level
+        if rng.random() < 0.5:
+            lines = [f"{indent}for(int {index} = 0; {index} < {rng.randint(2, 50)}; {index} = {index} + 1) {{"]
+            footer = []
+        else:
+            lines = [f"{indent}int {index} = 0;", f"{indent}while({index} < {rng.randint(2, 50)}) {{"]
+            footer = [f"{indent}    {index} = {index} + 1;"]
+        lines.append(f"{indent}    total = total + {index} * {rng.randint(1, 9)};")
+        if level + 1 < depth:
+            for _ in range(rng.randint(1, 2)):
+                lines.extend(loop(level + 1))
+        return lines + footer + [f"{indent}}}"]
+
+    parts.append("int total = 0;\n")
+    while size < target_bytes:
+        chunk = "\n".join(loop(0)) + "\n"
+        parts.append(chunk)
+        size += len(chunk)
+    parts.append("print(total);\n")
+    return "".join(parts)
+
+# Program shapes for the benchmark suite, each sized in bytes.
+SHAPES = {
+    'mixed': synthetic_program,
+    'nested_if': nested_if_program,
+    'declarations': declarations_program,
+    'expressions': expression_chain_program,
+    'loops': many_loops_program,
+}
@@ -1,75 +1,75 @@
 from dataclasses import dataclass
 from typing import List, Optional, Any
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Program(ASTNode):
     statements: List[ASTNode]
 
-@dataclass
+@dataclass(slots=True)
 class VarDeclaration(ASTNode):
     var_type: str
     name: str
     value: Optional[ASTNode] = None
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(ASTNode):
     name: str
     value: ASTNode
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(ASTNode):
     left: ASTNode
     operator: str
     right: ASTNode
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(ASTNode):
     operator: str
     operand: ASTNode
 
-@dataclass
+@dataclass(slots=True)
 class Number(ASTNode):
     value: str
 
-@dataclass
+@dataclass(slots=True)
 class String(ASTNode):
     value: str
 
-@dataclass
+@dataclass(slots=True)
 class Identifier(ASTNode):
     name: str
 
-@dataclass
+@dataclass(slots=True)
 class IfStatement(ASTNode):
     condition: ASTNode
     then_block: List[ASTNode]
     else_block: Optional[List[ASTNode]] = None
 
-@dataclass
+@dataclass(slots=True)
 class WhileLoop(ASTNode):
     condition: ASTNode
     body: List[ASTNode]
 
-@dataclass
+@dataclass(slots=True)
 class ForLoop(ASTNode):
     init: Optional[ASTNode]
     condition: Optional[ASTNode]
     update: Optional[ASTNode]
     body: List[ASTNode]
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall(ASTNode):
     name: str
     arguments: List[ASTNode]
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStatement(ASTNode):
     value: Optional[ASTNode] = None
 
-@dataclass
+@dataclass(slots=True)
 class PrintStatement(ASTNode):
     expression: ASTNode
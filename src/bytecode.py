@@ -0,0 +1,444 @@
+import struct
+import sys
+from array import array
+from typing import Dict, List, Optional, Tuple
+from src.ast_nodes import *
+from src.interpreter import (CompileError, DEFAULTS, SlotResolver, binary_operation, condition_conversion,
+                             conversion, decode_string, literal_value, unary_operation)
+from src.optimizer import INT, DOUBLE, BOOL, CSTR, COMPARISONS
+
+# Register machine code. Every instruction is four int32 words: an opcode
+# and up to three operands. Registers hold the program's variables, then
+# expression temporaries, then the constant pool, so an operand is always a
+# register index and loading a variable or constant costs no instruction.
+# Renumbering opcodes changes the file format, so bump FORMAT_VERSION.
+(
+    MOVE,
+    ADD_INT, SUB_INT, MUL_INT, DIV_INT, MOD_INT,
+    ADD, SUB, MUL, DIV_DOUBLE,
+    NEGATE_INT, NEGATE, NOT,
+    EQ, NE, LT, GT, LE, GE,
+    BOOL_TO_INT, DOUBLE_TO_INT, TO_DOUBLE, TO_BOOL,
+    JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, LOOP,
+    BRANCH_IF_NOT_EQ, BRANCH_IF_NOT_NE, BRANCH_IF_NOT_LT,
+    BRANCH_IF_NOT_GT, BRANCH_IF_NOT_LE, BRANCH_IF_NOT_GE,
+    PRINT_INT, PRINT_BOOL, PRINT_DOUBLE, PRINT_STRING,
+    RETURN, HALT,
+) = range(39)
+
+# Per opcode: how many leading operands are registers (the first is the
+# destination for instructions that produce a value), and whether the
+# operand after them is a jump target.
+OPERANDS = (
+    [(2, False)]
+    + [(3, False)] * 9
+    + [(2, False)] * 3
+    + [(3, False)] * 6
+    + [(2, False)] * 4
+    + [(0, True), (1, True), (1, True), (0, True)]
+    + [(2, True)] * 6
+    + [(1, False)] * 5
+    + [(0, False)]
+)
+
+INT_ARITHMETIC = {'+': ADD_INT, '-': SUB_INT, '*': MUL_INT, '/': DIV_INT, '%': MOD_INT}
+DOUBLE_ARITHMETIC = {'+': ADD, '-': SUB, '*': MUL, '/': DIV_DOUBLE}
+COMPARISON_OPCODES = {'==': EQ, '!=': NE, '<': LT, '>': GT, '<=': LE, '>=': GE}
+BRANCH_OPCODES = {
+    '==': BRANCH_IF_NOT_EQ, '!=': BRANCH_IF_NOT_NE, '<': BRANCH_IF_NOT_LT,
+    '>': BRANCH_IF_NOT_GT, '<=': BRANCH_IF_NOT_LE, '>=': BRANCH_IF_NOT_GE,
+}
+NEGATED_COMPARISONS = {'==': '!=', '!=': '==', '<': '>=', '>': '<=', '<=': '>', '>=': '<'}
+UNARY_OPCODES = {'not': NOT, 'negate': NEGATE, 'negate_int': NEGATE_INT}
+CONVERSION_OPCODES = {'bool_to_int': BOOL_TO_INT, 'double_to_int': DOUBLE_TO_INT,
+                      'to_double': TO_DOUBLE, 'to_bool': TO_BOOL}
+PRINT_OPCODES = {INT: PRINT_INT, BOOL: PRINT_BOOL, DOUBLE: PRINT_DOUBLE}
+
+# While compiling, the register kind is kept in the high bits until the
+# number of variables and temporaries is known.
+VARIABLE, TEMPORARY, CONSTANT = 0, 1 << 24, 2 << 24
+INDEX_MASK = (1 << 24) - 1
+
+# .voltc layout (little-endian): magic, header, the instruction words, then
+# the constant pool as tagged values.
+MAGIC = b'VOLTC\0'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<HIIII')
+
+class Bytecode:
+    def __init__(self, code: array, constants: list, variable_count: int, temporary_count: int):
+        self.code = code
+        self.constants = constants
+        self.variable_count = variable_count
+        self.temporary_count = temporary_count
+    
+    def __len__(self) -> int:
+        return len(self.code) // 4
+    
+    @property
+    def register_count(self) -> int:
+        return self.variable_count + self.temporary_count + len(self.constants)
+    
+    def to_bytes(self) -> bytes:
+        code = array('i', self.code)
+        if sys.byteorder == 'big':
+            code.byteswap()
+        header = HEADER.pack(FORMAT_VERSION, self.variable_count, self.temporary_count,
+                             len(code), len(self.constants))
+        parts = [MAGIC, header, code.tobytes()]
+        for value in self.constants:
+            if isinstance(value, bool):
+                parts.append(b'b' + struct.pack('<?', value))
+            elif isinstance(value, int):
+                parts.append(b'i' + struct.pack('<q', value))
+            elif isinstance(value, float):
+                parts.append(b'd' + struct.pack('<d', value))
+            else:
+                data = value.encode('utf-8')
+                parts.append(b's' + struct.pack('<I', len(data)) + data)
+        return b''.join(parts)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Bytecode':
+        if not data.startswith(MAGIC):
+            raise ValueError("not a VoltScript bytecode file")
+        try:
+            offset = len(MAGIC)
+            version, variable_count, temporary_count, code_length, constant_count = HEADER.unpack_from(data, offset)
+            if version != FORMAT_VERSION:
+                raise ValueError(f"bytecode format {version} is not supported (expected {FORMAT_VERSION})")
+            offset += HEADER.size
+            
+            code = array('i')
+            code.frombytes(data[offset:offset + code_length * code.itemsize])
+            if len(code) != code_length:
+                raise ValueError("truncated bytecode file")
+            if sys.byteorder == 'big':
+                code.byteswap()
+            offset += code_length * code.itemsize
+            
+            constants = []
+            for _ in range(constant_count):
+                tag = data[offset:offset + 1]
+                offset += 1
+                if tag == b'b':
+                    constants.append(struct.unpack_from('<?', data, offset)[0])
+                    offset += 1
+                elif tag == b'i':
+                    constants.append(struct.unpack_from('<q', data, offset)[0])
+                    offset += 8
+                elif tag == b'd':
+                    constants.append(struct.unpack_from('<d', data, offset)[0])
+                    offset += 8
+                elif tag == b's':
+                    (length,) = struct.unpack_from('<I', data, offset)
+                    offset += 4
+                    constants.append(data[offset:offset + length].decode('utf-8'))
+                    offset += length
+                else:
+                    raise ValueError(f"unknown constant tag {tag!r}")
+        except struct.error:
+            raise ValueError("truncated bytecode file") from None
+        
+        bytecode = cls(code, constants, variable_count, temporary_count)
+        bytecode.verify()
+        return bytecode
+    
+    def verify(self):
+        # Loaded files are checked once up front, so the VM can trust every
+        # opcode, register index and jump target it reads.
+        code = self.code
+        count = len(self)
+        writable = self.variable_count + self.temporary_count
+        if len(code) % 4 or not code or code[-4] not in (HALT, RETURN):
+            raise ValueError("malformed bytecode: missing final HALT")
+        for index in range(count):
+            op = code[index * 4]
+            if not 0 <= op < len(OPERANDS):
+                raise ValueError(f"malformed bytecode: unknown opcode {op} at {index}")
+            registers, has_target = OPERANDS[op]
+            operands = code[index * 4 + 1:index * 4 + 4]
+            for position, register in enumerate(operands[:registers]):
+                limit = writable if position == 0 and registers > 1 and not has_target else self.register_count
+                if not 0 <= register < limit:
+                    raise ValueError(f"malformed bytecode: register {register} out of range at {index}")
+            if has_target and not 0 <= operands[registers] < count:
+                raise ValueError(f"malformed bytecode: jump target {operands[registers]} out of range at {index}")
+    
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+    
+    @classmethod
+    def load(cls, path: str) -> 'Bytecode':
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+class BytecodeCompiler(SlotResolver):
+    # Lowers the AST to register machine code with the same static typing as
+    # the interpreter: every operation is picked for its operand types here,
+    # so the VM never inspects a value's type. Temporaries are reused from
+    # one statement to the next. Comparisons used as conditions compile to
+    # a single compare-and-branch instruction.
+    def __init__(self):
+        super().__init__()
+        self.instructions: List[List[int]] = []
+        self.constants: list = []
+        self.constant_index: Dict[Tuple[type, object], int] = {}
+        self.temporaries = 0
+        self.temporary_count = 0
+        self.statement_handlers = self.dispatch_table('compile_')
+        self.expression_handlers = self.dispatch_table('expr_')
+    
+    def compile(self, program: Program) -> Bytecode:
+        self.compile_statements(program.statements)
+        self.emit(HALT)
+        return Bytecode(self.assemble(), self.constants, self.slot_count, self.temporary_count)
+    
+    def assemble(self) -> array:
+        bases = {VARIABLE: 0, TEMPORARY: self.slot_count, CONSTANT: self.slot_count + self.temporary_count}
+        code = array('i')
+        for instruction in self.instructions:
+            registers, _ = OPERANDS[instruction[0]]
+            for position in range(1, registers + 1):
+                operand = instruction[position]
+                instruction[position] = bases[operand & ~INDEX_MASK] + (operand & INDEX_MASK)
+            code.extend(instruction)
+        return code
+    
+    def emit(self, op: int, a: int = 0, b: int = 0, c: int = 0) -> int:
+        self.instructions.append([op, a, b, c])
+        return len(self.instructions) - 1
+    
+    def patch(self, *positions: int):
+        # Points the jumps at positions to the next instruction emitted.
+        for position in positions:
+            instruction = self.instructions[position]
+            instruction[OPERANDS[instruction[0]][0] + 1] = len(self.instructions)
+    
+    def constant(self, value) -> int:
+        key = (type(value), value)
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return CONSTANT | index
+    
+    def temporary(self) -> int:
+        register = TEMPORARY | self.temporaries
+        self.temporaries += 1
+        self.temporary_count = max(self.temporary_count, self.temporaries)
+        return register
+    
+    def compile_block(self, statements: List[ASTNode]):
+        self.scopes.append({})
+        try:
+            self.compile_statements(statements)
+        finally:
+            self.scopes.pop()
+    
+    def compile_statements(self, statements: List[ASTNode]):
+        for statement in statements:
+            self.compile_statement(statement)
+    
+    def compile_statement(self, node: ASTNode):
+        self.temporaries = 0
+        self.statement_handlers[node.__class__](self, node)
+    
+    def compile_ast_node(self, node: ASTNode):
+        raise CompileError(f"cannot execute {type(node).__name__}")
+    
+    def compile_var_declaration(self, node: VarDeclaration):
+        # The name is in scope within its own initializer, as in C++.
+        slot, var_type = self.declare(node.name, node.var_type)
+        if node.value is None:
+            self.emit(MOVE, VARIABLE | slot, self.constant(DEFAULTS[var_type]))
+        else:
+            self.store(VARIABLE | slot, var_type, node.value)
+    
+    def compile_assignment(self, node: Assignment):
+        slot, var_type = self.lookup(node.name)
+        self.store(VARIABLE | slot, var_type, node.value)
+    
+    def store(self, register: int, var_type: str, value: ASTNode):
+        # The value is computed straight into the variable when it needs no
+        # conversion; the operands are read before the result is written.
+        source, source_type = self.compile_expression(value, register)
+        source = self.convert(source, source_type, var_type, register)
+        if source != register:
+            self.emit(MOVE, register, source)
+    
+    def compile_if_statement(self, node: IfStatement):
+        skip_then = self.branch_if_false(node.condition)
+        self.compile_block(node.then_block)
+        if node.else_block:
+            skip_else = self.emit(JUMP)
+            self.patch(*skip_then)
+            self.compile_block(node.else_block)
+            self.patch(skip_else)
+        else:
+            self.patch(*skip_then)
+    
+    def compile_while_loop(self, node: WhileLoop):
+        start = len(self.instructions)
+        exits = self.branch_if_false(node.condition)
+        self.compile_block(node.body)
+        self.emit(LOOP, start)
+        self.patch(*exits)
+    
+    def compile_for_loop(self, node: ForLoop):
+        self.scopes.append({})
+        try:
+            if node.init:
+                self.compile_statement(node.init)
+            start = len(self.instructions)
+            exits = []
+            if node.condition:
+                self.temporaries = 0
+                exits = self.branch_if_false(node.condition)
+            self.compile_block(node.body)
+            if node.update:
+                self.compile_statement(node.update)
+            self.emit(LOOP, start)
+            self.patch(*exits)
+        finally:
+            self.scopes.pop()
+    
+    def compile_print_statement(self, node: PrintStatement):
+        register, value_type = self.compile_expression(node.expression)
+        self.emit(PRINT_OPCODES.get(value_type, PRINT_STRING), register)
+    
+    def compile_function_call(self, node: FunctionCall):
+        self.expr_function_call(node)
+    
+    def compile_return_statement(self, node: ReturnStatement):
+        # Programs are the body of main(), so return ends the program.
+        if node.value is None:
+            raise CompileError("return-statement with no value, in function returning 'int'")
+        register, value_type = self.compile_expression(node.value)
+        self.emit(RETURN, self.convert(register, value_type, INT))
+    
+    def compile_expression(self, node: ASTNode, target: Optional[int] = None) -> Tuple[int, str]:
+        # Returns the register holding the value and its type. Operations
+        # write to target when given, otherwise to a fresh temporary.
+        return self.expression_handlers[node.__class__](self, node, target)
+    
+    def destination(self, target: Optional[int]) -> int:
+        return self.temporary() if target is None else target
+    
+    def branch_if_false(self, node: ASTNode) -> List[int]:
+        # Emits the test for a condition and returns the jumps, still to be
+        # patched, that are taken when it is false. && and || jump straight
+        # to their targets instead of materialising a bool.
+        if isinstance(node, BinaryOp) and node.operator == '&&':
+            return self.branch_if_false(node.left) + self.branch_if_false(node.right)
+        if isinstance(node, BinaryOp) and node.operator == '||':
+            taken = self.branch_if_true(node.left)
+            exits = self.branch_if_false(node.right)
+            self.patch(*taken)
+            return exits
+        if isinstance(node, BinaryOp) and node.operator in COMPARISONS:
+            left, left_type = self.compile_expression(node.left)
+            right, right_type = self.compile_expression(node.right)
+            binary_operation(node.operator, left_type, right_type)
+            return [self.emit(BRANCH_OPCODES[node.operator], left, right)]
+        return [self.emit(JUMP_IF_FALSE, self.condition(node))]
+    
+    def branch_if_true(self, node: ASTNode) -> List[int]:
+        if isinstance(node, BinaryOp) and node.operator == '||':
+            return self.branch_if_true(node.left) + self.branch_if_true(node.right)
+        if isinstance(node, BinaryOp) and node.operator == '&&':
+            exits = self.branch_if_false(node.left)
+            taken = self.branch_if_true(node.right)
+            self.patch(*exits)
+            return taken
+        if isinstance(node, BinaryOp) and node.operator in COMPARISONS:
+            # Jumping when a < b is branching unless a >= b, which only
+            # holds while neither side can be NaN.
+            left, left_type = self.compile_expression(node.left)
+            right, right_type = self.compile_expression(node.right)
+            binary_operation(node.operator, left_type, right_type)
+            if node.operator in ('==', '!=') or DOUBLE not in (left_type, right_type):
+                return [self.emit(BRANCH_OPCODES[NEGATED_COMPARISONS[node.operator]], left, right)]
+            destination = self.temporary()
+            self.emit(COMPARISON_OPCODES[node.operator], destination, left, right)
+            return [self.emit(JUMP_IF_TRUE, destination)]
+        return [self.emit(JUMP_IF_TRUE, self.condition(node))]
+    
+    def condition(self, node: ASTNode) -> int:
+        register, value_type = self.compile_expression(node)
+        if condition_conversion(value_type) == 'true':
+            return self.constant(True)
+        return register
+    
+    def convert(self, register: int, source: str, target: str, destination: Optional[int] = None) -> int:
+        kind = conversion(source, target)
+        if kind is None:
+            return register
+        if kind == 'true':
+            return self.constant(True)
+        destination = self.destination(destination)
+        self.emit(CONVERSION_OPCODES[kind], destination, register)
+        return destination
+    
+    def expr_ast_node(self, node: ASTNode, target: Optional[int]) -> Tuple[int, str]:
+        raise CompileError(f"cannot evaluate {type(node).__name__}")
+    
+    def expr_number(self, node: Number, target: Optional[int]) -> Tuple[int, str]:
+        value, value_type = literal_value(node.value)
+        return self.constant(value), value_type
+    
+    def expr_string(self, node: String, target: Optional[int]) -> Tuple[int, str]:
+        return self.constant(decode_string(node.value)), CSTR
+    
+    def expr_identifier(self, node: Identifier, target: Optional[int]) -> Tuple[int, str]:
+        if node.name in ('true', 'false'):
+            return self.constant(node.name == 'true'), BOOL
+        slot, var_type = self.lookup(node.name)
+        return VARIABLE | slot, var_type
+    
+    def expr_unary_op(self, node: UnaryOp, target: Optional[int]) -> Tuple[int, str]:
+        operand, operand_type = self.compile_expression(node.operand)
+        kind, result_type = unary_operation(node.operator, operand_type)
+        if kind == 'false':
+            return self.constant(False), result_type
+        destination = self.destination(target)
+        self.emit(UNARY_OPCODES[kind], destination, operand)
+        return destination, result_type
+    
+    def expr_binary_op(self, node: BinaryOp, target: Optional[int]) -> Tuple[int, str]:
+        if node.operator in ('&&', '||'):
+            return self.logical(node, target)
+        left, left_type = self.compile_expression(node.left)
+        right, right_type = self.compile_expression(node.right)
+        kind, result_type = binary_operation(node.operator, left_type, right_type)
+        if kind == 'compare':
+            op = COMPARISON_OPCODES[node.operator]
+        elif kind == 'int':
+            op = INT_ARITHMETIC[node.operator]
+        else:
+            op = DOUBLE_ARITHMETIC[node.operator]
+        destination = self.destination(target)
+        self.emit(op, destination, left, right)
+        return destination, BOOL if kind == 'compare' else result_type
+    
+    def logical(self, node: BinaryOp, target: Optional[int]) -> Tuple[int, str]:
+        # Short-circuits: && leaves false as soon as an operand is false,
+        # || leaves true as soon as one is true. The result is written only
+        # once both branches are decided, since target may be an operand.
+        is_and = node.operator == '&&'
+        early = JUMP_IF_FALSE if is_and else JUMP_IF_TRUE
+        exits = [self.emit(early, self.condition(operand)) for operand in (node.left, node.right)]
+        destination = self.destination(target)
+        self.emit(MOVE, destination, self.constant(is_and))
+        done = self.emit(JUMP)
+        self.patch(*exits)
+        self.emit(MOVE, destination, self.constant(not is_and))
+        self.patch(done)
+        return destination, BOOL
+    
+    def expr_function_call(self, node: FunctionCall, target: Optional[int] = None) -> Tuple[int, str]:
+        raise CompileError(f"'{node.name}' was not declared in this scope")
+
+def compile_bytecode(program: Program) -> Bytecode:
+    return BytecodeCompiler().compile(program)
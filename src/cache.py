@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Running size of each cache directory used in this process, with the
+# stores made since it was last scanned. A store only walks the directory
+# when the total may be over the bound, or every RESCAN_INTERVAL stores to
+# pick up entries written by other processes.
+RESCAN_INTERVAL = 256
+# Eviction trims a cache over its bound to this fraction of it, so the
+# stores that follow have room before the next walk.
+EVICTION_LOW_WATER = 0.9
+directory_sizes: Dict[str, List[int]] = {}
+directory_sizes_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def compiler_fingerprint() -> str:
+    # Hash of the compiler's own sources, so any change to the lexer, parser
+    # or code generator invalidates every cached output.
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(SRC_DIR)):
+        if name.endswith('.py'):
+            digest.update(name.encode())
+            with open(os.path.join(SRC_DIR, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def default_cache_dir() -> str:
+    if os.environ.get('VOLTC_CACHE_DIR'):
+        return os.environ['VOLTC_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'voltc')
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class CompileCache:
+    # Content-addressed store of generated C++: entries are keyed by the hash
+    # of the source bytes, the compiler fingerprint and the compile options.
+    # Hits refresh an entry's mtime, and eviction removes the oldest entries
+    # once the total size exceeds max_bytes, which makes it an LRU. Stores
+    # keep a running total, so the directory is walked only when it may be
+    # over the bound (see RESCAN_INTERVAL).
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+    
+    def key(self, input_file: str, options: Optional[dict] = None) -> str:
+        digest = hashlib.sha256()
+        digest.update(compiler_fingerprint().encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        digest.update(file_digest(input_file).encode())
+        return digest.hexdigest()
+    
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.cpp')
+    
+    def fetch(self, key: str, output_file: str) -> bool:
+        entry = self.path(key)
+        try:
+            copy_atomic(entry, output_file)
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def store(self, key: str, output_file: str):
+        entry = self.path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        try:
+            replaced = os.path.getsize(entry)
+        except FileNotFoundError:
+            replaced = 0
+        copy_atomic(output_file, entry)
+        directory = os.path.abspath(self.directory)
+        with directory_sizes_lock:
+            usage = directory_sizes.get(directory)
+            if usage is not None:
+                usage[0] += os.path.getsize(output_file) - replaced
+                usage[1] += 1
+                if usage[0] <= self.max_bytes and usage[1] < RESCAN_INTERVAL:
+                    return
+        self.evict()
+    
+    def evict(self):
+        entries = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.cpp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        
+        if total > self.max_bytes:
+            entries.sort()
+            target = self.max_bytes * EVICTION_LOW_WATER
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        with directory_sizes_lock:
+            directory_sizes[os.path.abspath(self.directory)] = [total, 0]
+
+def copy_atomic(source: str, destination: str):
+    # Concurrent workers may write the same entry; each copies into its own
+    # temporary file and the final rename is atomic.
+    temp_file = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(source, temp_file)
+        os.replace(temp_file, destination)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+class LRUCache:
+    # Bounded, thread-safe in-memory cache. Entries older than ttl seconds are
+    # treated as misses (ttl of None or 0 disables expiry). With max_bytes,
+    # keys and values are str or bytes, and the least recently used entries
+    # are also evicted once their total length exceeds max_bytes.
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl or None
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self.remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.remove(key)
+            if self.max_bytes is not None:
+                # An entry that could never fit is not cached at all, rather
+                # than evicting everything else on its way out.
+                if len(key) + len(value) > self.max_bytes:
+                    return
+                self.size += len(key) + len(value)
+            self.entries[key] = (value, time.monotonic())
+            while len(self.entries) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+    
+    def remove(self, key: Hashable):
+        # Called with the lock held.
+        entry = self.entries.pop(key, None)
+        if entry is not None and self.max_bytes is not None:
+            self.size -= len(key) + len(entry[0])
+    
+    def discard(self, key: Hashable):
+        with self.lock:
+            self.remove(key)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+    
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+            if self.max_bytes is not None:
+                stats['bytes'] = self.size
+                stats['max_bytes'] = self.max_bytes
+            return stats
@@ -1,48 +1,111 @@
+import io
+from typing import Iterable, List, Optional, TextIO
 from src.ast_nodes import *
+from src.flat_ast import FlatAST
+from src.visitor import NodeVisitor
 
-class CodeGenerator:
-    def __init__(self):
+INDENTS = ["    " * level for level in range(32)]
+
+# The lines around the body of main(); statements are indented one level.
+PROLOGUE = ["#include <iostream>", "#include <string>", "", "int main() {"]
+EPILOGUE = [INDENTS[1] + "return 0;", "}"]
+
+class CodeGenerator(NodeVisitor):
+    TYPE_MAP = {
+        'int': 'int',
+        'float': 'double',
+        'string': 'std::string',
+        'bool': 'bool',
+        'void': 'void'
+    }
+    
+    def __init__(self, buffer_lines: int = 512):
         self.indent_level = 0
+        # Pending lines; flushed to self.sink whenever buffer_lines accumulate,
+        # so output memory stays bounded no matter how large the program is.
         self.output = []
+        self.sink: Optional[TextIO] = None
+        self.buffer_lines = buffer_lines
+        self.separator = ""
+        self.written = 0
+        # Statement handlers are generate_<node>, expression handlers expr_<node>;
+        # see NodeVisitor for how a node class is resolved to its handler.
+        self.statement_handlers = self.dispatch_table('generate_')
+        self.expression_handlers = self.dispatch_table('expr_')
+        self.join_handlers = self.dispatch_table('join_')
     
     def indent(self) -> str:
-        return "    " * self.indent_level
+        level = self.indent_level
+        return INDENTS[level] if level < len(INDENTS) else "    " * level
     
     def generate(self, node: ASTNode) -> str:
-        self.output = []
-        self.output.append("#include <iostream>")
-        self.output.append("#include <string>")
-        self.output.append("")
-        self.output.append("int main() {")
-        self.indent_level += 1
-        
+        sink = io.StringIO()
+        self.write(node, sink)
+        return sink.getvalue()
+    
+    def write(self, node: ASTNode, sink: TextIO) -> int:
+        # Streams the program to any text sink (file, io.StringIO, or a socket
+        # wrapped with makefile('w')) and returns the number of characters written.
         if isinstance(node, Program):
-            for statement in node.statements:
-                self.generate_statement(statement)
+            return self.write_statements(node.statements, sink)
+        if isinstance(node, FlatAST):
+            return self.write_statements(node.statements(), sink)
+        return self.write_statements([], sink)
+    
+    def write_statements(self, statements: Iterable[ASTNode], sink: TextIO) -> int:
+        # write() for top-level statements from any iterable; with a parser's
+        # iter_statements() the program is never held in memory as a whole.
+        self.sink = sink
+        self.output = []
+        self.separator = ""
+        self.written = 0
         
-        self.output.append(self.indent() + "return 0;")
+        self.output.extend(PROLOGUE)
+        self.indent_level += 1
+        self.generate_block(statements)
         self.indent_level -= 1
-        self.output.append("}")
+        self.output.extend(EPILOGUE)
+        self.flush()
         
-        return "\n".join(self.output)
+        return self.written
+    
+    def generate_fragment(self, node: ASTNode) -> str:
+        # The lines one top-level statement contributes to main(), so callers
+        # can cache them per statement and join them with assemble().
+        sink = io.StringIO()
+        self.sink = sink
+        self.output = []
+        self.separator = ""
+        self.written = 0
+        self.indent_level = 1
+        self.generate_statement(node)
+        self.indent_level = 0
+        self.flush()
+        return sink.getvalue()
+    
+    @staticmethod
+    def assemble(fragments: Iterable[str]) -> str:
+        return "\n".join([*PROLOGUE, *filter(None, fragments), *EPILOGUE])
+    
+    def flush(self):
+        if self.output:
+            text = self.separator + "\n".join(self.output)
+            self.sink.write(text)
+            self.written += len(text)
+            self.separator = "\n"
+            self.output = []
+    
+    def generate_block(self, statements: Iterable[ASTNode]):
+        for statement in statements:
+            self.generate_statement(statement)
+            if len(self.output) >= self.buffer_lines:
+                self.flush()
     
     def generate_statement(self, node: ASTNode):
-        if isinstance(node, VarDeclaration):
-            self.generate_var_declaration(node)
-        elif isinstance(node, Assignment):
-            self.generate_assignment(node)
-        elif isinstance(node, IfStatement):
-            self.generate_if_statement(node)
-        elif isinstance(node, WhileLoop):
-            self.generate_while_loop(node)
-        elif isinstance(node, ForLoop):
-            self.generate_for_loop(node)
-        elif isinstance(node, PrintStatement):
-            self.generate_print_statement(node)
-        elif isinstance(node, FunctionCall):
-            self.output.append(self.indent() + self.generate_expression(node) + ";")
-        elif isinstance(node, ReturnStatement):
-            self.generate_return_statement(node)
+        self.statement_handlers[node.__class__](self, node)
+    
+    def generate_ast_node(self, node: ASTNode):
+        pass
     
     def generate_var_declaration(self, node: VarDeclaration):
         cpp_type = self.map_type(node.var_type)
@@ -60,16 +123,14 @@ class CodeGenerator:
         condition = self.generate_expression(node.condition)
         self.output.append(f"{self.indent()}if ({condition}) {{")
         self.indent_level += 1
-        for stmt in node.then_block:
-            self.generate_statement(stmt)
+        self.generate_block(node.then_block)
         self.indent_level -= 1
         self.output.append(f"{self.indent()}}}")
         
         if node.else_block:
             self.output.append(f"{self.indent()}else {{")
             self.indent_level += 1
-            for stmt in node.else_block:
-                self.generate_statement(stmt)
+            self.generate_block(node.else_block)
             self.indent_level -= 1
             self.output.append(f"{self.indent()}}}")
     
@@ -77,8 +138,7 @@ class CodeGenerator:
         condition = self.generate_expression(node.condition)
         self.output.append(f"{self.indent()}while ({condition}) {{")
         self.indent_level += 1
-        for stmt in node.body:
-            self.generate_statement(stmt)
+        self.generate_block(node.body)
         self.indent_level -= 1
         self.output.append(f"{self.indent()}}}")
     
@@ -102,8 +162,7 @@ class CodeGenerator:
         
         self.output.append(f"{self.indent()}for ({init_str}; {condition_str}; {update_str}) {{")
         self.indent_level += 1
-        for stmt in node.body:
-            self.generate_statement(stmt)
+        self.generate_block(node.body)
         self.indent_level -= 1
         self.output.append(f"{self.indent()}}}")
     
@@ -111,6 +170,9 @@ class CodeGenerator:
         expr = self.generate_expression(node.expression)
         self.output.append(f'{self.indent()}std::cout << {expr} << std::endl;')
     
+    def generate_function_call(self, node: FunctionCall):
+        self.output.append(self.indent() + self.generate_expression(node) + ";")
+    
     def generate_return_statement(self, node: ReturnStatement):
         if node.value:
             expr = self.generate_expression(node.value)
@@ -119,40 +181,53 @@ class CodeGenerator:
             self.output.append(f"{self.indent()}return;")
     
     def generate_expression(self, node: ASTNode) -> str:
-        if isinstance(node, Number):
-            return node.value
-        elif isinstance(node, String):
-            return f'"{node.value}"'
-        elif isinstance(node, Identifier):
-            if node.name == 'true':
-                return 'true'
-            elif node.name == 'false':
-                return 'false'
-            return node.name
-        elif isinstance(node, BinaryOp):
-            left = self.generate_expression(node.left)
-            right = self.generate_expression(node.right)
-            op = node.operator
-            if op == '&&':
-                op = '&&'
-            elif op == '||':
-                op = '||'
-            return f"({left} {op} {right})"
-        elif isinstance(node, UnaryOp):
-            operand = self.generate_expression(node.operand)
-            return f"({node.operator}{operand})"
-        elif isinstance(node, FunctionCall):
-            args = ", ".join(self.generate_expression(arg) for arg in node.arguments)
-            return f"{node.name}({args})"
-        
+        # Post-order walk with an explicit stack, so expressions nested past
+        # Python's recursion limit still generate. Operators and calls are
+        # popped twice: first to schedule their operands, then (marked with
+        # their operand count) to join the operands' C++ from the results
+        # stack through the join_ handlers. Leaves go through the expr_
+        # handlers.
+        handlers = self.expression_handlers
+        join_handlers = self.join_handlers
+        results = []
+        stack = [(node, -1)]
+        while stack:
+            node, count = stack.pop()
+            if count >= 0:
+                operands = results[len(results) - count:]
+                del results[len(results) - count:]
+                results.append(join_handlers[node.__class__](self, node, operands))
+            elif isinstance(node, BinaryOp):
+                stack += ((node, 2), (node.right, -1), (node.left, -1))
+            elif isinstance(node, UnaryOp):
+                stack += ((node, 1), (node.operand, -1))
+            elif isinstance(node, FunctionCall):
+                stack.append((node, len(node.arguments)))
+                stack.extend((argument, -1) for argument in reversed(node.arguments))
+            else:
+                results.append(handlers[node.__class__](self, node))
+        return results[0]
+    
+    def join_binary_op(self, node: BinaryOp, operands: List[str]) -> str:
+        return f"({operands[0]} {node.operator} {operands[1]})"
+    
+    def join_unary_op(self, node: UnaryOp, operands: List[str]) -> str:
+        return f"({node.operator}{operands[0]})"
+    
+    def join_function_call(self, node: FunctionCall, operands: List[str]) -> str:
+        return f"{node.name}({', '.join(operands)})"
+    
+    def expr_ast_node(self, node: ASTNode) -> str:
         return ""
     
+    def expr_number(self, node: Number) -> str:
+        return node.value
+    
+    def expr_string(self, node: String) -> str:
+        return f'"{node.value}"'
+    
+    def expr_identifier(self, node: Identifier) -> str:
+        return node.name
+    
     def map_type(self, volt_type: str) -> str:
-        type_map = {
-            'int': 'int',
-            'float': 'double',
-            'string': 'std::string',
-            'bool': 'bool',
-            'void': 'void'
-        }
-        return type_map.get(volt_type, volt_type)
+        return self.TYPE_MAP.get(volt_type, volt_type)
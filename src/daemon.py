@@ -0,0 +1,214 @@
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict
+from typing import Iterator, List, Optional, Tuple
+from src.cache import CompileCache, compiler_fingerprint
+from src.jobs import CompileResult, default_output_path
+
+# Wire protocol: newline-delimited JSON over a Unix stream socket. The client
+# sends one request naming absolute input/output paths; the daemon answers
+# with one line per file, in request order, then a final {"done": true} line.
+
+def default_socket_path() -> str:
+    if os.environ.get('VOLTC_SOCKET'):
+        return os.environ['VOLTC_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"voltc-{os.getuid()}.sock")
+
+def cache_from_options(options: Optional[dict]) -> Optional[CompileCache]:
+    if not options:
+        return None
+    return CompileCache(options.get('directory'), options['max_bytes'])
+
+def cache_options(cache: Optional[CompileCache]) -> Optional[dict]:
+    if cache is None:
+        return None
+    return {'directory': cache.directory, 'max_bytes': cache.max_bytes}
+
+def compile_timed(input_file: str, output_file: str, cache: Optional[CompileCache], opt_level: int, target: str,
+                  use_mmap: bool) -> dict:
+    # One file's answer line, compiled in the daemon or one of its workers.
+    from src.driver import compile_file
+    start = time.perf_counter()
+    result = compile_file(input_file, output_file, cache, opt_level, target, use_mmap=use_mmap)
+    return {**asdict(result), 'elapsed_ms': (time.perf_counter() - start) * 1000}
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        if request.get('fingerprint') != compiler_fingerprint():
+            self.send({'error': 'stale daemon: compiler sources have changed'})
+            return
+        
+        options = (cache_from_options(request.get('cache')), request.get('opt_level', 0), request.get('target', 'cpp'),
+                   request.get('mmap', False))
+        files = request['files']
+        jobs = request.get('jobs', 1)
+        if jobs > 1 and len(files) > 1:
+            messages = self.compile_parallel(files, jobs, options)
+        else:
+            messages = (compile_timed(input_file, output_file, *options) for input_file, output_file in files)
+        for message in messages:
+            self.send(message)
+        self.send({'done': True})
+    
+    def compile_parallel(self, files: List[Tuple[str, str]], jobs: int, options: tuple) -> Iterator[dict]:
+        # At most jobs files of this request are in the shared worker pool
+        # at once; answers go back in request order.
+        pool = self.server.worker_pool()
+        pending = deque()
+        try:
+            for input_file, output_file in files:
+                pending.append(pool.submit(compile_timed, input_file, output_file, *options))
+                if len(pending) >= jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        except BrokenProcessPool:
+            self.server.discard_worker_pool(pool)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def send(self, message: dict):
+        self.wfile.write(json.dumps(message).encode() + b'\n')
+        self.wfile.flush()
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Batches sent with -j N are spread over worker processes shared by all
+    # requests and started by the first one. They come from a fork server
+    # with the compiler preloaded, not from this process, which may be
+    # forked while a request thread holds a lock.
+    daemon_threads = True
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.pool_lock = threading.Lock()
+    
+    def worker_pool(self) -> ProcessPoolExecutor:
+        with self.pool_lock:
+            if self.pool is None:
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['src.driver'])
+                self.pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=context)
+            return self.pool
+    
+    def discard_worker_pool(self, pool: ProcessPoolExecutor):
+        with self.pool_lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def server_close(self):
+        super().server_close()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+def create_server(socket_path: str) -> CompileServer:
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            raise RuntimeError(f"A voltc daemon is already listening on {socket_path}")
+        os.remove(socket_path)
+    
+    # The client only needs this module and the cache; the compiler itself
+    # is imported here, once, which is the start-up cost the daemon saves.
+    import src.driver
+    compiler_fingerprint()
+    return CompileServer(socket_path, CompileRequestHandler)
+
+def serve(server: CompileServer):
+    socket_path = server.server_address
+    with server:
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+def is_running(socket_path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def request_compile(socket_path: str, files: List[Tuple[str, Optional[str]]],
+                    cache: Optional[CompileCache] = None, opt_level: int = 0, target: str = 'cpp',
+                    timeout: float = 300, use_mmap: bool = False,
+                    jobs: int = 1) -> Optional[Iterator[Tuple[CompileResult, Optional[float]]]]:
+    # Returns None when no usable daemon is available, so the caller can
+    # compile in-process instead. Otherwise yields (result, server ms) pairs
+    # for every file; if the daemon stops answering partway, the files it
+    # did not answer for get an error result and no time.
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+    
+    paths = [(os.path.abspath(input_file), os.path.abspath(output_file or default_output_path(input_file, target)))
+             for input_file, output_file in files]
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(socket_path)
+        request = {
+            'fingerprint': compiler_fingerprint(),
+            'files': paths,
+            'cache': cache_options(cache),
+            'opt_level': opt_level,
+            'target': target,
+            'mmap': use_mmap,
+            'jobs': jobs,
+        }
+        client.sendall(json.dumps(request).encode() + b'\n')
+        reader = client.makefile('rb')
+        first = json.loads(reader.readline() or b'{}')
+    except (OSError, ValueError):
+        client.close()
+        return None
+    
+    if 'input_file' not in first and not first.get('done'):
+        client.close()
+        return None
+    
+    def read_message() -> Optional[dict]:
+        try:
+            message = json.loads(reader.readline())
+        except (OSError, ValueError):
+            return None
+        return message if isinstance(message, dict) and 'input_file' in message else None
+    
+    def results():
+        # The daemon only sees absolute paths; report them as the caller
+        # named them.
+        try:
+            message = first
+            for (input_file, output_file), (input_path, output_path) in zip(files, paths):
+                if message is None:
+                    yield CompileResult(input_file, error=f"Error: {input_file}: the compile daemon stopped "
+                                                          f"answering before this file"), None
+                    continue
+                elapsed_ms = message.pop('elapsed_ms')
+                result = CompileResult(**message)
+                result.input_file = input_file
+                if result.ok:
+                    result.output_file = output_file or default_output_path(input_file, target)
+                else:
+                    result.error = result.error.replace(input_path, input_file)
+                yield result, elapsed_ms
+                message = read_message()
+        finally:
+            reader.close()
+            client.close()
+    
+    return results()
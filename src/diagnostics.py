@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+
+@dataclass
+class Diagnostic:
+    message: str
+    line: int
+    column: int
+    
+    def __str__(self) -> str:
+        return f"{self.line}:{self.column}: {self.message}"
+
+class VoltSyntaxError(SyntaxError):
+    # A lexer or parser error at a known token. The text is the message the
+    # compiler has always printed, location included; diagnostic carries
+    # the message and location separately for structured reporting.
+    def __init__(self, message: str, line: int, column: int, show_column: bool = False):
+        location = f"line {line}, column {column}" if show_column else f"line {line}"
+        super().__init__(f"{message} at {location}")
+        self.diagnostic = Diagnostic(message, line, column)
+        self.show_column = show_column
+    
+    def __reduce__(self):
+        diagnostic = self.diagnostic
+        return VoltSyntaxError, (diagnostic.message, diagnostic.line, diagnostic.column, self.show_column)
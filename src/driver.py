@@ -0,0 +1,169 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Iterator, List, Optional
+from src.ast_nodes import Program
+from src.cache import CompileCache
+from src.lexer import Lexer, Token, is_scannable
+from src.parser import Parser
+from src.codegen import CodeGenerator
+from src.fragments import generate_cached
+from src.bytecode import compile_bytecode
+from src.pycodegen import PythonGenerator
+from src.optimizer import optimize_program
+from src.profiling import Profile, compile_profiled
+from src.jobs import CompileResult, default_output_path, expand_inputs
+
+# Larger files are streamed through the parser rather than read whole, so
+# they skip the statement fragment cache.
+FRAGMENT_CACHE_MAX_FILE = 1 << 20
+
+@contextmanager
+def file_tokens(input_file: str, use_mmap: bool = False) -> Iterator[Iterator[Token]]:
+    # Tokens pulled lazily from the file while parsing, so only a chunk of
+    # source and a few tokens of lookahead are held at a time. With use_mmap
+    # an ASCII file with \n line ends is mapped into memory and lexed from
+    # its bytes, with no text decoding or chunk copies; other files are read
+    # as text.
+    if use_mmap:
+        with open(input_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if is_scannable(data):
+                        # The scanner holds the mapping until its generator
+                        # is closed, and an exported mapping cannot be closed.
+                        tokens = Lexer.from_buffer(data).iter_tokens()
+                        try:
+                            yield tokens
+                        finally:
+                            tokens.close()
+                        return
+    with open(input_file, 'r') as f:
+        yield Lexer.from_file(f).iter_tokens()
+
+def parse_file(input_file: str, use_mmap: bool = False) -> Program:
+    with file_tokens(input_file, use_mmap) as tokens:
+        return Parser(tokens).parse()
+
+def compile_file(input_file: str, output_file: Optional[str] = None,
+                 cache: Optional[CompileCache] = None, opt_level: int = 0,
+                 target: str = 'cpp', profile: Optional[str] = None, use_mmap: bool = False) -> CompileResult:
+    # The lexer -> parser -> codegen pipeline for one file, producing C++,
+    # VM bytecode or a Python script. Failures are returned rather than
+    # raised so a batch can carry on past them. profile is 'timings' or
+    # 'memory' to time each phase (and trace its allocations) instead.
+    # Unoptimized C++ for files too large for the fragment cache (or read
+    # with use_mmap) is generated statement by statement as they are parsed.
+    if not os.path.exists(input_file):
+        return CompileResult(input_file, error=f"Error: File '{input_file}' not found")
+    
+    if output_file is None:
+        output_file = default_output_path(input_file, target)
+    if profile is not None:
+        return profile_file(input_file, output_file, opt_level, target, profile == 'memory')
+    
+    try:
+        if cache is not None:
+            options = {}
+            if opt_level:
+                options['opt_level'] = opt_level
+            if target != 'cpp':
+                options['target'] = target
+            key = cache.key(input_file, options)
+            if cache.fetch(key, output_file):
+                return CompileResult(input_file, output_file, cache_hit=True)
+        
+        stats = {}
+        cpp_code = None
+        ast = None
+        if target == 'cpp' and not opt_level:
+            if not use_mmap and os.path.getsize(input_file) <= FRAGMENT_CACHE_MAX_FILE:
+                with open(input_file, 'r') as f:
+                    cpp_code = generate_cached(f.read())
+        else:
+            ast = optimize_program(parse_file(input_file, use_mmap), opt_level, stats)
+        
+        # Output is written to a temporary file next to the target and moved
+        # into place once complete, so a failed run never leaves a partial file.
+        temp_file = output_file + '.tmp'
+        try:
+            if target == 'bytecode':
+                bytecode = compile_bytecode(ast)
+                with open(temp_file, 'wb') as f:
+                    f.write(bytecode.to_bytes())
+            elif target == 'python':
+                with open(temp_file, 'w') as f:
+                    PythonGenerator().write(ast, f)
+            elif cpp_code is not None:
+                with open(temp_file, 'w') as f:
+                    f.write(cpp_code)
+            elif ast is None:
+                with file_tokens(input_file, use_mmap) as tokens, open(temp_file, 'w') as f:
+                    CodeGenerator().write_statements(Parser(tokens).iter_statements(), f)
+            else:
+                codegen = CodeGenerator()
+                with open(temp_file, 'w') as f:
+                    codegen.write(ast, f)
+            os.replace(temp_file, output_file)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        
+        stats = stats or None
+        if cache is None:
+            return CompileResult(input_file, output_file, optimizer_stats=stats)
+        cache.store(key, output_file)
+        return CompileResult(input_file, output_file, cache_hit=False, optimizer_stats=stats)
+        
+    except SyntaxError as e:
+        return CompileResult(input_file, error=f"Syntax Error: {e}")
+    except Exception as e:
+        return CompileResult(input_file, error=f"Error: {e}")
+
+def profile_file(input_file: str, output_file: str, opt_level: int, target: str,
+                 memory: bool) -> CompileResult:
+    # compile_file without the output cache, with each phase run to
+    # completion and timed on its own.
+    profile = Profile(input_file, memory)
+    stats = {}
+    try:
+        with profile.phase('read'):
+            with open(input_file, 'r') as f:
+                source = f.read()
+        output = compile_profiled(source, profile, opt_level, target, stats)
+        with profile.phase('write'):
+            temp_file = output_file + '.tmp'
+            try:
+                with open(temp_file, 'wb' if isinstance(output, bytes) else 'w') as f:
+                    f.write(output)
+                os.replace(temp_file, output_file)
+            except BaseException:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                raise
+    except SyntaxError as e:
+        error = f"Syntax Error: {e}"
+    except Exception as e:
+        error = f"Error: {e}"
+    else:
+        return CompileResult(input_file, output_file, optimizer_stats=stats or None, profile=profile.finish())
+    return CompileResult(input_file, error=error, profile=profile.finish(error))
+
+def compile_many(input_files: List[str], jobs: int = 1, cache: Optional[CompileCache] = None,
+                 opt_level: int = 0, target: str = 'cpp', profile: Optional[str] = None,
+                 use_mmap: bool = False) -> Iterator[CompileResult]:
+    # Results are yielded in input order. A single job (or a single file)
+    # compiles in-process; otherwise files are spread over worker processes
+    # in chunks to amortise the inter-process round trips.
+    compile_one = partial(compile_file, cache=cache, opt_level=opt_level, target=target, profile=profile,
+                          use_mmap=use_mmap)
+    if jobs <= 1 or len(input_files) <= 1:
+        yield from map(compile_one, input_files)
+        return
+    
+    chunksize = max(1, len(input_files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(compile_one, input_files, chunksize=chunksize)
@@ -0,0 +1,191 @@
+from array import array
+from dataclasses import fields
+from typing import Dict, Iterator, List, Optional, Tuple, Union, get_args, get_origin
+from src import ast_nodes
+from src.ast_nodes import *
+
+STR_FIELD = 0
+NODE_FIELD = 1
+LIST_FIELD = 2
+
+def field_kind(annotation) -> int:
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if annotation is str:
+        return STR_FIELD
+    if get_origin(annotation) is list:
+        return LIST_FIELD
+    return NODE_FIELD
+
+# Taken from the module namespace rather than ASTNode.__subclasses__(), which
+# also lists the pre-slots classes that @dataclass(slots=True) replaces.
+NODE_TYPES = [
+    value for value in vars(ast_nodes).values()
+    if isinstance(value, type) and issubclass(value, ASTNode) and value is not ASTNode
+]
+NODE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+NODE_SCHEMAS: List[Tuple[Tuple[str, int], ...]] = [
+    tuple((field.name, field_kind(field.type)) for field in fields(node_type))
+    for node_type in NODE_TYPES
+]
+MAX_FIELDS = max(len(schema) for schema in NODE_SCHEMAS)
+
+class FlatAST:
+    # Index-based AST: node i is row i of a set of typed columns. Every field
+    # slot holds an int -- a string pool id, a child row, or an offset into
+    # `lists` where a length-prefixed run of child rows starts. -1 is None.
+    def __init__(self):
+        self.kinds = array('B')
+        self.slots = [array('i') for _ in range(MAX_FIELDS)]
+        self.lists = array('i')
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.root = -1
+    
+    @classmethod
+    def from_tree(cls, node: ASTNode) -> 'FlatAST':
+        flat = cls()
+        flat.root = flat.add(node)
+        return flat
+    
+    def __len__(self) -> int:
+        return len(self.kinds)
+    
+    def intern(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+        return string_id
+    
+    def add(self, node: ASTNode) -> int:
+        # Rows are written top-down with an explicit stack, so nesting depth
+        # is bounded only by memory: a node's row is appended with -1 in its
+        # child slots (and a run of -1s in lists for each child list), and
+        # each child writes its row into that place once it is added.
+        kinds = self.kinds
+        slots = self.slots
+        lists = self.lists
+        first = len(kinds)
+        stack = [(node, None, 0)]
+        while stack:
+            node, column, position = stack.pop()
+            index = len(kinds)
+            if column is not None:
+                column[position] = index
+            code = NODE_CODES[type(node)]
+            kinds.append(code)
+            schema = NODE_SCHEMAS[code]
+            pending = []
+            for slot in range(MAX_FIELDS):
+                value = -1
+                if slot < len(schema):
+                    name, kind = schema[slot]
+                    field = getattr(node, name)
+                    if field is None:
+                        pass
+                    elif kind == STR_FIELD:
+                        value = self.intern(field)
+                    elif kind == NODE_FIELD:
+                        pending.append((field, slots[slot], index))
+                    else:
+                        value = len(lists)
+                        lists.append(len(field))
+                        lists.extend([-1] * len(field))
+                        pending.extend((child, lists, value + 1 + offset) for offset, child in enumerate(field))
+                slots[slot].append(value)
+            stack.extend(reversed(pending))
+        return first
+    
+    def node_type(self, index: int) -> type:
+        return NODE_TYPES[self.kinds[index]]
+    
+    def child_list(self, offset: int) -> List[int]:
+        count = self.lists[offset]
+        return list(self.lists[offset + 1:offset + 1 + count])
+    
+    def field(self, index: int, name: str) -> Union[str, int, List[int], None]:
+        for slot, (field_name, kind) in enumerate(NODE_SCHEMAS[self.kinds[index]]):
+            if field_name == name:
+                value = self.slots[slot][index]
+                if value == -1:
+                    return None
+                if kind == STR_FIELD:
+                    return self.strings[value]
+                if kind == LIST_FIELD:
+                    return self.child_list(value)
+                return value
+        raise AttributeError(f"{self.node_type(index).__name__} has no field '{name}'")
+    
+    def children(self, index: int) -> List[int]:
+        result = []
+        for slot, (_, kind) in enumerate(NODE_SCHEMAS[self.kinds[index]]):
+            value = self.slots[slot][index]
+            if value == -1 or kind == STR_FIELD:
+                continue
+            if kind == NODE_FIELD:
+                result.append(value)
+            else:
+                result.extend(self.child_list(value))
+        return result
+    
+    def walk(self, index: Optional[int] = None) -> Iterator[int]:
+        stack = [self.root if index is None else index]
+        while stack:
+            index = stack.pop()
+            yield index
+            stack.extend(reversed(self.children(index)))
+    
+    def to_tree(self, index: Optional[int] = None) -> ASTNode:
+        # Decodes rows top-down with an explicit stack: a node is built with
+        # its strings, None for its child nodes and empty child lists, and
+        # each child is attached to its parent as it is decoded in turn.
+        kinds = self.kinds
+        slots = self.slots
+        lists = self.lists
+        strings = self.strings
+        root: List[ASTNode] = []
+        stack = [(self.root if index is None else index, root, None)]
+        while stack:
+            index, parent, name = stack.pop()
+            code = kinds[index]
+            schema = NODE_SCHEMAS[code]
+            values = []
+            for slot, (_, kind) in enumerate(schema):
+                value = slots[slot][index]
+                if kind == STR_FIELD and value != -1:
+                    values.append(strings[value])
+                elif kind == LIST_FIELD and value != -1:
+                    values.append([])
+                else:
+                    values.append(None)
+            node = NODE_TYPES[code](*values)
+            if name is None:
+                parent.append(node)
+            else:
+                setattr(parent, name, node)
+            
+            for slot in range(len(schema) - 1, -1, -1):
+                field_name, kind = schema[slot]
+                value = slots[slot][index]
+                if value == -1 or kind == STR_FIELD:
+                    continue
+                if kind == NODE_FIELD:
+                    stack.append((value, node, field_name))
+                else:
+                    children = values[slot]
+                    rows = lists[value + 1:value + 1 + lists[value]]
+                    stack.extend((child, children, None) for child in reversed(rows))
+        return root[0]
+    
+    def statements(self) -> Iterator[ASTNode]:
+        # Top-level statements are decoded back into trees one at a time, so a
+        # consumer such as CodeGenerator, which generates from trees rather
+        # than from the columns, only ever holds a single statement's subtree.
+        for index in self.field(self.root, 'statements'):
+            yield self.to_tree(index)
+    
+    def nbytes(self) -> int:
+        columns = [self.kinds, self.lists, *self.slots]
+        return sum(column.itemsize * len(column) for column in columns)
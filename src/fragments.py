@@ -0,0 +1,95 @@
+import re
+from typing import List, Optional, Tuple
+from src.cache import LRUCache
+from src.codegen import CodeGenerator
+from src.lexer import STRING_BODY_PATTERN, Lexer, TokenType
+from src.parser import Parser
+
+# Generated C++ for top-level statements, keyed by the statement's text. The
+# fragment a statement contributes to main() depends on nothing but its own
+# tree, so it can be reused wherever the same text turns up again. The cache
+# is bounded by the length of its texts and fragments as well as their
+# number, and statements longer than FRAGMENT_MAX_TEXT are not cached: a
+# large statement seldom turns up again, and would push out many small ones.
+FRAGMENT_CACHE_BYTES = 64 << 20
+FRAGMENT_MAX_TEXT = 4096
+fragment_cache = LRUCache(65536, max_bytes=FRAGMENT_CACHE_BYTES)
+
+# All the splitter needs to see of a program: strings and comments, which
+# may contain anything, and the brackets and semicolons statements end on.
+BOUNDARY_PATTERN = re.compile(r'"' + STRING_BODY_PATTERN.pattern + r'"?|//[^\n]*|([({])|(\))|(\})|(;)')
+TRIVIA_PATTERN = re.compile(r'(?:[ \t\r\n]+|//[^\n]*)*')
+ELSE_PATTERN = re.compile(r'else\b')
+
+def split_statements(source: str) -> Optional[List[Tuple[int, int]]]:
+    # Spans of the top-level statements, found without lexing: a statement
+    # ends on a semicolon outside any bracket, or on the closing brace of a
+    # block unless an else follows. Returns None when the brackets do not
+    # balance or text is left over, which only an invalid program has.
+    spans = []
+    start = TRIVIA_PATTERN.match(source).end()
+    depth = 0
+    for match in BOUNDARY_PATTERN.finditer(source, start):
+        kind = match.lastindex
+        if kind is None:
+            continue
+        if kind == 1:
+            depth += 1
+            continue
+        if kind != 4:
+            depth -= 1
+            if depth < 0:
+                return None
+        if depth or kind == 2:
+            continue
+        end = match.end()
+        following = TRIVIA_PATTERN.match(source, end).end()
+        if kind == 3 and ELSE_PATTERN.match(source, following):
+            continue
+        spans.append((start, end))
+        start = following
+    if depth or start != len(source):
+        return None
+    return spans
+
+def generate_statements(texts: List[str]) -> Optional[List[str]]:
+    # Fragments for statements given as text, parsed together in one pass.
+    # Each text starts a line of its own, so the parser must be at column 1
+    # of the right line before every statement; if not, or if any text fails
+    # to parse, the split is not trusted and None is returned.
+    try:
+        parser = Parser(Lexer("\n".join(texts)).tokenize())
+        generator = CodeGenerator()
+        fragments = []
+        line = 1
+        for text in texts:
+            token = parser.current_token()
+            if token.type == TokenType.EOF or token.line != line or token.column != 1:
+                return None
+            fragments.append(generator.generate_fragment(parser.parse_statement()))
+            line += text.count('\n') + 1
+        if parser.current_token().type != TokenType.EOF:
+            return None
+    except SyntaxError:
+        return None
+    return fragments
+
+def generate_cached(source: str, cache: LRUCache = fragment_cache) -> str:
+    # Unoptimized C++ for a program, parsing and generating only statements
+    # the cache has not seen. Identical statements within the program share
+    # one parse. Anything the fast path cannot handle, syntax errors included,
+    # goes through the full pipeline, so errors carry the right lines.
+    spans = split_statements(source)
+    if spans is not None:
+        texts = [source[start:end] for start, end in spans]
+        fragments = [cache.get(text) if len(text) <= FRAGMENT_MAX_TEXT else None for text in texts]
+        missing = list(dict.fromkeys(text for text, fragment in zip(texts, fragments) if fragment is None))
+        generated = generate_statements(missing) if missing else []
+        if generated is not None:
+            new = dict(zip(missing, generated))
+            for text, fragment in new.items():
+                if len(text) <= FRAGMENT_MAX_TEXT:
+                    cache.put(text, fragment)
+            return CodeGenerator.assemble([new[text] if fragment is None else fragment
+                                           for text, fragment in zip(texts, fragments)])
+    return CodeGenerator().generate(Parser(Lexer(source).tokenize()).parse())
@@ -0,0 +1,211 @@
+import threading
+from bisect import bisect_right
+from dataclasses import asdict
+from typing import Iterable, List, Optional, Tuple
+from src.ast_nodes import *
+from src.codegen import CodeGenerator
+from src.lexer import ASCII_TOKEN_PATTERN, Lexer, Token, TokenType, unicode_token_pattern
+from src.optimizer import optimize_program
+from src.parser import Parser, diagnose
+
+STATS = ('relexed', 'reparsed', 'reused', 'regenerated')
+
+def copy_tree(value):
+    # copy.deepcopy without the memo bookkeeping, several times faster on
+    # large programs. Node fields are the dataclass slots, in order.
+    if isinstance(value, list):
+        return [copy_tree(item) for item in value]
+    if isinstance(value, ASTNode):
+        return value.__class__(*[copy_tree(getattr(value, name)) for name in value.__slots__])
+    return value
+
+class RegionTooSmall(Exception):
+    # The edited region does not end on a statement boundary, so it has to
+    # take in the next statement before it can be parsed on its own.
+    pass
+
+class EditSession:
+    # A source buffer kept parsed as its top-level statements. Each statement
+    # owns the text from its first token up to the next statement, along with
+    # its AST and generated C++. An edit re-lexes and re-parses only the
+    # statements it touches, widening the region while its end falls inside
+    # a token, comment or unfinished statement, and everything else keeps
+    # its tree and C++. A region that fails to parse stays marked dirty and
+    # is parsed again with the next edit.
+    def __init__(self, source: str = ''):
+        self.source = source
+        self.version = 0
+        self.lock = threading.Lock()
+        self.starts: List[int] = []
+        self.statements: List[Optional[ASTNode]] = []
+        self.fragments: List[Optional[str]] = []
+        self.error: Optional[str] = None
+        self.stats = dict.fromkeys(STATS, 0)
+        self.reparse(0, 0)
+    
+    def apply(self, edits: Iterable[dict]):
+        # Edits are {start, end, text} with offsets into the source as left
+        # by the previous edit.
+        self.stats = dict.fromkeys(STATS, 0)
+        for edit in edits:
+            self.replace(int(edit['start']), int(edit['end']), str(edit['text']))
+        self.version += 1
+    
+    def replace(self, start: int, end: int, text: str):
+        if not 0 <= start <= end <= len(self.source):
+            raise ValueError(f"edit {start}-{end} is outside the source (length {len(self.source)})")
+        self.source = self.source[:start] + text + self.source[end:]
+        delta = len(text) - (end - start)
+        first = self.segment_at(start)
+        last = self.segment_at(max(start, end - 1)) + 1
+        if first and start == self.starts[first]:
+            # Text typed in front of a statement may continue the one
+            # before it, as an else does.
+            first -= 1
+        dirty = [index for index, statement in enumerate(self.statements) if statement is None]
+        if dirty:
+            first = min(first, dirty[0])
+            last = max(last, dirty[-1] + 1)
+        last = min(last, len(self.starts))
+        for index in range(last, len(self.starts)):
+            self.starts[index] += delta
+        self.reparse(first, last)
+    
+    def segment_at(self, offset: int) -> int:
+        return max(0, bisect_right(self.starts, offset) - 1)
+    
+    def reparse(self, first: int, last: int):
+        # Replaces statements first..last-1 with whatever their text parses
+        # to now, taking in following statements until the region parses. A
+        # region that fails is tried once more with the statement before it,
+        # which it may be the rest of.
+        retried = False
+        while True:
+            start = self.starts[first] if first and first < len(self.starts) else 0
+            end = self.starts[last] if last < len(self.starts) else len(self.source)
+            try:
+                starts, statements = self.parse_region(start, end, last == len(self.starts))
+                break
+            except RegionTooSmall:
+                last += 1
+            except SyntaxError as e:
+                if first and not retried:
+                    first -= 1
+                    retried = True
+                    continue
+                self.error = f"Syntax Error: {e}"
+                self.splice(first, last, [start], [None])
+                return
+        
+        self.error = None
+        self.splice(first, last, starts, statements)
+    
+    def splice(self, first: int, last: int, starts: List[int], statements: List[Optional[ASTNode]]):
+        # Statements that come back unchanged at either end of the region
+        # keep their old tree and C++.
+        old_statements = self.statements[first:last]
+        old_fragments = self.fragments[first:last]
+        fragments: List[Optional[str]] = [None] * len(statements)
+        count = min(len(statements), len(old_statements))
+        prefix = 0
+        while prefix < count and statements[prefix] is not None and statements[prefix] == old_statements[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < count - prefix and statements[-1 - suffix] is not None \
+                and statements[-1 - suffix] == old_statements[-1 - suffix]:
+            suffix += 1
+        for index in [*range(prefix), *range(len(statements) - suffix, len(statements))]:
+            old_index = index if index < prefix else index - len(statements) + len(old_statements)
+            statements[index] = old_statements[old_index]
+            fragments[index] = old_fragments[old_index]
+        
+        self.stats['reparsed'] += len(statements)
+        self.stats['reused'] += prefix + suffix
+        self.starts[first:last] = starts
+        self.statements[first:last] = statements
+        self.fragments[first:last] = fragments
+    
+    def parse_region(self, start: int, end: int, final: bool) -> Tuple[List[int], List[ASTNode]]:
+        source = self.source
+        self.stats['relexed'] += end - start
+        try:
+            store = Lexer(source[start:end]).tokenize_compact()
+        except SyntaxError:
+            # Lex everything up to the region again for a message with the
+            # buffer's line and column.
+            Lexer(source[:end]).tokenize_compact()
+            raise
+        if not final:
+            self.check_boundary(start, end, store)
+        
+        # Tokens carry lines and columns relative to the region; shift them
+        # so errors point into the whole buffer.
+        line = source.count('\n', 0, start) + 1
+        column = start - source.rfind('\n', 0, start)
+        tokens: List[Token] = []
+        for index in range(len(store)):
+            token = store[index]
+            if token.line == 1:
+                token.column += column - 1
+            token.line += line - 1
+            tokens.append(token)
+        
+        parser = Parser(tokens)
+        starts = []
+        statements = []
+        try:
+            while parser.current_token().type != TokenType.EOF:
+                starts.append(start + store.starts[parser.stream.position])
+                statements.append(parser.parse_statement())
+        except SyntaxError:
+            if not final and parser.current_token().type == TokenType.EOF:
+                raise RegionTooSmall() from None
+            raise
+        return starts, statements
+    
+    def check_boundary(self, start: int, end: int, store) -> None:
+        # The region must lex the same as the whole buffer: its last token
+        # cannot run on past end, and nothing after it (an unterminated
+        # string or a comment) may swallow the next statement's first token.
+        source = self.source
+        pattern = ASCII_TOKEN_PATTERN if source.isascii() else unicode_token_pattern()
+        position = start
+        count = len(store) - 1
+        if count:
+            last = start + store.starts[count - 1]
+            position = pattern.match(source, last).end()
+            if position != start + store.ends[count - 1]:
+                raise RegionTooSmall()
+        match = pattern.match(source, position)
+        if match.start(match.lastgroup) != end:
+            raise RegionTooSmall()
+    
+    def cpp_code(self) -> str:
+        generator = CodeGenerator()
+        for index, fragment in enumerate(self.fragments):
+            if fragment is None:
+                self.fragments[index] = generator.generate_fragment(self.statements[index])
+                self.stats['regenerated'] += 1
+        return CodeGenerator.assemble(self.fragments)
+    
+    def compile(self, opt_level: int = 0) -> dict:
+        # The /compile response for the current source. The optimizer works
+        # on the whole program and rewrites it in place, so optimized output
+        # is generated from a copy of the cached statements.
+        if self.error is not None:
+            errors = [asdict(diagnostic) for diagnostic in diagnose(self.source)]
+            return {'success': False, 'error': self.error, 'errors': errors, 'version': self.version}
+        try:
+            if opt_level:
+                stats = {}
+                program = optimize_program(Program(copy_tree(self.statements)), opt_level, stats)
+                response = {'success': True, 'cpp_code': CodeGenerator().generate(program)}
+                if stats:
+                    response['optimizer_stats'] = stats
+            else:
+                response = {'success': True, 'cpp_code': self.cpp_code()}
+        except Exception as e:
+            return {'success': False, 'error': f'Error: {str(e)}', 'version': self.version}
+        response['version'] = self.version
+        response['incremental'] = dict(self.stats)
+        return response
@@ -0,0 +1,525 @@
+import io
+import itertools
+import math
+import operator
+import re
+import sys
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+from src.ast_nodes import *
+from src.optimizer import INT, DOUBLE, BOOL, CSTR, STRING, VAR_TYPES, ARITHMETIC, COMPARISONS, INT_MAX
+from src.visitor import NodeVisitor
+
+# Runs programs the way the generated C++ built with g++ -fwrapv would: int
+# arithmetic wraps at 32 bits, integer division truncates and print uses
+# std::cout formatting (bools as 1/0, doubles with 6 significant digits).
+
+INT_MIN = -INT_MAX - 1
+DEFAULTS = {INT: 0, DOUBLE: 0.0, BOOL: False, STRING: ''}
+COMPARE = {
+    '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '>': operator.gt,
+    '<=': operator.le, '>=': operator.ge,
+}
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', 'a': '\a', 'b': '\b', 'f': '\f', 'v': '\v'}
+ESCAPE = re.compile(r'\\(.)', re.S)
+# Limited loops read the clock once every CLOCK_INTERVAL iterations.
+CLOCK_INTERVAL = 4096
+
+Compiled = Callable[[], object]
+Typed = Tuple[Compiled, str]
+
+class CompileError(Exception):
+    # The program would be rejected by the C++ compiler.
+    pass
+
+class VoltRuntimeError(Exception):
+    # The compiled program would trap, or a resource limit was hit.
+    pass
+
+class IterationLimitExceeded(VoltRuntimeError):
+    pass
+
+class OutputLimitExceeded(VoltRuntimeError):
+    pass
+
+class StringLimitExceeded(VoltRuntimeError):
+    pass
+
+class TimeLimitExceeded(VoltRuntimeError):
+    pass
+
+class ProgramExit(Exception):
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+class OutputBuffer(io.StringIO):
+    # In-memory sink that refuses to grow past limit characters.
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.size = 0
+    
+    def write(self, text: str) -> int:
+        self.size += len(text)
+        if self.size > self.limit:
+            raise OutputLimitExceeded(f"output limit of {self.limit} characters exceeded")
+        return super().write(text)
+
+def wrap_int(value: int) -> int:
+    return ((value - INT_MIN) & 0xFFFFFFFF) + INT_MIN
+
+def double_to_int(value: float) -> int:
+    if not math.isfinite(value):
+        raise VoltRuntimeError(f"conversion of {value} to int")
+    return wrap_int(int(value))
+
+def divide_int(left: int, right: int) -> int:
+    if right == 0:
+        raise VoltRuntimeError("integer division by zero")
+    quotient = abs(left) // abs(right)
+    return wrap_int(-quotient if (left < 0) != (right < 0) else quotient)
+
+def modulo_int(left: int, right: int) -> int:
+    if right == 0:
+        raise VoltRuntimeError("integer division by zero")
+    remainder = abs(left) % abs(right)
+    return -remainder if left < 0 else remainder
+
+def divide_double(left: float, right: float) -> float:
+    if right:
+        return left / right
+    if left == 0 or math.isnan(left):
+        return math.nan
+    return math.copysign(math.inf, left) * math.copysign(1.0, right)
+
+def format_double(value: float) -> str:
+    return '%g' % value
+
+def decode_string(value: str) -> str:
+    # A literal is a const char*, so it ends at the first \0.
+    text = ESCAPE.sub(lambda match: ESCAPES.get(match.group(1), match.group(1)), value)
+    return text.split('\0', 1)[0]
+
+def constant(value) -> Compiled:
+    # A C-level callable returning value: cheaper to call than a lambda.
+    return itertools.repeat(value).__next__
+
+def nothing():
+    pass
+
+# Static typing shared by the interpreter and the bytecode compiler: each
+# function checks its operands as g++ would and names the operation to use.
+
+def literal_value(text: str) -> Tuple[object, str]:
+    try:
+        if '.' in text:
+            return float(text), DOUBLE
+        # A leading zero makes an octal literal in C++.
+        value = int(text, 8) if len(text) > 1 and text[0] == '0' else int(text)
+    except ValueError:
+        raise CompileError(f"invalid number '{text}'") from None
+    if value > INT_MAX:
+        raise CompileError(f"integer literal {text} is too large for int")
+    return value, INT
+
+def conversion(source: str, target: str) -> Optional[str]:
+    # None when a value of the source type can be used as is.
+    if source == target or (target == STRING and source == CSTR):
+        return None
+    if target == INT and source == BOOL:
+        return 'bool_to_int'
+    if target == INT and source == DOUBLE:
+        return 'double_to_int'
+    if target == DOUBLE and source in (INT, BOOL):
+        return 'to_double'
+    if target == BOOL and source in (INT, DOUBLE):
+        return 'to_bool'
+    if target == BOOL and source == CSTR:
+        return 'true'
+    raise CompileError(f"cannot convert '{source}' to '{target}'")
+
+def condition_conversion(value_type: str) -> Optional[str]:
+    # Python truthiness of int, double and bool matches C++; a string
+    # literal is a non-null pointer.
+    if value_type in ARITHMETIC:
+        return None
+    if value_type == CSTR:
+        return 'true'
+    raise CompileError(f"could not convert '{value_type}' to 'bool'")
+
+def unary_operation(op: str, operand_type: str) -> Tuple[str, str]:
+    if op == '!' and operand_type in ARITHMETIC:
+        return 'not', BOOL
+    if op == '!' and operand_type == CSTR:
+        return 'false', BOOL
+    if op == '-' and operand_type == DOUBLE:
+        return 'negate', DOUBLE
+    if op == '-' and operand_type in (INT, BOOL):
+        return 'negate_int', INT
+    raise CompileError(f"invalid operand of type '{operand_type}' to unary 'operator{op}'")
+
+def binary_operation(op: str, left_type: str, right_type: str) -> Tuple[str, str]:
+    # Returns the kind of operation ('compare', 'int', 'double' or 'concat')
+    # and its result type. && and || take their operands as conditions.
+    if left_type in ARITHMETIC and right_type in ARITHMETIC:
+        if op in COMPARISONS:
+            return 'compare', BOOL
+        if DOUBLE not in (left_type, right_type):
+            return 'int', INT
+        if op != '%':
+            return 'double', DOUBLE
+    strings = (CSTR, STRING)
+    if left_type in strings and right_type in strings:
+        if op in COMPARISONS:
+            return 'compare', BOOL
+        if op == '+' and STRING in (left_type, right_type):
+            return 'concat', STRING
+    raise CompileError(f"invalid operands of types '{left_type}' and '{right_type}' to binary 'operator{op}'")
+
+class SlotResolver(NodeVisitor):
+    # Block scoping as in C++, with every declaration given its own slot, so
+    # a program's variables live in one flat list indexed at compile time.
+    def __init__(self):
+        self.scopes: List[Dict[str, Tuple[int, str]]] = [{}]
+        self.slot_count = 0
+    
+    def declare(self, name: str, var_type: str) -> Tuple[int, str]:
+        scope = self.scopes[-1]
+        if name in scope:
+            raise CompileError(f"redeclaration of '{name}'")
+        if var_type not in VAR_TYPES:
+            raise CompileError(f"variable '{name}' declared {var_type}")
+        scope[name] = (self.slot_count, VAR_TYPES[var_type])
+        self.slot_count += 1
+        return scope[name]
+    
+    def lookup(self, name: str) -> Tuple[int, str]:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise CompileError(f"'{name}' was not declared in this scope")
+
+class Interpreter(SlotResolver):
+    # Compiles the AST into nested closures, one per node, and runs them.
+    # Variables are resolved to indices in one slot list at compile time, so
+    # the running program never looks a name up, and each closure is
+    # specialised on the static C++ types of its operands. Loops count
+    # against max_iterations and check the time_limit in seconds when they
+    # are set; concatenation refuses to build strings over max_string_length.
+    def __init__(self, output: Optional[TextIO] = None, max_iterations: Optional[int] = None,
+                 max_string_length: Optional[int] = None, time_limit: Optional[float] = None):
+        super().__init__()
+        self.output = output or sys.stdout
+        self.max_iterations = max_iterations
+        self.max_string_length = max_string_length
+        self.time_limit = time_limit
+        self.slots: list = []
+        self.budget = [0]
+        self.deadline = [0.0]
+        self.statement_handlers = self.dispatch_table('compile_')
+        self.expression_handlers = self.dispatch_table('expr_')
+    
+    def compile(self, program: Program) -> Callable[[], int]:
+        # Returns a function that runs the program and returns its exit status.
+        body = self.sequence(program.statements)
+        budget = self.budget
+        deadline = self.deadline
+        limit = self.max_iterations
+        time_limit = self.time_limit
+        
+        def run() -> int:
+            # Without an iteration limit the budget never runs out, and only
+            # paces the clock checks.
+            budget[0] = sys.maxsize if limit is None else limit
+            deadline[0] = math.inf if time_limit is None else time.monotonic() + time_limit
+            try:
+                body()
+            except ProgramExit as e:
+                return e.status
+            return 0
+        return run
+    
+    def run(self, program: Program) -> int:
+        return self.compile(program)()
+    
+    def declare(self, name: str, var_type: str) -> Tuple[int, str]:
+        self.slots.append(None)
+        return super().declare(name, var_type)
+    
+    def compile_block(self, statements: List[ASTNode]) -> Compiled:
+        self.scopes.append({})
+        try:
+            return self.sequence(statements)
+        finally:
+            self.scopes.pop()
+    
+    def sequence(self, statements: List[ASTNode]) -> Compiled:
+        compiled = tuple(self.compile_statement(statement) for statement in statements)
+        if not compiled:
+            return nothing
+        if len(compiled) == 1:
+            return compiled[0]
+        
+        def run():
+            for statement in compiled:
+                statement()
+        return run
+    
+    def compile_statement(self, node: ASTNode) -> Compiled:
+        return self.statement_handlers[node.__class__](self, node)
+    
+    def compile_ast_node(self, node: ASTNode) -> Compiled:
+        raise CompileError(f"cannot execute {type(node).__name__}")
+    
+    def compile_var_declaration(self, node: VarDeclaration) -> Compiled:
+        # The name is in scope within its own initializer, as in C++.
+        slot, var_type = self.declare(node.name, node.var_type)
+        if node.value is None:
+            return self.store(slot, (constant(DEFAULTS[var_type]), var_type))
+        return self.store(slot, self.convert(self.compile_expression(node.value), var_type))
+    
+    def compile_assignment(self, node: Assignment) -> Compiled:
+        slot, var_type = self.lookup(node.name)
+        return self.store(slot, self.convert(self.compile_expression(node.value), var_type))
+    
+    def store(self, slot: int, value: Typed) -> Compiled:
+        slots = self.slots
+        evaluate = value[0]
+        
+        def run():
+            slots[slot] = evaluate()
+        return run
+    
+    def compile_if_statement(self, node: IfStatement) -> Compiled:
+        condition = self.condition(node.condition)
+        then_block = self.compile_block(node.then_block)
+        if not node.else_block:
+            def run():
+                if condition():
+                    then_block()
+            return run
+        
+        else_block = self.compile_block(node.else_block)
+        
+        def run():
+            if condition():
+                then_block()
+            else:
+                else_block()
+        return run
+    
+    def compile_while_loop(self, node: WhileLoop) -> Compiled:
+        return self.loop(self.condition(node.condition), self.compile_block(node.body))
+    
+    def compile_for_loop(self, node: ForLoop) -> Compiled:
+        self.scopes.append({})
+        try:
+            init = self.compile_statement(node.init) if node.init else nothing
+            condition = self.condition(node.condition) if node.condition else constant(True)
+            update = self.compile_statement(node.update) if node.update else nothing
+            body = self.compile_block(node.body)
+        finally:
+            self.scopes.pop()
+        
+        def step():
+            body()
+            update()
+        loop = self.loop(condition, step)
+        
+        def run():
+            init()
+            loop()
+        return run
+    
+    def loop(self, condition: Compiled, body: Compiled) -> Compiled:
+        if self.max_iterations is None and self.time_limit is None:
+            def run():
+                while condition():
+                    body()
+            return run
+        
+        budget = self.budget
+        limit = self.max_iterations
+        check_clock = self.check_clock
+        
+        def run():
+            while condition():
+                budget[0] -= 1
+                if budget[0] < 0:
+                    raise IterationLimitExceeded(f"iteration limit of {limit} exceeded")
+                if not budget[0] % CLOCK_INTERVAL:
+                    check_clock()
+                body()
+        return run
+    
+    def check_clock(self):
+        if time.monotonic() > self.deadline[0]:
+            raise TimeLimitExceeded(f"time limit of {self.time_limit:g} seconds exceeded")
+    
+    def compile_print_statement(self, node: PrintStatement) -> Compiled:
+        evaluate, value_type = self.compile_expression(node.expression)
+        write = self.output.write
+        if value_type == INT:
+            def run():
+                write(f"{evaluate()}\n")
+        elif value_type == BOOL:
+            def run():
+                write("1\n" if evaluate() else "0\n")
+        elif value_type == DOUBLE:
+            def run():
+                write(format_double(evaluate()) + "\n")
+        else:
+            def run():
+                write(evaluate() + "\n")
+        return run
+    
+    def compile_function_call(self, node: FunctionCall) -> Compiled:
+        return self.expr_function_call(node)[0]
+    
+    def compile_return_statement(self, node: ReturnStatement) -> Compiled:
+        # Programs are the body of main(), so return ends the program.
+        if node.value is None:
+            raise CompileError("return-statement with no value, in function returning 'int'")
+        status = self.convert(self.compile_expression(node.value), INT)[0]
+        
+        def run():
+            raise ProgramExit(status())
+        return run
+    
+    def compile_expression(self, node: ASTNode) -> Typed:
+        return self.expression_handlers[node.__class__](self, node)
+    
+    def condition(self, node: ASTNode) -> Compiled:
+        evaluate, value_type = self.compile_expression(node)
+        return evaluate if condition_conversion(value_type) is None else constant(True)
+    
+    def convert(self, value: Typed, target: str) -> Typed:
+        evaluate, source = value
+        kind = conversion(source, target)
+        if kind is None:
+            return evaluate, target
+        if kind == 'bool_to_int':
+            return (lambda: int(evaluate())), target
+        if kind == 'double_to_int':
+            return (lambda: double_to_int(evaluate())), target
+        if kind == 'to_double':
+            return (lambda: float(evaluate())), target
+        if kind == 'to_bool':
+            return (lambda: evaluate() != 0), target
+        return constant(True), target
+    
+    def expr_ast_node(self, node: ASTNode) -> Typed:
+        raise CompileError(f"cannot evaluate {type(node).__name__}")
+    
+    def expr_number(self, node: Number) -> Typed:
+        value, value_type = literal_value(node.value)
+        return constant(value), value_type
+    
+    def expr_string(self, node: String) -> Typed:
+        return constant(decode_string(node.value)), CSTR
+    
+    def expr_identifier(self, node: Identifier) -> Typed:
+        if node.name in ('true', 'false'):
+            return constant(node.name == 'true'), BOOL
+        slot, var_type = self.lookup(node.name)
+        return partial(operator.getitem, self.slots, slot), var_type
+    
+    def expr_unary_op(self, node: UnaryOp) -> Typed:
+        operand, operand_type = self.compile_expression(node.operand)
+        kind, result_type = unary_operation(node.operator, operand_type)
+        if kind == 'not':
+            return (lambda: not operand()), result_type
+        if kind == 'false':
+            return constant(False), result_type
+        if kind == 'negate':
+            return (lambda: -operand()), result_type
+        
+        def negate():
+            value = -operand()
+            return value if value <= INT_MAX else INT_MIN
+        return negate, result_type
+    
+    def expr_binary_op(self, node: BinaryOp) -> Typed:
+        op = node.operator
+        if op in ('&&', '||'):
+            left = self.condition(node.left)
+            right = self.condition(node.right)
+            if op == '&&':
+                return (lambda: bool(left() and right())), BOOL
+            return (lambda: bool(left() or right())), BOOL
+        
+        left, left_type = self.compile_expression(node.left)
+        right, right_type = self.compile_expression(node.right)
+        kind, result_type = binary_operation(op, left_type, right_type)
+        if kind == 'compare':
+            return self.compare(op, left, right), result_type
+        if kind == 'int':
+            return self.int_arithmetic(op, left, right), result_type
+        if kind == 'double':
+            return self.double_arithmetic(op, left, right), result_type
+        return self.concatenate(left, right), result_type
+    
+    def compare(self, op: str, left: Compiled, right: Compiled) -> Compiled:
+        compare = COMPARE[op]
+        return lambda: compare(left(), right())
+    
+    def int_arithmetic(self, op: str, left: Compiled, right: Compiled) -> Compiled:
+        # Results are only wrapped when they leave the int range, which keeps
+        # the common case to one comparison.
+        if op == '+':
+            def run():
+                value = left() + right()
+                return value if INT_MIN <= value <= INT_MAX else wrap_int(value)
+        elif op == '-':
+            def run():
+                value = left() - right()
+                return value if INT_MIN <= value <= INT_MAX else wrap_int(value)
+        elif op == '*':
+            def run():
+                value = left() * right()
+                return value if INT_MIN <= value <= INT_MAX else wrap_int(value)
+        elif op == '/':
+            def run():
+                return divide_int(left(), right())
+        elif op == '%':
+            def run():
+                return modulo_int(left(), right())
+        else:
+            raise CompileError(f"unknown operator '{op}'")
+        return run
+    
+    def concatenate(self, left: Compiled, right: Compiled) -> Compiled:
+        # The length is checked before the string is built, so a program
+        # doubling a string in a loop stops at the limit, not at MemoryError.
+        limit = self.max_string_length
+        if limit is None:
+            return lambda: left() + right()
+        
+        def run():
+            first = left()
+            second = right()
+            if len(first) + len(second) > limit:
+                raise StringLimitExceeded(f"string length limit of {limit} characters exceeded")
+            return first + second
+        return run
+    
+    def double_arithmetic(self, op: str, left: Compiled, right: Compiled) -> Compiled:
+        if op == '+':
+            return lambda: left() + right()
+        if op == '-':
+            return lambda: left() - right()
+        if op == '*':
+            return lambda: left() * right()
+        if op == '/':
+            return lambda: divide_double(left(), right())
+        raise CompileError(f"unknown operator '{op}'")
+    
+    def expr_function_call(self, node: FunctionCall) -> Typed:
+        raise CompileError(f"'{node.name}' was not declared in this scope")
+
+def run_program(program: Program, output: Optional[TextIO] = None, max_iterations: Optional[int] = None,
+                max_string_length: Optional[int] = None, time_limit: Optional[float] = None) -> int:
+    return Interpreter(output, max_iterations, max_string_length, time_limit).run(program)
@@ -0,0 +1,37 @@
+import glob
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+@dataclass
+class CompileResult:
+    input_file: str
+    output_file: Optional[str] = None
+    error: Optional[str] = None
+    cache_hit: Optional[bool] = None
+    optimizer_stats: Optional[dict] = None
+    profile: Optional[dict] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+TARGET_EXTENSIONS = {'cpp': '.cpp', 'bytecode': '.voltc', 'python': '.py'}
+
+def default_output_path(input_file: str, target: str = 'cpp') -> str:
+    return input_file.replace('.volt', TARGET_EXTENSIONS[target])
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    # Files are taken as given, directories are searched recursively for
+    # .volt files, and anything with wildcards is expanded as a glob.
+    # A pattern that matches nothing is kept so it is reported as missing.
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '**', '*.volt'), recursive=True))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = []
+        files.extend(matches or [pattern])
+    return list(dict.fromkeys(files))
@@ -1,7 +1,14 @@
+import mmap
 import re
+import sys
+from functools import lru_cache
 from enum import Enum
+from array import array
+from bisect import bisect_right
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Deque, Generator, Iterable, Iterator, List, Optional, TextIO, Tuple
+from src.diagnostics import Diagnostic, VoltSyntaxError
 
 class TokenType(Enum):
     KEYWORD = "KEYWORD"
@@ -18,7 +25,93 @@ class TokenType(Enum):
     ASSIGN = "ASSIGN"
     EOF = "EOF"
 
-@dataclass
+def build_token_pattern(digit: str, alpha: str, alnum: str) -> re.Pattern:
+    # Whitespace and comments are folded into an unnamed prefix of every match,
+    # halving the number of matches on typical sources.
+    return re.compile(rf'''
+    (?>(?:[ \t\r\n]+|//[^\n]*)*)
+    (?:
+    (?P<NUMBER>[{digit}][{digit}.]*)
+  | (?P<STRING>"(?P<BODY>[^"\\]*(?:\\"?[^"\\]*)*)"?)
+  | (?P<IDENTIFIER>[{alpha}_][{alnum}_]*)
+  | (?P<OPERATOR>==|!=|<=|>=|&&|\|\||[-+*/%<>!&|])
+  | (?P<ASSIGN>=)
+  | (?P<LPAREN>\()
+  | (?P<RPAREN>\))
+  | (?P<LBRACE>\{{)
+  | (?P<RBRACE>\}})
+  | (?P<SEMICOLON>;)
+  | (?P<COMMA>,)
+  | (?P<MISMATCH>.)
+  | (?P<END>\Z)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+def char_class(predicate) -> str:
+    ranges = []
+    start = None
+    for code in range(sys.maxunicode + 2):
+        if code <= sys.maxunicode and predicate(chr(code)):
+            if start is None:
+                start = code
+        elif start is not None:
+            ranges.append(re.escape(chr(start)) if start == code - 1
+                          else f"{re.escape(chr(start))}-{re.escape(chr(code - 1))}")
+            start = None
+    return "".join(ranges)
+
+ASCII_TOKEN_PATTERN = build_token_pattern('0-9', 'A-Za-z', 'A-Za-z0-9')
+
+@lru_cache(maxsize=None)
+def unicode_token_pattern() -> re.Pattern:
+    # Mirrors str.isdigit/isalpha/isalnum exactly, which \d and \w do not.
+    return build_token_pattern(char_class(str.isdigit), char_class(str.isalpha), r'\w')
+
+TOKEN_TYPES = {token_type.name: token_type for token_type in TokenType}
+TOKEN_KINDS = list(TokenType)
+KIND_CODES = {token_type: code for code, token_type in enumerate(TOKEN_KINDS)}
+GROUP_CODES = {name: KIND_CODES[token_type] for name, token_type in TOKEN_TYPES.items()}
+GROUP_CODES['END'] = KIND_CODES[TokenType.EOF]
+STRING_BODY_PATTERN = re.compile(r'[^"\\]*(?:\\"?[^"\\]*)*')
+
+# The ASCII master pattern over raw bytes, for sources lexed in place from a
+# memory mapping. A mapping's pages are dropped from the process once
+# RELEASE_WINDOW bytes of lexed source lie behind the scanner.
+BYTES_TOKEN_PATTERN = re.compile(ASCII_TOKEN_PATTERN.pattern.encode('ascii'), re.VERBOSE | re.DOTALL)
+# Bytes that keep a source from being lexed in place: non-ASCII text, and
+# carriage returns, which text mode reads as newlines but scan_bytes would
+# not count as line breaks.
+UNSCANNABLE_PATTERN = re.compile(rb'[\x80-\xff\r]')
+RELEASE_WINDOW = 1 << 20
+# Token kinds whose text the kind alone determines, and how many decoded
+# token texts scan_bytes keeps to skip decoding repeats.
+FIXED_TEXTS = {'LPAREN': '(', 'RPAREN': ')', 'LBRACE': '{', 'RBRACE': '}', 'SEMICOLON': ';', 'COMMA': ',', 'ASSIGN': '='}
+DECODED_TEXTS = 1 << 16
+
+def is_scannable(data) -> bool:
+    # Whether scan_bytes lexes data exactly as the text lexer would lex the
+    # file read in text mode: ASCII with \n line ends. The search runs in C
+    # a window at a time, releasing a mapping's pages behind it.
+    mapped = isinstance(data, mmap.mmap)
+    for start in range(0, len(data), RELEASE_WINDOW):
+        if UNSCANNABLE_PATTERN.search(data, start, start + RELEASE_WINDOW):
+            return False
+        if mapped:
+            release_pages(data, start, start + RELEASE_WINDOW)
+    return True
+
+def release_pages(data: mmap.mmap, start: int, end: int) -> int:
+    # Drops the mapped pages from start up to end (rounded down to a page)
+    # from this process's resident memory; they are read back from the file
+    # if touched again. Returns where the released range ends.
+    end = min(end, len(data))
+    end -= end % mmap.PAGESIZE
+    if end > start and hasattr(mmap, 'MADV_DONTNEED'):
+        data.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return end
+    return start
+
+@dataclass(slots=True)
 class Token:
     type: TokenType
     value: str
@@ -26,8 +119,16 @@ class Token:
     column: int
 
 class Lexer:
-    def __init__(self, source: str):
+    def __init__(self, source: str, recover: bool = False):
         self.source = source
+        # With recover, a character no token can start with is recorded in
+        # diagnostics and skipped instead of raising (iter_tokens/tokenize).
+        self.recover = recover
+        self.diagnostics: List[Diagnostic] = []
+        self.reader: Optional[TextIO] = None
+        self.data = None
+        self.chunk_size = 1 << 16
+        self.line_start = 0
         self.pos = 0
         self.line = 1
         self.column = 1
@@ -45,6 +146,21 @@ class Lexer:
             '&&', '||', '!'
         }
     
+    @classmethod
+    def from_file(cls, reader: TextIO, chunk_size: int = 1 << 16) -> 'Lexer':
+        lexer = cls('')
+        lexer.reader = reader
+        lexer.chunk_size = chunk_size
+        return lexer
+    
+    @classmethod
+    def from_buffer(cls, data) -> 'Lexer':
+        # Lexes an ASCII bytes-like object, typically a memory-mapped file,
+        # in place: only the text of each token is decoded, never the source.
+        lexer = cls('')
+        lexer.data = data
+        return lexer
+    
     def current_char(self) -> Optional[str]:
         if self.pos >= len(self.source):
             return None
@@ -128,7 +244,7 @@ class Lexer:
         
         return Token(TokenType.OPERATOR, op, start_line, start_column)
     
-    def tokenize(self) -> List[Token]:
+    def tokenize_chars(self) -> List[Token]:
         while self.pos < len(self.source):
             self.skip_whitespace()
             
@@ -171,7 +287,281 @@ class Lexer:
             elif char in '+-*/%<>!=&|':
                 self.tokens.append(self.read_operator())
             else:
-                raise SyntaxError(f"Unexpected character '{char}' at line {self.line}, column {self.column}")
+                raise VoltSyntaxError(f"Unexpected character '{char}'", self.line, self.column, show_column=True)
         
         self.tokens.append(Token(TokenType.EOF, '', self.line, self.column))
         return self.tokens
+    
+    def tokenize(self) -> List[Token]:
+        self.tokens.extend(self.iter_tokens())
+        return self.tokens
+    
+    def tokenize_compact(self) -> 'TokenStore':
+        source = self.source
+        pattern = ASCII_TOKEN_PATTERN if source.isascii() else unicode_token_pattern()
+        keywords = self.keywords
+        group_codes = GROUP_CODES
+        keyword_code = KIND_CODES[TokenType.KEYWORD]
+        store = TokenStore(source)
+        kinds = store.kinds.append
+        starts = store.starts.append
+        ends = store.ends.append
+        
+        for match in pattern.finditer(source):
+            kind = match.lastgroup
+            start = match.start(kind)
+            if kind == 'MISMATCH':
+                line, column = store.location(start)
+                raise VoltSyntaxError(f"Unexpected character '{match.group(kind)}'", line, column, show_column=True)
+            if kind == 'IDENTIFIER' and match.group(kind) in keywords:
+                kinds(keyword_code)
+            else:
+                kinds(group_codes[kind])
+            starts(start)
+            ends(match.end())
+            if kind == 'END':
+                break
+        
+        return store
+    
+    def iter_tokens(self) -> Iterator[Token]:
+        self.line = 1
+        self.line_start = 0
+        
+        if self.data is not None:
+            yield from self.scan_bytes(self.data)
+            return
+        if self.reader is None:
+            yield from self.scan_buffer(self.source, 0, True)
+            return
+        
+        # Unconsumed text at the end of a chunk (a token or whitespace run that
+        # touches the chunk boundary) is carried over and rescanned.
+        buffer = ''
+        base = 0
+        while True:
+            chunk = self.reader.read(self.chunk_size)
+            buffer += chunk
+            consumed = yield from self.scan_buffer(buffer, base, not chunk)
+            if not chunk:
+                return
+            buffer = buffer[consumed:]
+            base += consumed
+    
+    def scan_buffer(self, buffer: str, base: int, final: bool) -> Generator[Token, None, int]:
+        # Single pass over the master pattern; line/column are derived from
+        # match offsets, so only the skipped prefix and string literals are
+        # ever searched for newlines.
+        pattern = ASCII_TOKEN_PATTERN if buffer.isascii() else unicode_token_pattern()
+        keywords = self.keywords
+        token_types = TOKEN_TYPES
+        intern = sys.intern
+        line = self.line
+        line_start = self.line_start - base
+        end = len(buffer)
+        consumed = 0
+        
+        for match in pattern.finditer(buffer):
+            if not final and match.end() == end:
+                break
+            
+            kind = match.lastgroup
+            start = match.start(kind)
+            prefix_start = match.start()
+            if prefix_start != start:
+                newline = buffer.rfind('\n', prefix_start, start)
+                if newline >= 0:
+                    line += buffer.count('\n', prefix_start, newline + 1)
+                    line_start = newline + 1
+            
+            if kind == 'IDENTIFIER':
+                text = intern(match.group(kind))
+                token_type = TokenType.KEYWORD if text in keywords else TokenType.IDENTIFIER
+                yield Token(token_type, text, line, start - line_start + 1)
+            elif kind == 'STRING':
+                value = match.group('BODY')
+                yield Token(TokenType.STRING, value.replace('\\"', '"'), line, start - line_start + 1)
+                newline = value.rfind('\n')
+                if newline >= 0:
+                    line += value.count('\n')
+                    line_start = start + 1 + newline + 1
+            elif kind == 'END':
+                self.pos = base + start
+                self.column = start - line_start + 1
+                yield Token(TokenType.EOF, '', line, self.column)
+                consumed = end
+                break
+            elif kind == 'MISMATCH':
+                error = VoltSyntaxError(f"Unexpected character '{match.group(kind)}'", line, start - line_start + 1,
+                                        show_column=True)
+                if not self.recover:
+                    raise error
+                self.diagnostics.append(error.diagnostic)
+            elif kind == 'NUMBER':
+                yield Token(TokenType.NUMBER, match.group(kind), line, start - line_start + 1)
+            else:
+                yield Token(token_types[kind], intern(match.group(kind)), line, start - line_start + 1)
+            consumed = match.end()
+        
+        self.line = line
+        self.line_start = line_start + base
+        return consumed
+    
+    def scan_bytes(self, data) -> Iterator[Token]:
+        # scan_buffer over ASCII bytes with \n line ends (see is_scannable).
+        # mmap has no count(), so prefixes are only sliced out when they hold
+        # a newline. Names, numbers and operators are decoded once each and
+        # looked up after that.
+        keywords = self.keywords
+        token_types = TOKEN_TYPES
+        fixed_texts = FIXED_TEXTS
+        texts = {}
+        intern = sys.intern
+        mapped = isinstance(data, mmap.mmap)
+        released = 0
+        line = 1
+        line_start = 0
+        
+        for match in BYTES_TOKEN_PATTERN.finditer(data):
+            kind = match.lastgroup
+            start = match.start(kind)
+            prefix_start = match.start()
+            if prefix_start != start:
+                newline = data.rfind(b'\n', prefix_start, start)
+                if newline >= 0:
+                    line += data[prefix_start:newline + 1].count(b'\n')
+                    line_start = newline + 1
+            
+            text = fixed_texts.get(kind)
+            if text is not None:
+                yield Token(token_types[kind], text, line, start - line_start + 1)
+            elif kind == 'STRING':
+                value = match.group('BODY').decode('ascii')
+                yield Token(TokenType.STRING, value.replace('\\"', '"'), line, start - line_start + 1)
+                newline = value.rfind('\n')
+                if newline >= 0:
+                    line += value.count('\n')
+                    line_start = start + 1 + newline + 1
+            elif kind == 'END':
+                self.pos = start
+                self.column = start - line_start + 1
+                yield Token(TokenType.EOF, '', line, self.column)
+                return
+            elif kind == 'MISMATCH':
+                error = VoltSyntaxError(f"Unexpected character '{match.group(kind).decode('ascii')}'", line,
+                                        start - line_start + 1, show_column=True)
+                if not self.recover:
+                    raise error
+                self.diagnostics.append(error.diagnostic)
+            else:
+                raw = match.group(kind)
+                text = texts.get(raw)
+                if text is None:
+                    if len(texts) >= DECODED_TEXTS:
+                        texts.clear()
+                    text = texts[raw] = intern(raw.decode('ascii'))
+                if kind == 'IDENTIFIER':
+                    token_type = TokenType.KEYWORD if text in keywords else TokenType.IDENTIFIER
+                else:
+                    token_type = token_types[kind]
+                yield Token(token_type, text, line, start - line_start + 1)
+            
+            if mapped and start - released >= RELEASE_WINDOW:
+                released = release_pages(data, released, start)
+
+class TokenStore:
+    # Column-oriented token list: one byte of kind plus start/end offsets per
+    # token. Values and line/column are recovered from the source on demand.
+    def __init__(self, source: str):
+        self.source = source
+        offset_type = 'I' if len(source) < 2 ** 32 else 'Q'
+        self.kinds = array('B')
+        self.starts = array(offset_type)
+        self.ends = array(offset_type)
+        self.line_starts: Optional[array] = None
+    
+    def __len__(self) -> int:
+        return len(self.kinds)
+    
+    def __getitem__(self, index: int) -> Token:
+        start = self.starts[index]
+        line, column = self.location(start)
+        return Token(TOKEN_KINDS[self.kinds[index]], self.value(index), line, column)
+    
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.kinds)):
+            yield self[index]
+    
+    def type(self, index: int) -> TokenType:
+        return TOKEN_KINDS[self.kinds[index]]
+    
+    def value(self, index: int) -> str:
+        token_type = TOKEN_KINDS[self.kinds[index]]
+        start = self.starts[index]
+        if token_type == TokenType.STRING:
+            body = STRING_BODY_PATTERN.match(self.source, start + 1, self.ends[index]).group()
+            return body.replace('\\"', '"')
+        if token_type == TokenType.EOF:
+            return ''
+        value = self.source[start:self.ends[index]]
+        return value if token_type == TokenType.NUMBER else sys.intern(value)
+    
+    def location(self, offset: int) -> Tuple[int, int]:
+        if self.line_starts is None:
+            self.line_starts = array(self.starts.typecode, [0])
+            self.line_starts.extend(match.end() for match in re.finditer('\n', self.source))
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+    
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in (self.kinds, self.starts, self.ends))
+
+class TokenStream:
+    # Lazy cursor over a token iterator. Only a small window of tokens is kept:
+    # a few already-consumed ones (so the parser can step back) plus whatever
+    # lookahead has been requested.
+    def __init__(self, tokens: Iterable[Token], history: int = 4):
+        self.tokens = iter(tokens)
+        self.history = history
+        self.window: Deque[Token] = deque()
+        self.index = 0
+        self.position = 0
+        self.exhausted = False
+        self.pull()
+        self.current = self.window[0]
+    
+    def pull(self) -> bool:
+        if self.exhausted:
+            return False
+        token = next(self.tokens, None)
+        if token is None:
+            self.exhausted = True
+            return False
+        self.window.append(token)
+        if token.type == TokenType.EOF:
+            self.exhausted = True
+        return True
+    
+    def peek(self, offset: int = 1) -> Token:
+        index = self.index + offset
+        while index >= len(self.window):
+            if not self.pull():
+                return self.window[-1]
+        return self.window[index]
+    
+    def advance(self):
+        if self.index + 1 >= len(self.window) and not self.pull():
+            return
+        self.index += 1
+        self.position += 1
+        if self.index > self.history:
+            self.window.popleft()
+            self.index -= 1
+        self.current = self.window[self.index]
+    
+    def rewind(self, count: int = 1):
+        if count > self.index:
+            raise ValueError(f"Cannot rewind {count} tokens, only {self.index} kept")
+        self.index -= count
+        self.position -= count
+        self.current = self.window[self.index]
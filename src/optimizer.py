@@ -0,0 +1,921 @@
+import math
+import re
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+from src.ast_nodes import *
+from src.visitor import NodeVisitor
+
+# Static types of expressions as the generated C++ sees them. String literals
+# are `const char*` there; only `string` variables are std::string.
+INT = 'int'
+DOUBLE = 'double'
+BOOL = 'bool'
+CSTR = 'const char*'
+STRING = 'std::string'
+VAR_TYPES = {'int': INT, 'float': DOUBLE, 'bool': BOOL, 'string': STRING}
+ARITHMETIC = {INT, DOUBLE, BOOL}
+COMPARISONS = {'==', '!=', '<', '>', '<=', '>='}
+
+# Folding must not change what the C++ program does, so integer results
+# outside a 32-bit int (signed overflow is undefined) are left alone, as are
+# literals C++ reads differently from Python (octal, or too big for int).
+INT_MAX = 2 ** 31 - 1
+INT_LITERAL = re.compile(r'0|[1-9][0-9]*')
+FLOAT_LITERAL = re.compile(r'[0-9]+\.[0-9]*')
+
+Typed = Tuple[ASTNode, Optional[str]]
+
+def literal_type(value: str) -> Optional[str]:
+    if INT_LITERAL.fullmatch(value):
+        return INT if int(value) <= INT_MAX else None
+    if FLOAT_LITERAL.fullmatch(value):
+        return DOUBLE
+    return None
+
+def make_constant(value, value_type: str) -> Optional[ASTNode]:
+    # Literals are never negative, so negative results become unary minus.
+    if value_type == BOOL:
+        return Identifier('true' if value else 'false')
+    if value_type == INT:
+        if abs(value) > INT_MAX:
+            return None
+        return Number(str(value)) if value >= 0 else UnaryOp('-', Number(str(-value)))
+    if not math.isfinite(value):
+        return None
+    text = repr(abs(value))
+    if 'e' in text:
+        return None
+    return UnaryOp('-', Number(text)) if math.copysign(1, value) < 0 else Number(text)
+
+def constant_value(node: ASTNode, node_type: Optional[str]):
+    if node_type == BOOL and isinstance(node, Identifier) and node.name in ('true', 'false'):
+        return node.name == 'true'
+    if node_type in (INT, DOUBLE):
+        negate = isinstance(node, UnaryOp) and node.operator == '-'
+        literal = node.operand if negate else node
+        if isinstance(literal, Number):
+            value = int(literal.value) if node_type == INT else float(literal.value)
+            return -value if negate else value
+    return None
+
+def truth_value(node: ASTNode, node_type: Optional[str]) -> Optional[bool]:
+    value = constant_value(node, node_type)
+    return None if value is None else bool(value)
+
+def is_pure(node: ASTNode) -> bool:
+    # Calls may have side effects and division may trap, so expressions
+    # containing either are never dropped.
+    if isinstance(node, BinaryOp):
+        return node.operator not in ('/', '%') and is_pure(node.left) and is_pure(node.right)
+    if isinstance(node, UnaryOp):
+        return is_pure(node.operand)
+    return isinstance(node, (Number, String, Identifier))
+
+def arithmetic_type(left_type: Optional[str], right_type: Optional[str]) -> Optional[str]:
+    if left_type not in ARITHMETIC or right_type not in ARITHMETIC:
+        return None
+    return DOUBLE if DOUBLE in (left_type, right_type) else INT
+
+def binary_type(operator: str, left_type: Optional[str], right_type: Optional[str]) -> Optional[str]:
+    if operator in COMPARISONS or operator in ('&&', '||'):
+        return BOOL
+    if operator == '+' and STRING in (left_type, right_type):
+        return STRING
+    if operator == '%' and DOUBLE in (left_type, right_type):
+        return None
+    return arithmetic_type(left_type, right_type)
+
+def evaluate(operator: str, left, right, result_type: str):
+    # C++ semantics: integer division truncates towards zero and the sign
+    # of % follows the dividend. Returns None for anything that would trap.
+    if operator in COMPARISONS:
+        return {
+            '==': left == right, '!=': left != right,
+            '<': left < right, '>': left > right,
+            '<=': left <= right, '>=': left >= right,
+        }[operator]
+    if operator == '+':
+        return left + right
+    if operator == '-':
+        return left - right
+    if operator == '*':
+        return left * right
+    if right == 0:
+        return None
+    if result_type == DOUBLE:
+        return left / right if operator == '/' else None
+    quotient = abs(left) // abs(right)
+    if (left < 0) != (right < 0):
+        quotient = -quotient
+    return quotient if operator == '/' else left - right * quotient
+
+class ConstantFolder(NodeVisitor):
+    # Folds literal expressions, applies identities that keep the C++ type of
+    # the expression, and removes branches and loops whose condition is a
+    # constant. The tree is rewritten in place.
+    def __init__(self):
+        self.scopes: List[Dict[str, Optional[str]]] = [{}]
+        self.statement_handlers = self.dispatch_table('optimize_')
+        self.expression_handlers = self.dispatch_table('fold_')
+    
+    def optimize(self, program: Program) -> Program:
+        program.statements = self.optimize_statements(program.statements)
+        return program
+    
+    def optimize_block(self, statements: List[ASTNode]) -> List[ASTNode]:
+        self.scopes.append({})
+        try:
+            return self.optimize_statements(statements)
+        finally:
+            self.scopes.pop()
+    
+    def optimize_statements(self, statements: List[ASTNode]) -> List[ASTNode]:
+        result = []
+        for statement in statements:
+            result.extend(self.optimize_statement(statement))
+        return result
+    
+    def optimize_statement(self, node: ASTNode) -> List[ASTNode]:
+        return self.statement_handlers[node.__class__](self, node)
+    
+    def declare(self, name: str, var_type: str):
+        self.scopes[-1][name] = VAR_TYPES.get(var_type)
+    
+    def lookup(self, name: str) -> Optional[str]:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+    
+    def optimize_ast_node(self, node: ASTNode) -> List[ASTNode]:
+        return [node]
+    
+    def optimize_var_declaration(self, node: VarDeclaration) -> List[ASTNode]:
+        # The name is in scope within its own initializer, as in C++.
+        self.declare(node.name, node.var_type)
+        if node.value:
+            node.value = self.fold(node.value)
+        return [node]
+    
+    def optimize_assignment(self, node: Assignment) -> List[ASTNode]:
+        node.value = self.fold(node.value)
+        return [node]
+    
+    def optimize_if_statement(self, node: IfStatement) -> List[ASTNode]:
+        node.condition, condition_type = self.fold_expression(node.condition)
+        taken = truth_value(node.condition, condition_type)
+        node.then_block = self.optimize_block(node.then_block)
+        if node.else_block:
+            node.else_block = self.optimize_block(node.else_block)
+        
+        # A block can only be spliced into the enclosing one if that cannot
+        # change what its declarations refer to.
+        if taken is True and not has_declarations(node.then_block):
+            return node.then_block
+        if taken is False and not has_declarations(node.else_block or []):
+            return node.else_block or []
+        return [node]
+    
+    def optimize_while_loop(self, node: WhileLoop) -> List[ASTNode]:
+        node.condition, condition_type = self.fold_expression(node.condition)
+        if truth_value(node.condition, condition_type) is False:
+            return []
+        node.body = self.optimize_block(node.body)
+        return [node]
+    
+    def optimize_for_loop(self, node: ForLoop) -> List[ASTNode]:
+        self.scopes.append({})
+        try:
+            if node.init:
+                self.optimize_statement(node.init)
+            if node.condition:
+                node.condition = self.fold(node.condition)
+            if node.update:
+                self.optimize_statement(node.update)
+            node.body = self.optimize_block(node.body)
+        finally:
+            self.scopes.pop()
+        return [node]
+    
+    def optimize_print_statement(self, node: PrintStatement) -> List[ASTNode]:
+        node.expression = self.fold(node.expression)
+        return [node]
+    
+    def optimize_function_call(self, node: FunctionCall) -> List[ASTNode]:
+        node.arguments = [self.fold(argument) for argument in node.arguments]
+        return [node]
+    
+    def optimize_return_statement(self, node: ReturnStatement) -> List[ASTNode]:
+        if node.value:
+            node.value = self.fold(node.value)
+        return [node]
+    
+    def fold(self, node: ASTNode) -> ASTNode:
+        return self.fold_expression(node)[0]
+    
+    def fold_expression(self, node: ASTNode) -> Typed:
+        return self.expression_handlers[node.__class__](self, node)
+    
+    def fold_ast_node(self, node: ASTNode) -> Typed:
+        return node, None
+    
+    def fold_number(self, node: Number) -> Typed:
+        return node, literal_type(node.value)
+    
+    def fold_string(self, node: String) -> Typed:
+        return node, CSTR
+    
+    def fold_identifier(self, node: Identifier) -> Typed:
+        if node.name in ('true', 'false'):
+            return node, BOOL
+        return node, self.lookup(node.name)
+    
+    def fold_function_call(self, node: FunctionCall) -> Typed:
+        node.arguments = [self.fold(argument) for argument in node.arguments]
+        return node, None
+    
+    def fold_unary_op(self, node: UnaryOp) -> Typed:
+        node.operand, operand_type = self.fold_expression(node.operand)
+        operand = node.operand
+        value = constant_value(operand, operand_type)
+        
+        if node.operator == '!':
+            if value is not None:
+                return make_constant(not value, BOOL), BOOL
+            return node, BOOL
+        
+        result_type = arithmetic_type(operand_type, INT)
+        if node.operator == '-' and result_type is not None:
+            if value is not None:
+                folded = make_constant(-value, result_type)
+                if folded is not None:
+                    return folded, result_type
+            elif operand_type == result_type and isinstance(operand, UnaryOp) and operand.operator == '-':
+                return operand.operand, result_type
+        return node, result_type
+    
+    def fold_binary_op(self, node: BinaryOp) -> Typed:
+        node.left, left_type = self.fold_expression(node.left)
+        node.right, right_type = self.fold_expression(node.right)
+        if node.operator in ('&&', '||'):
+            return self.fold_logical(node, left_type, right_type), BOOL
+        
+        operator = node.operator
+        left, right = node.left, node.right
+        result_type = binary_type(operator, left_type, right_type)
+        
+        if operator == '+' and left_type == CSTR and right_type == CSTR:
+            return self.fold_concatenation(node), CSTR
+        if result_type is None:
+            return node, None
+        
+        left_value = constant_value(left, left_type)
+        right_value = constant_value(right, right_type)
+        if left_value is not None and right_value is not None:
+            if operator in COMPARISONS or result_type == DOUBLE:
+                value = evaluate(operator, left_value, right_value, result_type)
+            else:
+                value = evaluate(operator, int(left_value), int(right_value), result_type)
+            folded = None if value is None else make_constant(value, result_type)
+            if folded is not None:
+                return folded, result_type
+            return node, result_type
+        
+        return self.fold_identity(node, left_type, right_type, result_type), result_type
+    
+    def fold_identity(self, node: BinaryOp, left_type: Optional[str],
+                      right_type: Optional[str], result_type: str) -> ASTNode:
+        # Only rewrites to an operand of the same C++ type as the result, and
+        # only where that holds for every value: x + 0 is not x for a double
+        # x of -0.0, so additive identities are limited to ints.
+        operator = node.operator
+        left_value = constant_value(node.left, left_type)
+        right_value = constant_value(node.right, right_type)
+        if right_value is not None and left_type == result_type:
+            zero = right_value == 0 and math.copysign(1, right_value) > 0
+            if operator == '+' and zero and left_type == INT:
+                return node.left
+            if operator == '-' and zero:
+                return node.left
+            if operator in ('*', '/') and right_value == 1:
+                return node.left
+        if left_value is not None and right_type == result_type:
+            if operator == '+' and left_value == 0 and right_type == INT:
+                return node.right
+            if operator == '*' and left_value == 1:
+                return node.right
+        if operator == '*' and result_type == INT:
+            if (left_value == 0 and right_type == INT and is_pure(node.right)) or \
+               (right_value == 0 and left_type == INT and is_pure(node.left)):
+                return Number('0')
+        return node
+    
+    def fold_logical(self, node: BinaryOp, left_type: Optional[str], right_type: Optional[str]) -> ASTNode:
+        # The right operand of && / || is only evaluated when the left one
+        # does not decide the result, so it may be dropped unconditionally
+        # in that case; the left operand only when it has no side effects.
+        deciding = node.operator == '||'
+        left = truth_value(node.left, left_type)
+        right = truth_value(node.right, right_type)
+        if left is deciding:
+            return make_constant(deciding, BOOL)
+        if left is not None:
+            if right is not None:
+                return make_constant(right, BOOL)
+            return node.right if right_type == BOOL else node
+        if right is deciding:
+            # A || true is true whatever A is, but an impure A still has to
+            # run (and may trap), so the node stays.
+            return make_constant(deciding, BOOL) if is_pure(node.left) else node
+        if right is not None and left_type == BOOL:
+            return node.left
+        return node
+    
+    def fold_concatenation(self, node: BinaryOp) -> ASTNode:
+        # "a" + "b" is pointer arithmetic in C++ and does not compile; the
+        # VoltScript meaning is concatenation. Escapes are left alone, since
+        # joining them could change how they are read (e.g. "\x4" + "1").
+        left, right = node.left, node.right
+        if isinstance(left, String) and isinstance(right, String) and \
+           not any(c in value for value in (left.value, right.value) for c in '\\"'):
+            return String(left.value + right.value)
+        return node
+
+def expression_nodes(node: ASTNode) -> Iterator[ASTNode]:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, BinaryOp):
+            stack.append(node.right)
+            stack.append(node.left)
+        elif isinstance(node, UnaryOp):
+            stack.append(node.operand)
+        elif isinstance(node, FunctionCall):
+            stack.extend(reversed(node.arguments))
+
+def count_nodes(node: ASTNode) -> int:
+    if isinstance(node, VarDeclaration):
+        return 1 + (count_nodes(node.value) if node.value else 0)
+    if isinstance(node, Assignment):
+        return 1 + count_nodes(node.value)
+    if isinstance(node, IfStatement):
+        return 1 + count_nodes(node.condition) + sum(map(count_nodes, node.then_block + (node.else_block or [])))
+    if isinstance(node, WhileLoop):
+        return 1 + count_nodes(node.condition) + sum(map(count_nodes, node.body))
+    if isinstance(node, ForLoop):
+        parts = [part for part in (node.init, node.condition, node.update) if part]
+        return 1 + sum(map(count_nodes, parts + node.body))
+    if isinstance(node, PrintStatement):
+        return 1 + count_nodes(node.expression)
+    if isinstance(node, ReturnStatement):
+        return 1 + (count_nodes(node.value) if node.value else 0)
+    return sum(1 for _ in expression_nodes(node))
+
+def terminates(statements: List[ASTNode]) -> bool:
+    # Whether control never falls off the end of the block: a return, or an
+    # if/else whose branches both return.
+    for statement in statements:
+        if isinstance(statement, ReturnStatement):
+            return True
+        if isinstance(statement, IfStatement) and statement.else_block and \
+           terminates(statement.then_block) and terminates(statement.else_block):
+            return True
+    return False
+
+class ResolvingPass(NodeVisitor):
+    # Base for passes that work on variables rather than names: resolve()
+    # maps each Identifier, Assignment and VarDeclaration (by id) to its
+    # symbol, which is the id of the declaration it refers to, or the bare
+    # name if it has none.
+    def __init__(self):
+        self.symbols: Dict[int, Hashable] = {}
+        self.references: Dict[Hashable, int] = {}
+        self.declarations: Dict[int, VarDeclaration] = {}
+    
+    def resolve(self, statements: List[ASTNode], scopes: List[Dict[str, int]]):
+        if len(scopes) == 1:
+            self.symbols = {}
+            self.references = {}
+            self.declarations = {}
+        for statement in statements:
+            if isinstance(statement, VarDeclaration):
+                scopes[-1][statement.name] = self.symbols[id(statement)] = id(statement)
+                self.declarations[id(statement)] = statement
+                self.references.setdefault(id(statement), 0)
+                self.resolve_expression(statement.value, scopes)
+            elif isinstance(statement, Assignment):
+                self.reference(statement, statement.name, scopes)
+                self.resolve_expression(statement.value, scopes)
+            elif isinstance(statement, IfStatement):
+                self.resolve_expression(statement.condition, scopes)
+                self.resolve(statement.then_block, scopes + [{}])
+                self.resolve(statement.else_block or [], scopes + [{}])
+            elif isinstance(statement, WhileLoop):
+                self.resolve_expression(statement.condition, scopes)
+                self.resolve(statement.body, scopes + [{}])
+            elif isinstance(statement, ForLoop):
+                loop_scopes = scopes + [{}]
+                self.resolve([part for part in (statement.init, statement.update) if part], loop_scopes)
+                self.resolve_expression(statement.condition, loop_scopes)
+                self.resolve(statement.body, loop_scopes + [{}])
+            elif isinstance(statement, PrintStatement):
+                self.resolve_expression(statement.expression, scopes)
+            elif isinstance(statement, ReturnStatement):
+                self.resolve_expression(statement.value, scopes)
+            else:
+                self.resolve_expression(statement, scopes)
+    
+    def resolve_expression(self, node: Optional[ASTNode], scopes: List[Dict[str, int]]):
+        if node is None:
+            return
+        for child in expression_nodes(node):
+            if isinstance(child, Identifier) and child.name not in ('true', 'false'):
+                self.reference(child, child.name, scopes)
+    
+    def reference(self, node: ASTNode, name: str, scopes: List[Dict[str, int]]):
+        for scope in reversed(scopes):
+            if name in scope:
+                symbol = scope[name]
+                break
+        else:
+            symbol = name
+        self.symbols[id(node)] = symbol
+        self.references[symbol] = self.references.get(symbol, 0) + 1
+
+class DeadCodeEliminator(ResolvingPass):
+    # Removes statements after a return, stores whose value is never read
+    # (backward liveness analysis, iterated to a fixpoint around loops), and
+    # declarations that are no longer referenced. Shadowed names are kept
+    # apart by working on resolved symbols; names with no declaration are
+    # treated as always live. Anything whose evaluation may have side
+    # effects or trap is kept.
+    def __init__(self):
+        super().__init__()
+        self.removed = {'declarations': 0, 'stores': 0, 'unreachable': 0, 'statements': 0, 'nodes': 0}
+        self.live_handlers = self.dispatch_table('live_')
+    
+    def stats(self) -> dict:
+        return dict(self.removed)
+    
+    def optimize(self, program: Program) -> Program:
+        while True:
+            removed = self.removed['nodes']
+            self.resolve(program.statements, [{}])
+            program.statements, _ = self.eliminate(program.statements, set(), True)
+            self.resolve(program.statements, [{}])
+            program.statements = self.remove_unused(program.statements)
+            if self.removed['nodes'] == removed:
+                return program
+    
+    def remove(self, kind: str, node: ASTNode):
+        self.removed[kind] += 1
+        self.removed['nodes'] += count_nodes(node)
+    
+    def uses(self, node: Optional[ASTNode]) -> Set[Hashable]:
+        if node is None:
+            return set()
+        symbols = self.symbols
+        return {symbols[id(child)] for child in expression_nodes(node) if id(child) in symbols}
+    
+    def is_dead(self, symbol: Hashable, live: Set[Hashable]) -> bool:
+        return symbol not in live and not isinstance(symbol, str)
+    
+    def eliminate(self, statements: List[ASTNode], live: Set[Hashable],
+                  transform: bool) -> Tuple[List[ASTNode], Set[Hashable]]:
+        # Walks the block backwards from the variables live at its end and
+        # returns the variables live at its start. With transform set, dead
+        # statements are removed and the rewritten block is returned.
+        if transform:
+            for index, statement in enumerate(statements):
+                if terminates([statement]):
+                    for unreachable in statements[index + 1:]:
+                        self.remove('unreachable', unreachable)
+                    statements = statements[:index + 1]
+                    break
+        
+        result = []
+        for statement in reversed(statements):
+            replacement, live = self.live_handlers[statement.__class__](self, statement, live, transform)
+            result.extend(reversed(replacement))
+        result.reverse()
+        return result, live
+    
+    def live_ast_node(self, node: ASTNode, live: Set[Hashable], transform: bool):
+        return [node], live | self.uses(node)
+    
+    def live_var_declaration(self, node: VarDeclaration, live: Set[Hashable], transform: bool):
+        symbol = id(node)
+        if node.value is not None and symbol not in live and is_pure(node.value):
+            if transform:
+                self.remove('stores', node.value)
+                node.value = None
+            return [node], live
+        return [node], (live - {symbol}) | self.uses(node.value)
+    
+    def live_assignment(self, node: Assignment, live: Set[Hashable], transform: bool):
+        symbol = self.symbols[id(node)]
+        if self.is_dead(symbol, live):
+            if is_pure(node.value):
+                if transform:
+                    self.remove('stores', node)
+                return [], live
+            if isinstance(node.value, FunctionCall):
+                if transform:
+                    self.removed['stores'] += 1
+                    self.removed['nodes'] += 1
+                return [node.value], live | self.uses(node.value)
+        return [node], (live - {symbol}) | self.uses(node.value)
+    
+    def live_if_statement(self, node: IfStatement, live: Set[Hashable], transform: bool):
+        then_block, then_live = self.eliminate(node.then_block, live, transform)
+        else_block, else_live = self.eliminate(node.else_block or [], live, transform)
+        if transform:
+            node.then_block = then_block
+            node.else_block = else_block if node.else_block is not None else None
+            if not then_block and not else_block and is_pure(node.condition):
+                self.remove('statements', node)
+                return [], live
+        return [node], then_live | else_live | self.uses(node.condition)
+    
+    def live_while_loop(self, node: WhileLoop, live: Set[Hashable], transform: bool):
+        condition = self.uses(node.condition)
+        loop_live = live | condition
+        while True:
+            _, body_live = self.eliminate(node.body, loop_live, False)
+            updated = loop_live | body_live
+            if updated == loop_live:
+                break
+            loop_live = updated
+        if transform:
+            node.body, _ = self.eliminate(node.body, loop_live, True)
+        return [node], loop_live
+    
+    def live_for_loop(self, node: ForLoop, live: Set[Hashable], transform: bool):
+        # The init and update clauses are kept as written; they only take
+        # part in the analysis.
+        loop_live = live | self.uses(node.condition)
+        while True:
+            body_out = self.clause_live(node.update, loop_live)
+            _, body_live = self.eliminate(node.body, body_out, False)
+            updated = loop_live | body_live
+            if updated == loop_live:
+                break
+            loop_live = updated
+        if transform:
+            node.body, _ = self.eliminate(node.body, self.clause_live(node.update, loop_live), True)
+        return [node], self.clause_live(node.init, loop_live)
+    
+    def clause_live(self, node: Optional[ASTNode], live: Set[Hashable]) -> Set[Hashable]:
+        if isinstance(node, VarDeclaration):
+            return (live - {id(node)}) | self.uses(node.value)
+        if isinstance(node, Assignment):
+            return (live - {self.symbols[id(node)]}) | self.uses(node.value)
+        return live
+    
+    def live_print_statement(self, node: PrintStatement, live: Set[Hashable], transform: bool):
+        return [node], live | self.uses(node.expression)
+    
+    def live_return_statement(self, node: ReturnStatement, live: Set[Hashable], transform: bool):
+        # Nothing after a return in main() runs, so only its value is live.
+        return [node], self.uses(node.value)
+    
+    def remove_unused(self, statements: List[ASTNode]) -> List[ASTNode]:
+        result = []
+        for statement in statements:
+            if isinstance(statement, VarDeclaration) and self.references[id(statement)] == 0 and \
+               (statement.value is None or is_pure(statement.value)):
+                self.remove('declarations', statement)
+                continue
+            if isinstance(statement, IfStatement):
+                statement.then_block = self.remove_unused(statement.then_block)
+                if statement.else_block:
+                    statement.else_block = self.remove_unused(statement.else_block)
+            elif isinstance(statement, (WhileLoop, ForLoop)):
+                statement.body = self.remove_unused(statement.body)
+            result.append(statement)
+        return result
+
+def walk_statements(statements: List[ASTNode]) -> Iterator[ASTNode]:
+    # Every statement in the blocks, nested blocks included, with the init
+    # and update clauses of for loops treated as statements.
+    for statement in statements:
+        yield statement
+        if isinstance(statement, IfStatement):
+            yield from walk_statements(statement.then_block)
+            yield from walk_statements(statement.else_block or [])
+        elif isinstance(statement, WhileLoop):
+            yield from walk_statements(statement.body)
+        elif isinstance(statement, ForLoop):
+            yield from walk_statements([part for part in (statement.init, statement.update) if part])
+            yield from walk_statements(statement.body)
+
+def rewrite_expressions(statement: ASTNode, rewrite: Callable[[ASTNode], ASTNode]):
+    # Applies rewrite to the expressions a statement holds directly.
+    if isinstance(statement, (VarDeclaration, Assignment, ReturnStatement)):
+        if statement.value is not None:
+            statement.value = rewrite(statement.value)
+    elif isinstance(statement, (IfStatement, WhileLoop, ForLoop)):
+        if statement.condition is not None:
+            statement.condition = rewrite(statement.condition)
+    elif isinstance(statement, PrintStatement):
+        statement.expression = rewrite(statement.expression)
+    elif isinstance(statement, FunctionCall):
+        statement.arguments = [rewrite(argument) for argument in statement.arguments]
+
+def is_literal(node: ASTNode) -> bool:
+    if isinstance(node, UnaryOp) and node.operator == '-':
+        node = node.operand
+    return isinstance(node, (Number, String))
+
+def is_nonzero_literal(node: ASTNode) -> bool:
+    return isinstance(node, Number) and literal_type(node.value) is not None and float(node.value) != 0
+
+class LoopOptimizer(ResolvingPass):
+    # Loop-invariant code motion: pure expressions inside a loop whose
+    # variables are neither declared nor assigned in it are computed once
+    # into a temporary declared just before the loop. Strength reduction:
+    # for an induction variable i stepped by a constant c as the last thing
+    # in each iteration, i * k (k a constant or loop-invariant int) becomes
+    # a temporary that starts at i * k and is advanced by c * k.
+    #
+    # Hoisted expressions are evaluated even if the loop runs zero times,
+    # so anything that could trap (calls, division by a variable) stays.
+    TEMP_TYPES = {INT: 'int', DOUBLE: 'float', BOOL: 'bool', STRING: 'string'}
+    
+    def __init__(self):
+        super().__init__()
+        self.names: Set[str] = set()
+        self.counts = {'hoisted': 0, 'strength_reduced': 0}
+    
+    def stats(self) -> dict:
+        return dict(self.counts)
+    
+    def optimize(self, program: Program) -> Program:
+        self.resolve(program.statements, [{}])
+        for statement in walk_statements(program.statements):
+            if isinstance(statement, (VarDeclaration, Assignment)):
+                self.names.add(statement.name)
+            rewrite_expressions(statement, self.collect_names)
+        program.statements = self.optimize_block(program.statements)
+        return program
+    
+    def collect_names(self, node: ASTNode) -> ASTNode:
+        for child in expression_nodes(node):
+            if isinstance(child, (Identifier, FunctionCall)):
+                self.names.add(child.name)
+        return node
+    
+    def temp_name(self, prefix: str) -> str:
+        index = 0
+        while f"{prefix}_{index}" in self.names:
+            index += 1
+        name = f"{prefix}_{index}"
+        self.names.add(name)
+        return name
+    
+    def declare_temp(self, var_type: str, prefix: str, value: ASTNode) -> VarDeclaration:
+        declaration = VarDeclaration(var_type, self.temp_name(prefix), value)
+        self.symbols[id(declaration)] = id(declaration)
+        self.declarations[id(declaration)] = declaration
+        return declaration
+    
+    def temp_reference(self, declaration: VarDeclaration) -> Identifier:
+        reference = Identifier(declaration.name)
+        self.symbols[id(reference)] = id(declaration)
+        return reference
+    
+    def copy(self, node: ASTNode) -> ASTNode:
+        if isinstance(node, BinaryOp):
+            return BinaryOp(self.copy(node.left), node.operator, self.copy(node.right))
+        if isinstance(node, UnaryOp):
+            return UnaryOp(node.operator, self.copy(node.operand))
+        if isinstance(node, FunctionCall):
+            return FunctionCall(node.name, [self.copy(argument) for argument in node.arguments])
+        clone = Identifier(node.name) if isinstance(node, Identifier) else type(node)(node.value)
+        if id(node) in self.symbols:
+            self.symbols[id(clone)] = self.symbols[id(node)]
+        return clone
+    
+    def optimize_block(self, statements: List[ASTNode]) -> List[ASTNode]:
+        result = []
+        for statement in statements:
+            if isinstance(statement, (WhileLoop, ForLoop)):
+                result.extend(self.optimize_loop(statement))
+                continue
+            if isinstance(statement, IfStatement):
+                statement.then_block = self.optimize_block(statement.then_block)
+                if statement.else_block:
+                    statement.else_block = self.optimize_block(statement.else_block)
+            result.append(statement)
+        return result
+    
+    def optimize_loop(self, loop: ASTNode) -> List[ASTNode]:
+        # Outer loops first, so an expression invariant in several nested
+        # loops is hoisted out of all of them.
+        parts = [part for part in (getattr(loop, 'init', None), getattr(loop, 'update', None)) if part]
+        assigned = set()
+        declared = set()
+        for statement in walk_statements(parts + loop.body):
+            if isinstance(statement, VarDeclaration):
+                declared.add(id(statement))
+            elif isinstance(statement, Assignment):
+                assigned.add(self.symbols.get(id(statement)))
+        
+        preheader = self.reduce_strength(loop, assigned, declared)
+        temps: Dict[str, VarDeclaration] = {}
+        hoist = lambda node: self.hoist(node, assigned, declared, preheader, temps)
+        if loop.condition is not None:
+            loop.condition = hoist(loop.condition)
+        # A for loop's init clause runs once, so there is nothing to gain there.
+        update = [loop.update] if isinstance(loop, ForLoop) and loop.update else []
+        for statement in walk_statements(update + loop.body):
+            rewrite_expressions(statement, hoist)
+        
+        loop.body = self.optimize_block(loop.body)
+        return preheader + [loop]
+    
+    def is_invariant(self, node: ASTNode, assigned: Set[Hashable], declared: Set[int]) -> bool:
+        for child in expression_nodes(node):
+            if isinstance(child, FunctionCall):
+                return False
+            if isinstance(child, BinaryOp) and child.operator in ('/', '%') and not is_nonzero_literal(child.right):
+                return False
+            if isinstance(child, Identifier) and child.name not in ('true', 'false'):
+                symbol = self.symbols.get(id(child))
+                if not isinstance(symbol, int) or symbol in assigned or symbol in declared:
+                    return False
+        return True
+    
+    def expression_type(self, node: ASTNode) -> Optional[str]:
+        if isinstance(node, Number):
+            return literal_type(node.value)
+        if isinstance(node, String):
+            return CSTR
+        if isinstance(node, Identifier):
+            if node.name in ('true', 'false'):
+                return BOOL
+            declaration = self.declarations.get(self.symbols.get(id(node)))
+            return VAR_TYPES.get(declaration.var_type) if declaration else None
+        if isinstance(node, UnaryOp):
+            operand_type = self.expression_type(node.operand)
+            return BOOL if node.operator == '!' else arithmetic_type(operand_type, INT)
+        if isinstance(node, BinaryOp):
+            return binary_type(node.operator, self.expression_type(node.left), self.expression_type(node.right))
+        return None
+    
+    def hoist(self, node: ASTNode, assigned: Set[Hashable], declared: Set[int],
+              preheader: List[ASTNode], temps: Dict[str, VarDeclaration]) -> ASTNode:
+        # Replaces the largest invariant subexpressions with temporaries;
+        # repeated occurrences of the same expression share one.
+        if isinstance(node, (BinaryOp, UnaryOp)) and not is_literal(node) and \
+           any(isinstance(child, Identifier) and child.name not in ('true', 'false')
+               for child in expression_nodes(node)) and \
+           self.is_invariant(node, assigned, declared):
+            temp_type = self.TEMP_TYPES.get(self.expression_type(node))
+            if temp_type is not None:
+                key = repr(node)
+                declaration = temps.get(key)
+                if declaration is None:
+                    declaration = temps[key] = self.declare_temp(temp_type, 'inv', node)
+                    preheader.append(declaration)
+                    self.counts['hoisted'] += 1
+                return self.temp_reference(declaration)
+        
+        if isinstance(node, BinaryOp):
+            node.left = self.hoist(node.left, assigned, declared, preheader, temps)
+            node.right = self.hoist(node.right, assigned, declared, preheader, temps)
+        elif isinstance(node, UnaryOp):
+            node.operand = self.hoist(node.operand, assigned, declared, preheader, temps)
+        elif isinstance(node, FunctionCall):
+            node.arguments = [self.hoist(argument, assigned, declared, preheader, temps)
+                              for argument in node.arguments]
+        return node
+    
+    def induction_step(self, update: Optional[ASTNode]) -> Optional[Tuple[Hashable, str, int]]:
+        # Matches i = i + c, i = c + i and i = i - c for an int literal c.
+        if not isinstance(update, Assignment) or not isinstance(update.value, BinaryOp):
+            return None
+        symbol = self.symbols.get(id(update))
+        value = update.value
+        if value.operator == '+':
+            candidates = ((value.left, value.right), (value.right, value.left))
+        elif value.operator == '-':
+            candidates = ((value.left, value.right),)
+        else:
+            return None
+        for variable, step in candidates:
+            if isinstance(variable, Identifier) and \
+               self.symbols.get(id(variable)) == symbol and isinstance(step, Number) and \
+               literal_type(step.value) == INT and int(step.value) != 0:
+                return symbol, value.operator, int(step.value)
+        return None
+    
+    def reduce_strength(self, loop: ASTNode, assigned: Set[Hashable], declared: Set[int]) -> List[ASTNode]:
+        if isinstance(loop, ForLoop):
+            update, region = loop.update, loop.body
+        elif loop.body and isinstance(loop.body[-1], Assignment):
+            update, region = loop.body[-1], loop.body[:-1]
+        else:
+            return []
+        induction = self.induction_step(update)
+        if induction is None or not isinstance(induction[0], int):
+            return []
+        symbol, operator, step = induction
+        if VAR_TYPES.get(self.declarations[symbol].var_type) != INT:
+            return []
+        
+        # The update must be the only write to i inside the loop, and its
+        # starting value must be safe to evaluate once more before the loop.
+        loop_statements = [update] + loop.body if isinstance(loop, ForLoop) else loop.body
+        writes = [statement for statement in walk_statements(loop_statements)
+                  if isinstance(statement, Assignment) and self.symbols.get(id(statement)) == symbol]
+        if len(writes) != 1 or writes[0] is not update:
+            return []
+        if isinstance(loop, ForLoop):
+            init = loop.init
+            if not isinstance(init, (VarDeclaration, Assignment)) or init.value is None or \
+               self.symbols.get(id(init)) != symbol or not self.is_invariant(init.value, set(), set()):
+                return []
+            start = init.value
+        else:
+            start = Identifier(self.declarations[symbol].name)
+            self.symbols[id(start)] = symbol
+        
+        preheader = []
+        temps: Dict[str, VarDeclaration] = {}
+        
+        def reduce(node: ASTNode) -> ASTNode:
+            if isinstance(node, BinaryOp):
+                node.left = reduce(node.left)
+                node.right = reduce(node.right)
+                if node.operator == '*':
+                    for variable, factor in ((node.left, node.right), (node.right, node.left)):
+                        if isinstance(variable, Identifier) and self.symbols.get(id(variable)) == symbol and \
+                           self.is_factor(factor, step, assigned, declared):
+                            return self.temp_reference(self.induction_temp(
+                                factor, start, operator, step, loop, preheader, temps, assigned))
+            elif isinstance(node, UnaryOp):
+                node.operand = reduce(node.operand)
+            elif isinstance(node, FunctionCall):
+                node.arguments = [reduce(argument) for argument in node.arguments]
+            return node
+        
+        if loop.condition is not None:
+            loop.condition = reduce(loop.condition)
+        for statement in walk_statements(region):
+            rewrite_expressions(statement, reduce)
+        return preheader
+    
+    def is_factor(self, node: ASTNode, step: int, assigned: Set[Hashable], declared: Set[int]) -> bool:
+        # The stride c * k is written as a literal when k is one, so it has
+        # to fit in an int.
+        if isinstance(node, Number):
+            return literal_type(node.value) == INT and step * int(node.value) <= INT_MAX
+        return isinstance(node, Identifier) and self.expression_type(node) == INT and \
+            self.is_invariant(node, assigned, declared)
+    
+    def induction_temp(self, factor: ASTNode, start: ASTNode, operator: str, step: int, loop: ASTNode,
+                       preheader: List[ASTNode], temps: Dict[str, VarDeclaration],
+                       assigned: Set[Hashable]) -> VarDeclaration:
+        self.counts['strength_reduced'] += 1
+        key = repr(factor)
+        if key in temps:
+            return temps[key]
+        
+        if isinstance(factor, Number):
+            stride = Number(str(step * int(factor.value)))
+        elif step == 1:
+            stride = self.copy(factor)
+        else:
+            stride = BinaryOp(Number(str(step)), '*', self.copy(factor))
+        declaration = temps[key] = self.declare_temp('int', 'ind', BinaryOp(self.copy(start), '*', self.copy(factor)))
+        preheader.append(declaration)
+        assigned.add(id(declaration))
+        
+        advance = Assignment(declaration.name, BinaryOp(self.temp_reference(declaration), operator, stride))
+        self.symbols[id(advance)] = id(declaration)
+        loop.body.append(advance)
+        return declaration
+
+def has_declarations(statements: List[ASTNode]) -> bool:
+    return any(isinstance(statement, VarDeclaration) for statement in statements)
+
+def optimize_program(program: Program, level: int = 1, stats: Optional[dict] = None) -> Program:
+    # -O1 folds constants, -O2 also removes dead code and -O3 also optimizes
+    # loops. Statistics from the passes that report them are merged into
+    # stats if given.
+    if level >= 1:
+        program = ConstantFolder().optimize(program)
+    if level >= 2:
+        eliminator = DeadCodeEliminator()
+        program = eliminator.optimize(program)
+        if stats is not None:
+            stats.update(eliminator.stats())
+    if level >= 3:
+        loop_optimizer = LoopOptimizer()
+        program = loop_optimizer.optimize(program)
+        if stats is not None:
+            stats.update(loop_optimizer.stats())
+        # Temporaries start from expressions such as 0 * k; fold those too.
+        program = ConstantFolder().optimize(program)
+    return program
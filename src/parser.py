@@ -1,42 +1,105 @@
-from typing import List, Optional
-from src.lexer import Token, TokenType
+from typing import Iterable, Iterator, List, Optional
+from src.diagnostics import Diagnostic, VoltSyntaxError
+from src.lexer import Lexer, Token, TokenType, TokenStream
 from src.ast_nodes import *
 
+# Binding strength of the binary operators, all left-associative; the
+# prefix operators bind tighter than any of them.
+BINARY_PRECEDENCE = {
+    '||': 1,
+    '&&': 2,
+    '==': 3, '!=': 3,
+    '<': 4, '>': 4, '<=': 4, '>=': 4,
+    '+': 5, '-': 5,
+    '*': 6, '/': 6, '%': 6,
+}
+UNARY_OPERATORS = ('-', '!')
+# Keywords that start a statement; error recovery resumes parsing at them.
+STATEMENT_KEYWORDS = ('int', 'float', 'string', 'bool', 'void', 'if', 'while', 'for', 'return', 'print')
+
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.pos = 0
+    def __init__(self, tokens: Iterable[Token], recover: bool = False):
+        self.stream = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)
+        # With recover, parse() does not stop at the first syntax error: each
+        # statement that fails is recorded in diagnostics and skipped (panic
+        # mode), and parsing carries on with the next one.
+        self.recover = recover
+        self.diagnostics: List[Diagnostic] = []
     
     def current_token(self) -> Token:
-        if self.pos >= len(self.tokens):
-            return self.tokens[-1]
-        return self.tokens[self.pos]
+        return self.stream.current
     
     def peek_token(self, offset: int = 1) -> Token:
-        pos = self.pos + offset
-        if pos >= len(self.tokens):
-            return self.tokens[-1]
-        return self.tokens[pos]
+        return self.stream.peek(offset)
     
     def advance(self):
-        if self.pos < len(self.tokens) - 1:
-            self.pos += 1
+        self.stream.advance()
     
     def expect(self, token_type: TokenType, value: str = None) -> Token:
         token = self.current_token()
         if token.type != token_type:
-            raise SyntaxError(f"Expected {token_type}, got {token.type} at line {token.line}")
+            raise VoltSyntaxError(f"Expected {token_type}, got {token.type}", token.line, token.column)
         if value and token.value != value:
-            raise SyntaxError(f"Expected '{value}', got '{token.value}' at line {token.line}")
+            raise VoltSyntaxError(f"Expected '{value}', got '{token.value}'", token.line, token.column)
         self.advance()
         return token
     
     def parse(self) -> Program:
         statements = []
         while self.current_token().type != TokenType.EOF:
-            statements.append(self.parse_statement())
+            if self.recover:
+                self.parse_recovering(statements, nested=False)
+            else:
+                statements.append(self.parse_statement())
         return Program(statements)
     
+    def iter_statements(self) -> Iterator[ASTNode]:
+        # The top-level statements one at a time, for callers that handle
+        # each as it is parsed instead of holding the whole program.
+        while self.current_token().type != TokenType.EOF:
+            yield self.parse_statement()
+    
+    def parse_recovering(self, statements: List[ASTNode], nested: bool):
+        start = self.stream.position
+        try:
+            statements.append(self.parse_statement())
+        except VoltSyntaxError as e:
+            self.diagnostics.append(e.diagnostic)
+            if self.stream.position == start:
+                # A stray closing brace or semicolon is a boundary itself.
+                kind = self.current_token().type
+                self.advance()
+                if kind in (TokenType.RBRACE, TokenType.SEMICOLON):
+                    return
+            self.synchronize(nested)
+    
+    def synchronize(self, nested: bool):
+        # Skips to the end of the broken statement: past a semicolon or a
+        # block's closing brace (and any else after it), or up to a keyword
+        # that starts a statement. Braces opened while skipping are matched;
+        # in a block, an unmatched closing brace is left to close the block.
+        depth = 0
+        while True:
+            token = self.current_token()
+            kind = token.type
+            if kind == TokenType.EOF:
+                return
+            if depth == 0 and kind == TokenType.KEYWORD and token.value in STATEMENT_KEYWORDS:
+                return
+            if kind == TokenType.RBRACE and depth == 0 and nested:
+                return
+            self.advance()
+            if kind == TokenType.LBRACE:
+                depth += 1
+            elif kind == TokenType.RBRACE:
+                depth = max(depth - 1, 0)
+                if depth == 0:
+                    following = self.current_token()
+                    if following.type != TokenType.KEYWORD or following.value != 'else':
+                        return
+            elif kind == TokenType.SEMICOLON and depth == 0:
+                return
+    
     def parse_statement(self) -> ASTNode:
         token = self.current_token()
         
@@ -62,7 +125,7 @@ class Parser:
                 self.expect(TokenType.SEMICOLON)
                 return stmt
         
-        raise SyntaxError(f"Unexpected token {token.value} at line {token.line}")
+        raise VoltSyntaxError(f"Unexpected token {token.value}", token.line, token.column)
     
     def parse_var_declaration(self) -> VarDeclaration:
         var_type = self.current_token().value
@@ -116,10 +179,10 @@ class Parser:
         if self.current_token().type != TokenType.SEMICOLON:
             if self.current_token().value in ['int', 'float', 'string', 'bool']:
                 init = self.parse_var_declaration()
-                self.pos -= 1
+                self.stream.rewind()
             else:
                 init = self.parse_assignment()
-                self.pos -= 1
+                self.stream.rewind()
         self.expect(TokenType.SEMICOLON)
         
         condition = None
@@ -157,8 +220,12 @@ class Parser:
     def parse_block(self) -> List[ASTNode]:
         self.expect(TokenType.LBRACE)
         statements = []
-        while self.current_token().type != TokenType.RBRACE:
-            statements.append(self.parse_statement())
+        if self.recover:
+            while self.current_token().type not in (TokenType.RBRACE, TokenType.EOF):
+                self.parse_recovering(statements, nested=True)
+        else:
+            while self.current_token().type != TokenType.RBRACE:
+                statements.append(self.parse_statement())
         self.expect(TokenType.RBRACE)
         return statements
     
@@ -177,108 +244,92 @@ class Parser:
         return FunctionCall(name, arguments)
     
     def parse_expression(self) -> ASTNode:
-        return self.parse_logical_or()
-    
-    def parse_logical_or(self) -> ASTNode:
-        left = self.parse_logical_and()
-        
-        while self.current_token().type == TokenType.OPERATOR and self.current_token().value == '||':
-            op = self.current_token().value
-            self.advance()
-            right = self.parse_logical_and()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_logical_and(self) -> ASTNode:
-        left = self.parse_equality()
-        
-        while self.current_token().type == TokenType.OPERATOR and self.current_token().value == '&&':
-            op = self.current_token().value
-            self.advance()
-            right = self.parse_equality()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_equality(self) -> ASTNode:
-        left = self.parse_comparison()
-        
-        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['==', '!=']:
-            op = self.current_token().value
-            self.advance()
-            right = self.parse_comparison()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_comparison(self) -> ASTNode:
-        left = self.parse_term()
-        
-        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['<', '>', '<=', '>=']:
-            op = self.current_token().value
-            self.advance()
-            right = self.parse_term()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_term(self) -> ASTNode:
-        left = self.parse_factor()
-        
-        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['+', '-']:
-            op = self.current_token().value
-            self.advance()
-            right = self.parse_factor()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_factor(self) -> ASTNode:
-        left = self.parse_unary()
-        
-        while self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['*', '/', '%']:
-            op = self.current_token().value
-            self.advance()
-            right = self.parse_unary()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_unary(self) -> ASTNode:
-        if self.current_token().type == TokenType.OPERATOR and self.current_token().value in ['-', '!']:
-            op = self.current_token().value
-            self.advance()
-            operand = self.parse_unary()
-            return UnaryOp(op, operand)
-        
-        return self.parse_primary()
-    
-    def parse_primary(self) -> ASTNode:
-        token = self.current_token()
-        
-        if token.type == TokenType.NUMBER:
-            self.advance()
-            return Number(token.value)
-        
-        if token.type == TokenType.STRING:
-            self.advance()
-            return String(token.value)
-        
-        if token.type == TokenType.IDENTIFIER:
-            if self.peek_token().type == TokenType.LPAREN:
-                return self.parse_function_call()
-            self.advance()
-            return Identifier(token.value)
-        
-        if token.type == TokenType.KEYWORD and token.value in ['true', 'false']:
-            self.advance()
-            return Identifier(token.value)
-        
-        if token.type == TokenType.LPAREN:
-            self.advance()
-            expr = self.parse_expression()
-            self.expect(TokenType.RPAREN)
-            return expr
-        
-        raise SyntaxError(f"Unexpected token {token.value} at line {token.line}")
+        # Precedence climbing over BINARY_PRECEDENCE with explicit stacks in
+        # place of one Python frame per precedence level, so each operand is
+        # parsed in a single loop iteration and nesting depth is bounded only
+        # by memory. An open parenthesis or call argument list saves the
+        # enclosing operands, operators and pending prefix operators on
+        # frames, and restores them once it closes. Builds the same trees
+        # and raises the same errors as the recursive-descent grammar kept
+        # as RecursiveParser in benchmarks/expression_parser.py.
+        stream = self.stream
+        frames = []
+        operands: List[ASTNode] = []
+        operators: List[str] = []
+        prefixes: List[str] = []
+        while True:
+            token = stream.current
+            while token.type == TokenType.OPERATOR and token.value in UNARY_OPERATORS:
+                prefixes.append(token.value)
+                stream.advance()
+                token = stream.current
+            
+            kind = token.type
+            if kind == TokenType.NUMBER:
+                stream.advance()
+                node = Number(token.value)
+            elif kind == TokenType.STRING:
+                stream.advance()
+                node = String(token.value)
+            elif kind == TokenType.IDENTIFIER and stream.peek().type == TokenType.LPAREN:
+                stream.advance()
+                stream.advance()
+                if stream.current.type != TokenType.RPAREN:
+                    frames.append((operands, operators, prefixes, token.value, []))
+                    operands, operators, prefixes = [], [], []
+                    continue
+                stream.advance()
+                node = FunctionCall(token.value, [])
+            elif kind == TokenType.IDENTIFIER or (kind == TokenType.KEYWORD and token.value in ('true', 'false')):
+                stream.advance()
+                node = Identifier(token.value)
+            elif kind == TokenType.LPAREN:
+                stream.advance()
+                frames.append((operands, operators, prefixes, None, None))
+                operands, operators, prefixes = [], [], []
+                continue
+            else:
+                raise VoltSyntaxError(f"Unexpected token {token.value}", token.line, token.column)
+            
+            while True:
+                while prefixes:
+                    node = UnaryOp(prefixes.pop(), node)
+                token = stream.current
+                precedence = BINARY_PRECEDENCE.get(token.value) if token.type == TokenType.OPERATOR else None
+                while operators and (precedence is None or BINARY_PRECEDENCE[operators[-1]] >= precedence):
+                    node = BinaryOp(operands.pop(), operators.pop(), node)
+                if precedence is not None:
+                    operands.append(node)
+                    operators.append(token.value)
+                    stream.advance()
+                    break
+                if not frames:
+                    return node
+                
+                # The operand closes the innermost parenthesis or argument.
+                operands, operators, prefixes, name, arguments = frames.pop()
+                if arguments is None:
+                    self.expect(TokenType.RPAREN)
+                    continue
+                arguments.append(node)
+                if stream.current.type == TokenType.COMMA:
+                    stream.advance()
+                    frames.append((operands, operators, prefixes, name, arguments))
+                    operands, operators, prefixes = [], [], []
+                    break
+                self.expect(TokenType.RPAREN)
+                node = FunctionCall(name, arguments)
+
+def diagnose(source: str) -> List[Diagnostic]:
+    # Every syntax error in a program, found in one recovering pass, in
+    # source order. Only the first error on a line is kept; later ones there
+    # are nearly always knock-on effects of it (such as a skipped stray
+    # character leaving two operands side by side).
+    lexer = Lexer(source, recover=True)
+    parser = Parser(lexer.iter_tokens(), recover=True)
+    parser.parse()
+    diagnostics = []
+    for diagnostic in sorted(lexer.diagnostics + parser.diagnostics, key=lambda d: (d.line, d.column)):
+        if not diagnostics or diagnostics[-1].line != diagnostic.line:
+            diagnostics.append(diagnostic)
+    return diagnostics
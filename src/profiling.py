@@ -0,0 +1,166 @@
+import importlib
+import os
+import time
+import tracemalloc
+import warnings
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Union
+from src.ast_nodes import Program
+from src.bytecode import compile_bytecode
+from src.codegen import CodeGenerator
+from src.lexer import Lexer
+from src.optimizer import count_nodes, optimize_program
+from src.parser import Parser
+from src.pycodegen import PythonGenerator
+
+# Callbacks run with every finished profile report, e.g. to export the
+# figures to a monitoring system. VOLT_PROFILE_HOOKS names more of them as
+# comma-separated module:function pairs, loaded on first use, so the CLI,
+# its worker processes and the web app can export without code changes.
+# A hook that fails, or cannot be loaded, is reported with a warning and
+# never fails the compile it reports on.
+hooks: List[Callable[[dict], None]] = []
+env_hooks: Optional[List[Callable[[dict], None]]] = None
+
+def add_hook(callback: Callable[[dict], None]):
+    hooks.append(callback)
+
+def remove_hook(callback: Callable[[dict], None]):
+    hooks.remove(callback)
+
+def load_env_hooks() -> List[Callable[[dict], None]]:
+    global env_hooks
+    if env_hooks is None:
+        env_hooks = []
+        for spec in filter(None, os.environ.get('VOLT_PROFILE_HOOKS', '').split(',')):
+            module, _, name = spec.strip().partition(':')
+            try:
+                env_hooks.append(getattr(importlib.import_module(module), name))
+            except Exception as e:
+                warnings.warn(f"cannot load profile hook {spec.strip()!r}: {e}", RuntimeWarning)
+    return env_hooks
+
+class Profile:
+    # Wall time of each compile phase and the sizes passed between them.
+    # With memory=True each phase also records its peak allocation above
+    # what was live when it started, traced with tracemalloc; tracing slows
+    # the compile down, and is process-wide, so peaks of compiles running
+    # concurrently in other threads bleed into each other.
+    def __init__(self, name: str = '<source>', memory: bool = False):
+        self.name = name
+        self.memory = memory
+        self.phases: dict = {}
+        self.counts: dict = {}
+        self.started_tracing = memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.start = time.perf_counter()
+    
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if self.memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {'ms': 0.0})
+            entry['ms'] += (time.perf_counter() - start) * 1000
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                entry['peak_bytes'] = max(entry.get('peak_bytes', 0), peak)
+    
+    def count(self, name: str, value: int):
+        self.counts[name] = value
+    
+    def finish(self, error: Optional[str] = None) -> dict:
+        report = {
+            'name': self.name,
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'phases': {name: {**entry, 'ms': round(entry['ms'], 3)} for name, entry in self.phases.items()},
+            **self.counts,
+        }
+        if self.memory:
+            report['peak_bytes'] = max((entry['peak_bytes'] for entry in self.phases.values()), default=0)
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        if error is not None:
+            report['error'] = error
+        for hook in [*hooks, *load_env_hooks()]:
+            try:
+                hook(report)
+            except Exception as e:
+                warnings.warn(f"profile hook {getattr(hook, '__qualname__', hook)!r} failed: {e}", RuntimeWarning)
+        return report
+
+def compile_profiled(source: str, profile: Profile, opt_level: int = 0, target: str = 'cpp',
+                     stats: Optional[dict] = None) -> Union[str, bytes]:
+    # The whole pipeline with every phase run to completion before the next
+    # one starts, so each can be timed on its own. (Normal compiles stream
+    # tokens into the parser and reuse cached statements instead.)
+    profile.count('source_bytes', len(source.encode()))
+    with profile.phase('lex'):
+        tokens = Lexer(source).tokenize()
+    profile.count('tokens', len(tokens) - 1)
+    with profile.phase('parse'):
+        program = Parser(tokens).parse()
+    del tokens
+    profile.count('nodes', program_nodes(program))
+    if opt_level:
+        with profile.phase('optimize'):
+            program = optimize_program(program, opt_level, stats)
+        profile.count('optimized_nodes', program_nodes(program))
+    with profile.phase('codegen'):
+        if target == 'bytecode':
+            output = compile_bytecode(program).to_bytes()
+        elif target == 'python':
+            output = PythonGenerator().generate(program, standalone=True)
+        else:
+            output = CodeGenerator().generate(program)
+    profile.count('output_bytes', len(output) if isinstance(output, bytes) else len(output.encode()))
+    return output
+
+def program_nodes(program: Program) -> int:
+    return 1 + sum(map(count_nodes, program.statements))
+
+def format_size(count: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024 or unit == 'MB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+def format_report(report: dict, indent: str = "  ") -> str:
+    lines = []
+    for name, entry in report['phases'].items():
+        line = f"{indent}{name:<9} {entry['ms']:>9.2f} ms"
+        if 'peak_bytes' in entry:
+            line += f"   peak {format_size(entry['peak_bytes']):>9}"
+        lines.append(line)
+    lines.append(f"{indent}{'total':<9} {report['total_ms']:>9.2f} ms")
+    sizes = [f"{report['tokens']} tokens" if 'tokens' in report else None,
+             f"{report['nodes']} AST nodes" if 'nodes' in report else None,
+             f"{report['optimized_nodes']} after optimizing" if 'optimized_nodes' in report else None,
+             f"{format_size(report['source_bytes'])} in" if 'source_bytes' in report else None,
+             f"{format_size(report['output_bytes'])} out" if 'output_bytes' in report else None,
+             f"peak {format_size(report['peak_bytes'])}" if 'peak_bytes' in report else None]
+    lines.append(indent + ", ".join(filter(None, sizes)))
+    return "\n".join(lines)
+
+def merge_reports(reports: List[dict]) -> dict:
+    # Phase times and sizes summed over a batch, peaks maximised.
+    merged = {'name': f"{len(reports)} files", 'total_ms': 0.0, 'phases': {}}
+    for report in reports:
+        for key, value in report.items():
+            if key == 'phases':
+                for name, entry in value.items():
+                    total = merged['phases'].setdefault(name, {'ms': 0.0})
+                    total['ms'] += entry['ms']
+                    if 'peak_bytes' in entry:
+                        total['peak_bytes'] = max(total.get('peak_bytes', 0), entry['peak_bytes'])
+            elif key == 'peak_bytes':
+                merged[key] = max(merged.get(key, 0), value)
+            elif isinstance(value, (int, float)):
+                merged[key] = merged.get(key, 0) + value
+    return merged
@@ -0,0 +1,312 @@
+import hashlib
+import inspect
+import math
+import sys
+from types import CodeType
+from typing import List, Optional, TextIO, Tuple
+from src.ast_nodes import *
+from src.cache import LRUCache
+from src.interpreter import (INT_MIN, CompileError, DEFAULTS, IterationLimitExceeded, SlotResolver, VoltRuntimeError,
+                             binary_operation, condition_conversion, conversion, decode_string, divide_double,
+                             divide_int, double_to_int, literal_value, modulo_int, unary_operation, wrap_int)
+from src.optimizer import INT, DOUBLE, BOOL, CSTR
+
+# Python translations of the VoltScript types: int is a Python int kept in
+# the 32-bit range, float a Python float, string a str and bool a bool. The
+# helpers the generated code calls are the interpreter's own, so all three
+# in-process backends share one definition of division, wrapping and
+# conversion.
+RUNTIME = {
+    'INT_MIN': INT_MIN,
+    'math': math,
+    'VoltRuntimeError': VoltRuntimeError,
+    'IterationLimitExceeded': IterationLimitExceeded,
+    'wrap_int': wrap_int,
+    'double_to_int': double_to_int,
+    'divide_int': divide_int,
+    'modulo_int': modulo_int,
+    'divide_double': divide_double,
+}
+
+# Masking is cheaper than a range check here, since the generated code has
+# nowhere to keep the unwrapped value without another statement.
+WRAP = "((({} + 2147483648) & 4294967295) - 2147483648)"
+
+# Compiled programs keyed by a hash of their Python source.
+code_cache = LRUCache(256)
+
+class PythonGenerator(SlotResolver):
+    # Translates a program into the body of a Python function, main(_write),
+    # that returns the exit status. Every VoltScript variable becomes a local
+    # named after its slot, so shadowed names stay apart and each access is a
+    # fast local lookup. Expressions are typed as the interpreter types them
+    # and come back fully parenthesised, since Python chains comparisons.
+    def __init__(self, max_iterations: Optional[int] = None):
+        super().__init__()
+        self.max_iterations = max_iterations
+        self.lines: List[str] = []
+        self.indent_level = 1
+        self.statement_handlers = self.dispatch_table('generate_')
+        self.expression_handlers = self.dispatch_table('expr_')
+    
+    def generate(self, program: Program, standalone: bool = False) -> str:
+        # A standalone module carries its runtime helpers and runs main() on
+        # stdout when executed as a script.
+        self.lines = ["def main(_write):"]
+        if self.max_iterations is not None:
+            self.emit(f"_budget = {self.max_iterations}")
+        self.generate_statements(program.statements)
+        self.emit("return 0")
+        if not standalone:
+            return "\n".join(self.lines) + "\n"
+        return STANDALONE_PRELUDE + "\n".join(self.lines) + "\n" + STANDALONE_MAIN
+    
+    def write(self, program: Program, sink: TextIO) -> int:
+        text = self.generate(program, standalone=True)
+        sink.write(text)
+        return len(text)
+    
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent_level + line)
+    
+    def local(self, name: str, slot: int) -> str:
+        # The slot suffix keeps locals clear of Python keywords and of the
+        # runtime helpers, none of which end in _<digits>.
+        return f"{name}_{slot}"
+    
+    def generate_block(self, statements: List[ASTNode]):
+        self.scopes.append({})
+        self.indent_level += 1
+        try:
+            self.generate_statements(statements)
+        finally:
+            self.indent_level -= 1
+            self.scopes.pop()
+    
+    def generate_statements(self, statements: List[ASTNode]):
+        start = len(self.lines)
+        for statement in statements:
+            self.generate_statement(statement)
+        if len(self.lines) == start:
+            self.emit("pass")
+    
+    def generate_statement(self, node: ASTNode):
+        self.statement_handlers[node.__class__](self, node)
+    
+    def generate_ast_node(self, node: ASTNode):
+        raise CompileError(f"cannot execute {type(node).__name__}")
+    
+    def generate_var_declaration(self, node: VarDeclaration):
+        # The name is in scope within its own initializer, as in C++.
+        slot, var_type = self.declare(node.name, node.var_type)
+        if node.value is None:
+            value = repr(DEFAULTS[var_type])
+        else:
+            value = self.convert(self.generate_expression(node.value), var_type)
+        self.emit(f"{self.local(node.name, slot)} = {value}")
+    
+    def generate_assignment(self, node: Assignment):
+        slot, var_type = self.lookup(node.name)
+        value = self.convert(self.generate_expression(node.value), var_type)
+        self.emit(f"{self.local(node.name, slot)} = {value}")
+    
+    def generate_if_statement(self, node: IfStatement):
+        self.emit(f"if {self.condition(node.condition)}:")
+        self.generate_block(node.then_block)
+        if node.else_block:
+            self.emit("else:")
+            self.generate_block(node.else_block)
+    
+    def generate_while_loop(self, node: WhileLoop):
+        self.emit(f"while {self.condition(node.condition)}:")
+        self.count_iteration()
+        self.generate_block(node.body)
+    
+    def generate_for_loop(self, node: ForLoop):
+        # There is no break or continue, so the update can simply follow the
+        # body inside a while loop.
+        self.scopes.append({})
+        try:
+            if node.init:
+                self.generate_statement(node.init)
+            condition = self.condition(node.condition) if node.condition else "True"
+            self.emit(f"while {condition}:")
+            self.count_iteration()
+            self.generate_block(node.body)
+            if node.update:
+                self.indent_level += 1
+                self.generate_statement(node.update)
+                self.indent_level -= 1
+        finally:
+            self.scopes.pop()
+    
+    def count_iteration(self):
+        if self.max_iterations is None:
+            return
+        self.indent_level += 1
+        self.emit("_budget -= 1")
+        self.emit("if _budget < 0:")
+        self.emit(f"    raise IterationLimitExceeded('iteration limit of {self.max_iterations} exceeded')")
+        self.indent_level -= 1
+    
+    def generate_print_statement(self, node: PrintStatement):
+        value, value_type = self.generate_expression(node.expression)
+        if value_type == INT:
+            self.emit(f"_write('%d\\n' % {value})")
+        elif value_type == BOOL:
+            self.emit(f"_write('1\\n' if {value} else '0\\n')")
+        elif value_type == DOUBLE:
+            self.emit(f"_write('%g\\n' % {value})")
+        else:
+            self.emit(f"_write({value} + '\\n')")
+    
+    def generate_function_call(self, node: FunctionCall):
+        self.expr_function_call(node)
+    
+    def generate_return_statement(self, node: ReturnStatement):
+        # Programs are the body of main(), so return ends the program.
+        if node.value is None:
+            raise CompileError("return-statement with no value, in function returning 'int'")
+        self.emit(f"return {self.convert(self.generate_expression(node.value), INT)}")
+    
+    def generate_expression(self, node: ASTNode) -> Tuple[str, str]:
+        return self.expression_handlers[node.__class__](self, node)
+    
+    def condition(self, node: ASTNode) -> str:
+        # In a condition only truthiness matters, so && and || stay Python's
+        # and/or without being turned back into a bool.
+        if isinstance(node, BinaryOp) and node.operator in ('&&', '||'):
+            op = 'and' if node.operator == '&&' else 'or'
+            return f"({self.condition(node.left)} {op} {self.condition(node.right)})"
+        value, value_type = self.generate_expression(node)
+        return value if condition_conversion(value_type) is None else "True"
+    
+    def convert(self, value: Tuple[str, str], target: str) -> str:
+        text, source = value
+        kind = conversion(source, target)
+        if kind is None:
+            return text
+        if kind == 'bool_to_int':
+            return f"(1 if {text} else 0)"
+        if kind == 'double_to_int':
+            return f"double_to_int({text})"
+        if kind == 'to_double':
+            return f"float({text})"
+        if kind == 'to_bool':
+            return f"({text} != 0)"
+        return "True"
+    
+    def expr_ast_node(self, node: ASTNode) -> Tuple[str, str]:
+        raise CompileError(f"cannot evaluate {type(node).__name__}")
+    
+    def expr_number(self, node: Number) -> Tuple[str, str]:
+        value, value_type = literal_value(node.value)
+        if value_type == DOUBLE and not math.isfinite(value):
+            return "math.inf", value_type
+        return repr(value), value_type
+    
+    def expr_string(self, node: String) -> Tuple[str, str]:
+        return repr(decode_string(node.value)), CSTR
+    
+    def expr_identifier(self, node: Identifier) -> Tuple[str, str]:
+        if node.name in ('true', 'false'):
+            return repr(node.name == 'true'), BOOL
+        slot, var_type = self.lookup(node.name)
+        return self.local(node.name, slot), var_type
+    
+    def expr_unary_op(self, node: UnaryOp) -> Tuple[str, str]:
+        operand, operand_type = self.generate_expression(node.operand)
+        kind, result_type = unary_operation(node.operator, operand_type)
+        if kind == 'not':
+            return f"(not {operand})", result_type
+        if kind == 'false':
+            return "False", result_type
+        if kind == 'negate' or operand.isdigit():
+            # Negating an int literal cannot leave the int range.
+            return f"(-{operand})", result_type
+        return WRAP.format(f"-{operand}"), result_type
+    
+    def expr_binary_op(self, node: BinaryOp) -> Tuple[str, str]:
+        op = node.operator
+        if op in ('&&', '||'):
+            return f"(True if {self.condition(node)} else False)", BOOL
+        
+        left, left_type = self.generate_expression(node.left)
+        right, right_type = self.generate_expression(node.right)
+        kind, result_type = binary_operation(op, left_type, right_type)
+        if kind in ('compare', 'concat'):
+            return f"({left} {op} {right})", result_type
+        if kind == 'int':
+            return self.int_arithmetic(op, left, right), result_type
+        if op == '/':
+            if right.replace('.', '', 1).isdigit() and float(right):
+                return f"({left} / {right})", result_type
+            return f"divide_double({left}, {right})", result_type
+        return f"({left} {op} {right})", result_type
+    
+    def int_arithmetic(self, op: str, left: str, right: str) -> str:
+        if op in ('+', '-', '*'):
+            return WRAP.format(f"{left} {op} {right}")
+        # By a positive literal, truncating division and remainder only need
+        # the sign of the left operand, and the result is always in range.
+        if right.isdigit() and int(right) > 0 and left.isidentifier():
+            python_op = '//' if op == '/' else '%'
+            return f"({left} {python_op} {right} if {left} >= 0 else -(-{left} {python_op} {right}))"
+        if op == '/':
+            return f"divide_int({left}, {right})"
+        return f"modulo_int({left}, {right})"
+    
+    def expr_function_call(self, node: FunctionCall) -> Tuple[str, str]:
+        raise CompileError(f"'{node.name}' was not declared in this scope")
+
+# A .py file written by voltc runs on its own: the helpers are copied from
+# the interpreter so a script and an in-process run behave identically.
+STANDALONE_PRELUDE = "".join([
+    "# Generated by voltc from VoltScript.\n",
+    "import math\n",
+    "import sys\n",
+    "\n",
+    f"INT_MIN = {INT_MIN}\n",
+    "\n",
+    *(inspect.getsource(helper) + "\n" for helper in (
+        VoltRuntimeError, IterationLimitExceeded, wrap_int, double_to_int, divide_int, modulo_int, divide_double)),
+])
+
+STANDALONE_MAIN = (
+    "\n"
+    "if __name__ == '__main__':\n"
+    "    try:\n"
+    "        status = main(sys.stdout.write)\n"
+    "    except VoltRuntimeError as e:\n"
+    "        sys.stdout.flush()\n"
+    "        print(f'Runtime Error: {e}', file=sys.stderr)\n"
+    "        sys.exit(1)\n"
+    "    sys.exit(status)\n"
+)
+
+def compile_source(source: str) -> CodeType:
+    # compile() dominates the cost of a short program, so code objects are
+    # reused whenever the same Python source comes round again.
+    key = hashlib.sha256(source.encode()).digest()
+    code = code_cache.get(key)
+    if code is None:
+        try:
+            code = compile(source, '<voltscript>', 'exec')
+        except (SyntaxError, RecursionError, MemoryError) as e:
+            # CPython caps nested blocks and parentheses far below what the
+            # parser accepts.
+            raise CompileError(f"program is too deeply nested for the Python backend ({e})") from None
+        code_cache.put(key, code)
+    return code
+
+def compile_python(program: Program, max_iterations: Optional[int] = None) -> CodeType:
+    return compile_source(PythonGenerator(max_iterations).generate(program))
+
+def run_code(code: CodeType, output: Optional[TextIO] = None) -> int:
+    namespace = dict(RUNTIME)
+    exec(code, namespace)
+    return namespace['main']((output or sys.stdout).write)
+
+def run_python(program: Program, output: Optional[TextIO] = None,
+               max_iterations: Optional[int] = None) -> int:
+    return run_code(compile_python(program, max_iterations), output)
@@ -0,0 +1,362 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+from dataclasses import asdict
+from typing import Dict, Optional, Tuple
+from src.cache import LRUCache
+from src.codegen import CodeGenerator
+from src.fragments import fragment_cache, generate_cached
+from src.lexer import Lexer
+from src.optimizer import optimize_program
+from src.parser import Parser, diagnose
+from src.profiling import Profile, compile_profiled
+from src.pycodegen import PythonGenerator
+
+# /compile targets and the response field each one's output goes in.
+COMPILE_TARGETS = {'cpp': 'cpp_code', 'python': 'python_code'}
+
+def compile_source(source_code: str, opt_level: int = 0, target: str = 'cpp',
+                   fragments: LRUCache = fragment_cache, profile: bool = False) -> dict:
+    # The /compile response for a program, shared by the Flask app and the
+    # compile service's workers. A profiled compile runs each phase on its
+    # own and reports them in 'profile'. A program with syntax errors gets
+    # all of them in 'errors', from a second, recovering parse.
+    report = Profile('<request>', memory=True) if profile else None
+    try:
+        if report is not None:
+            stats = {}
+            code = compile_profiled(source_code, report, opt_level, target, stats)
+        elif not opt_level and target == 'cpp':
+            return {
+                'success': True,
+                'cpp_code': generate_cached(source_code, fragments)
+            }
+        else:
+            lexer = Lexer(source_code)
+            tokens = lexer.tokenize()
+            
+            parser = Parser(tokens)
+            ast = parser.parse()
+            stats = {}
+            ast = optimize_program(ast, opt_level, stats)
+            
+            if target == 'python':
+                code = PythonGenerator().generate(ast, standalone=True)
+            else:
+                code = CodeGenerator().generate(ast)
+        
+        response = {
+            'success': True,
+            COMPILE_TARGETS[target]: code
+        }
+        if stats:
+            response['optimizer_stats'] = stats
+            
+    except SyntaxError as e:
+        response = {
+            'success': False,
+            'error': f'Syntax Error: {str(e)}',
+            'errors': [asdict(diagnostic) for diagnostic in diagnose(source_code)]
+        }
+    except Exception as e:
+        response = {
+            'success': False,
+            'error': f'Error: {str(e)}'
+        }
+    if report is not None:
+        response['profile'] = report.finish(response.get('error'))
+    return response
+
+def worker_main(connection):
+    # Runs in each pool process: compiles one request at a time and sends
+    # back the serialized response, until the pipe is closed.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            source_code, opt_level, target, profile = connection.recv()
+        except EOFError:
+            return
+        response = compile_source(source_code, opt_level, target, profile=profile)
+        connection.send_bytes(json.dumps(response).encode())
+
+class WorkerExited(Exception):
+    pass
+
+class QueueFull(Exception):
+    pass
+
+class Worker:
+    # One compile process and the pipe to it. The event loop waits for the
+    # reply without blocking, and a compile that is no longer wanted is
+    # stopped by killing the process.
+    def __init__(self, context):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+    
+    async def call(self, job: Tuple[str, int, str, bool]) -> bytes:
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.connection.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            self.connection.send(job)
+            await ready
+        finally:
+            loop.remove_reader(fd)
+        try:
+            return self.connection.recv_bytes()
+        except (EOFError, OSError):
+            raise WorkerExited(f"compile worker exited with status {self.process.exitcode}") from None
+    
+    def stop(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+POOL_STATS = ('completed', 'rejected', 'timed_out', 'cancelled', 'restarted')
+
+class CompilePool:
+    # A fixed set of worker processes shared through a queue of idle ones.
+    # At most queue_size requests wait for a worker; more are refused. The
+    # timeout covers both the wait and the compile, and a worker whose
+    # compile times out, is cancelled or dies is replaced by a fresh one.
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        # Replacement workers fork from a clean server process rather than
+        # from the event loop with its open sockets.
+        self.context = multiprocessing.get_context('forkserver')
+        self.context.set_forkserver_preload(['src.service'])
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(workers):
+            self.idle.put_nowait(Worker(self.context))
+        self.waiting = 0
+        self.stats = dict.fromkeys(POOL_STATS, 0)
+    
+    async def compile(self, job: Tuple[str, int, str, bool]) -> bytes:
+        if self.idle.empty() and self.waiting >= self.queue_size:
+            self.stats['rejected'] += 1
+            raise QueueFull()
+        
+        worker = None
+        try:
+            async with asyncio.timeout(self.timeout):
+                self.waiting += 1
+                try:
+                    worker = await self.idle.get()
+                finally:
+                    self.waiting -= 1
+                body = await worker.call(job)
+        except BaseException as e:
+            if isinstance(e, TimeoutError):
+                self.stats['timed_out'] += 1
+            elif isinstance(e, asyncio.CancelledError):
+                self.stats['cancelled'] += 1
+            if worker is not None:
+                # The worker may still be compiling, or be gone.
+                worker.stop()
+                worker = Worker(self.context)
+                self.stats['restarted'] += 1
+            raise
+        finally:
+            if worker is not None:
+                self.idle.put_nowait(worker)
+        
+        self.stats['completed'] += 1
+        return body
+    
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().stop()
+    
+    def snapshot(self) -> dict:
+        return {
+            'workers': self.workers,
+            'busy': self.workers - self.idle.qsize(),
+            'waiting': self.waiting,
+            'queue_size': self.queue_size,
+            'timeout': self.timeout,
+            **self.stats,
+        }
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error',
+           504: 'Gateway Timeout'}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def error_body(message: str) -> bytes:
+    return json.dumps({'success': False, 'error': message}).encode()
+
+async def read_request(reader: asyncio.StreamReader, max_body: int,
+                       prefix: bytes = b'') -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    # One HTTP/1.1 request, or None once the client has closed the
+    # connection. prefix is the first byte of a request that arrived while
+    # the previous one was being compiled.
+    line = prefix + await reader.readline()
+    if not line.endswith(b'\n'):
+        return None
+    try:
+        method, path, _ = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+    
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length") from None
+    if length > max_body:
+        raise HTTPError(413, f"Request body is larger than {max_body} bytes")
+    body = await reader.readexactly(length) if length > 0 else b''
+    return method, path.split('?', 1)[0], headers, body
+
+class CompileService:
+    # The /compile API served from an asyncio event loop. Compilation runs in
+    # the worker pool, so the loop only parses requests and moves bytes, and
+    # a large compile never holds up other clients. Responses are cached by
+    # source hash as in the Flask app, and a compile whose client has gone
+    # away is cancelled.
+    def __init__(self, pool: CompilePool, cache_size: int = 512, max_body: int = 16 << 20):
+        self.pool = pool
+        self.compile_cache = LRUCache(cache_size)
+        self.max_body = max_body
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        pending = b''
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self.max_body, pending)
+                except HTTPError as e:
+                    await self.respond(writer, e.status, error_body(str(e)), close=True)
+                    return
+                if request is None:
+                    return
+                method, path, headers, body = request
+                status, payload, job = self.route(method, path, body)
+                pending = b''
+                if job is not None:
+                    status, payload, pending = await self.compile(job, reader)
+                    if status is None:
+                        return
+                close = headers.get('connection', '').lower() == 'close'
+                await self.respond(writer, status, payload, close)
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload: bytes, close: bool = False):
+        head = [f"HTTP/1.1 {status} {REASONS[status]}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(payload)}",
+                f"Connection: {'close' if close else 'keep-alive'}"]
+        if status == 429:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+        await writer.drain()
+    
+    def route(self, method: str, path: str, body: bytes) -> Tuple[int, bytes, Optional[Tuple[str, int, str, bool]]]:
+        # The response, or the job to compile for a valid /compile request.
+        if path == '/stats':
+            if method != 'GET':
+                return 405, error_body(f"Method {method} not allowed"), None
+            stats = {'compile_cache': self.compile_cache.stats(), 'pool': self.pool.snapshot()}
+            return 200, json.dumps(stats).encode(), None
+        if path != '/compile':
+            return 404, error_body(f"Not found: {path}"), None
+        if method != 'POST':
+            return 405, error_body(f"Method {method} not allowed"), None
+        
+        try:
+            data = json.loads(body)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            source_code = data.get('code', '')
+            opt_level = int(data.get('optimize') or 0)
+            target = data.get('target') or 'cpp'
+            if not isinstance(source_code, str):
+                raise ValueError("'code' must be a string")
+            if not isinstance(target, str):
+                raise ValueError("'target' must be a string")
+        except Exception as e:
+            return 400, error_body(f'Error: {str(e)}'), None
+        if not source_code.strip():
+            return 200, error_body('No code provided'), None
+        if target not in COMPILE_TARGETS:
+            message = f"Unknown target '{target}' (expected one of: {', '.join(COMPILE_TARGETS)})"
+            return 200, error_body(message), None
+        return 200, b'', (source_code, opt_level, target, bool(data.get('profile')))
+    
+    async def compile(self, job: Tuple[str, int, str, bool],
+                      reader: asyncio.StreamReader) -> Tuple[Optional[int], bytes, bytes]:
+        # Returns the status, the body and any bytes of the client's next
+        # request read meanwhile; a status of None means the client has
+        # closed the connection and the compile was cancelled.
+        # Profiled compiles are always run, and their timings never cached.
+        source_code, opt_level, target, profile = job
+        key = (opt_level, target, hashlib.sha256(source_code.encode()).hexdigest())
+        payload = None if profile else self.compile_cache.get(key)
+        if payload is not None:
+            return 200, payload, b''
+        
+        # Watch the connection while the compile runs: end of stream means
+        # the client gave up, and anything else starts its next request.
+        compile_task = asyncio.ensure_future(self.pool.compile(job))
+        watch = asyncio.ensure_future(reader.read(1))
+        await asyncio.wait([compile_task, watch], return_when=asyncio.FIRST_COMPLETED)
+        if watch.done() and (watch.exception() is not None or not watch.result()):
+            compile_task.cancel()
+            compile_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            return None, b'', b''
+        watch.cancel()
+        
+        try:
+            payload = await compile_task
+            status = 200
+            if not profile:
+                self.compile_cache.put(key, payload)
+        except QueueFull:
+            status, payload = 429, error_body("Server busy: the compile queue is full, try again later")
+        except TimeoutError:
+            status, payload = 504, error_body(f"Error: compilation timed out after {self.pool.timeout:g} s")
+        except WorkerExited as e:
+            status, payload = 500, error_body(f"Error: {e}")
+        
+        await asyncio.wait([watch])
+        pending = b'' if watch.cancelled() or watch.exception() is not None else watch.result()
+        return status, payload, pending
+
+async def serve_http(host: str, port: int, workers: int, queue_size: int, timeout: float,
+                     cache_size: int = 512, max_body: int = 16 << 20, ready=None):
+    # Runs until cancelled. ready, if given, is called with the bound
+    # address once the service accepts connections.
+    pool = CompilePool(workers, queue_size, timeout)
+    service = CompileService(pool, cache_size, max_body)
+    try:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        async with server:
+            if ready is not None:
+                ready(server.sockets[0].getsockname())
+            await server.serve_forever()
+    finally:
+        pool.close()
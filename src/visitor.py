@@ -0,0 +1,47 @@
+import re
+from typing import Callable, Dict
+
+def snake_case(name: str) -> str:
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])', '_', name).lower()
+
+class DispatchTable(dict):
+    # Maps node class -> handler. A class is resolved the first time it is
+    # seen, by looking for `<prefix><snake_case name>` along its MRO, so a
+    # dispatch is one dict lookup no matter how many node types exist.
+    def __init__(self, visitor_class: type, prefix: str):
+        super().__init__()
+        self.visitor_class = visitor_class
+        self.prefix = prefix
+    
+    def __missing__(self, node_class: type) -> Callable:
+        for klass in node_class.__mro__:
+            handler = getattr(self.visitor_class, self.prefix + snake_case(klass.__name__), None)
+            if handler is not None:
+                break
+        else:
+            handler = self.visitor_class.generic_visit
+        self[node_class] = handler
+        return handler
+
+class NodeVisitor:
+    dispatch_tables: Dict[str, DispatchTable] = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch_tables = {}
+    
+    @classmethod
+    def dispatch_table(cls, prefix: str) -> DispatchTable:
+        table = cls.dispatch_tables.get(prefix)
+        if table is None:
+            table = cls.dispatch_tables[prefix] = DispatchTable(cls, prefix)
+        return table
+    
+    def dispatch(self, node, prefix: str = 'visit_'):
+        return self.dispatch_table(prefix)[node.__class__](self, node)
+    
+    def visit(self, node):
+        return self.dispatch(node, 'visit_')
+    
+    def generic_visit(self, node):
+        return None
@@ -0,0 +1,147 @@
+import sys
+from typing import Optional, TextIO
+from src.bytecode import *
+from src.interpreter import (INT_MIN, INT_MAX, IterationLimitExceeded, divide_double, divide_int,
+                             double_to_int, format_double, modulo_int, wrap_int)
+
+class VM:
+    # Executes Bytecode. The dispatch loop keeps everything it touches in
+    # locals and tests the most frequent opcodes first; values are plain
+    # Python objects whose types the compiler has already checked. Each
+    # backward jump counts one iteration against max_iterations.
+    def __init__(self, output: Optional[TextIO] = None, max_iterations: Optional[int] = None,
+                 count_instructions: bool = False):
+        self.output = output or sys.stdout
+        self.max_iterations = max_iterations
+        self.count_instructions = count_instructions
+        self.instructions = 0
+    
+    def run(self, bytecode: Bytecode) -> int:
+        words = bytecode.code.tolist()
+        code = [tuple(words[index:index + 4]) for index in range(0, len(words), 4)]
+        if self.count_instructions:
+            code = CountingCode(code)
+            try:
+                return self.execute(code, bytecode)
+            finally:
+                self.instructions = code.fetches
+        return self.execute(code, bytecode)
+    
+    def execute(self, code: list, bytecode: Bytecode) -> int:
+        registers = [None] * (bytecode.variable_count + bytecode.temporary_count) + list(bytecode.constants)
+        write = self.output.write
+        limited = self.max_iterations is not None
+        budget = self.max_iterations or 0
+        pc = 0
+        while True:
+            op, a, b, c = code[pc]
+            pc += 1
+            if op == BRANCH_IF_NOT_LT:
+                if not registers[a] < registers[b]:
+                    pc = c
+            elif op == ADD_INT:
+                value = registers[b] + registers[c]
+                registers[a] = value if INT_MIN <= value <= INT_MAX else wrap_int(value)
+            elif op == LOOP:
+                if limited:
+                    budget -= 1
+                    if budget < 0:
+                        raise IterationLimitExceeded(f"iteration limit of {self.max_iterations} exceeded")
+                pc = a
+            elif op == MOVE:
+                registers[a] = registers[b]
+            elif op == MUL_INT:
+                value = registers[b] * registers[c]
+                registers[a] = value if INT_MIN <= value <= INT_MAX else wrap_int(value)
+            elif op == SUB_INT:
+                value = registers[b] - registers[c]
+                registers[a] = value if INT_MIN <= value <= INT_MAX else wrap_int(value)
+            elif op == MOD_INT:
+                registers[a] = modulo_int(registers[b], registers[c])
+            elif op == DIV_INT:
+                registers[a] = divide_int(registers[b], registers[c])
+            elif op == BRANCH_IF_NOT_EQ:
+                if not registers[a] == registers[b]:
+                    pc = c
+            elif op == BRANCH_IF_NOT_NE:
+                if not registers[a] != registers[b]:
+                    pc = c
+            elif op == BRANCH_IF_NOT_GT:
+                if not registers[a] > registers[b]:
+                    pc = c
+            elif op == BRANCH_IF_NOT_LE:
+                if not registers[a] <= registers[b]:
+                    pc = c
+            elif op == BRANCH_IF_NOT_GE:
+                if not registers[a] >= registers[b]:
+                    pc = c
+            elif op == JUMP_IF_FALSE:
+                if not registers[a]:
+                    pc = b
+            elif op == JUMP_IF_TRUE:
+                if registers[a]:
+                    pc = b
+            elif op == JUMP:
+                pc = a
+            elif op == ADD:
+                registers[a] = registers[b] + registers[c]
+            elif op == SUB:
+                registers[a] = registers[b] - registers[c]
+            elif op == MUL:
+                registers[a] = registers[b] * registers[c]
+            elif op == DIV_DOUBLE:
+                registers[a] = divide_double(registers[b], registers[c])
+            elif op == LT:
+                registers[a] = registers[b] < registers[c]
+            elif op == EQ:
+                registers[a] = registers[b] == registers[c]
+            elif op == NE:
+                registers[a] = registers[b] != registers[c]
+            elif op == GT:
+                registers[a] = registers[b] > registers[c]
+            elif op == LE:
+                registers[a] = registers[b] <= registers[c]
+            elif op == GE:
+                registers[a] = registers[b] >= registers[c]
+            elif op == NOT:
+                registers[a] = not registers[b]
+            elif op == NEGATE_INT:
+                value = -registers[b]
+                registers[a] = value if value <= INT_MAX else INT_MIN
+            elif op == NEGATE:
+                registers[a] = -registers[b]
+            elif op == BOOL_TO_INT:
+                registers[a] = int(registers[b])
+            elif op == DOUBLE_TO_INT:
+                registers[a] = double_to_int(registers[b])
+            elif op == TO_DOUBLE:
+                registers[a] = float(registers[b])
+            elif op == TO_BOOL:
+                registers[a] = registers[b] != 0
+            elif op == PRINT_INT:
+                write(f"{registers[a]}\n")
+            elif op == PRINT_STRING:
+                write(registers[a] + "\n")
+            elif op == PRINT_DOUBLE:
+                write(format_double(registers[a]) + "\n")
+            elif op == PRINT_BOOL:
+                write("1\n" if registers[a] else "0\n")
+            elif op == RETURN:
+                return registers[a]
+            elif op == HALT:
+                return 0
+            else:
+                raise ValueError(f"unknown opcode {op}")
+
+class CountingCode(list):
+    # Counts instruction fetches, so the dispatch loop itself needs no
+    # counter when counting is off.
+    fetches = 0
+    
+    def __getitem__(self, index):
+        self.fetches += 1
+        return list.__getitem__(self, index)
+
+def run_bytecode(bytecode: Bytecode, output: Optional[TextIO] = None,
+                 max_iterations: Optional[int] = None) -> int:
+    return VM(output, max_iterations).run(bytecode)
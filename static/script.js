@@ -46,45 +46,111 @@ function loadExample(name) {
     }
 }
 
+// Incremental compile session: after the first request only the changed
+// range of the buffer is sent. `text` is the buffer as the server has it.
+let session = null;
+let compiling = false;
+let recompile = false;
+let debounceTimer = null;
+
+function diffEdit(before, after) {
+    // One {start, end, text} edit covering everything between the common
+    // prefix and the common suffix of the two buffers.
+    let start = 0;
+    const limit = Math.min(before.length, after.length);
+    while (start < limit && before[start] === after[start]) {
+        start++;
+    }
+    let suffix = 0;
+    while (suffix < limit - start &&
+           before[before.length - 1 - suffix] === after[after.length - 1 - suffix]) {
+        suffix++;
+    }
+    return { start, end: before.length - suffix, text: after.substring(start, after.length - suffix) };
+}
+
+async function postJSON(url, body) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(body)
+    });
+    return response.json();
+}
+
+async function requestCompile(code, optimize) {
+    // The server counts offsets in code points and JavaScript in UTF-16
+    // units; they only differ for astral characters, which get a fresh
+    // session instead of an edit.
+    if (session && !/[\uD800-\uDFFF]/.test(code + session.text)) {
+        const edits = code === session.text ? [] : [diffEdit(session.text, code)];
+        const result = await postJSON(`/session/${session.id}`, { version: session.version, edits, optimize });
+        if (!result.resync) {
+            session.text = code;
+            session.version = result.version;
+            return result;
+        }
+    }
+    
+    const result = await postJSON('/session', { code, optimize });
+    session = result.session_id ? { id: result.session_id, version: result.version, text: code } : null;
+    return result;
+}
+
 async function compileCode() {
+    // Requests are sent one at a time; edits made meanwhile go out together
+    // once the current request completes.
+    if (compiling) {
+        recompile = true;
+        return;
+    }
+    
     const code = document.getElementById('voltscript-code').value;
+    const optimize = document.getElementById('optimize-toggle').checked;
     const outputElement = document.getElementById('cpp-output');
     const errorElement = document.getElementById('error-message');
     const compileBtn = document.getElementById('compile-btn');
     
-    errorElement.classList.add('hidden');
+    compiling = true;
     compileBtn.disabled = true;
     compileBtn.textContent = 'Compiling...';
     
     try {
-        const response = await fetch('/compile', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ code })
-        });
-        
-        const result = await response.json();
+        const result = await requestCompile(code, optimize);
         
         if (result.success) {
             outputElement.textContent = result.cpp_code;
             errorElement.classList.add('hidden');
         } else {
-            errorElement.textContent = result.error;
+            errorElement.textContent = result.errors && result.errors.length > 1
+                ? result.errors.map(e => `Line ${e.line}, column ${e.column}: ${e.message}`).join('\n')
+                : result.error;
             errorElement.classList.remove('hidden');
             outputElement.textContent = '// Compilation failed. See error above.';
         }
     } catch (error) {
+        session = null;
         errorElement.textContent = 'Error: Failed to connect to compiler';
         errorElement.classList.remove('hidden');
         outputElement.textContent = '// Compilation failed';
     } finally {
+        compiling = false;
         compileBtn.disabled = false;
         compileBtn.textContent = 'Compile →';
+        if (recompile) {
+            recompile = false;
+            compileCode();
+        }
     }
 }
 
+document.getElementById('voltscript-code').addEventListener('input', () => {
+    clearTimeout(debounceTimer);
+    debounceTimer = setTimeout(compileCode, 150);
+});
+
 document.getElementById('voltscript-code').addEventListener('keydown', (e) => {
     if (e.key === 'Tab') {
         e.preventDefault();
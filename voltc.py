@@ -2,42 +2,233 @@
 
 import sys
 import os
-from src.lexer import Lexer
-from src.parser import Parser
-from src.codegen import CodeGenerator
+import argparse
+import signal
+import time
+from functools import partial
+from src.cache import CompileCache
+from src.daemon import create_server, default_socket_path, request_compile, serve
+from src.jobs import TARGET_EXTENSIONS, expand_inputs
 
-def compile_volt(input_file: str, output_file: str = None):
+# The compiler itself (src.driver) is imported only when compiling in-process,
+# so a client whose files are compiled by the daemon never loads it.
+
+def compile_volt(input_file: str, output_file: str = None, cache: CompileCache = None,
+                 socket_path: str = None, opt_level: int = 0, target: str = 'cpp', profile: str = None,
+                 all_errors: bool = False, use_mmap: bool = False):
+    start = time.perf_counter()
+    results = request_compile(socket_path, [(input_file, output_file)], cache, opt_level, target, use_mmap=use_mmap)
+    if results is None:
+        from src.driver import compile_file
+        result = compile_file(input_file, output_file, cache, opt_level, target, profile, use_mmap)
+        latency = None
+    else:
+        result, _ = next(results)
+        results.close()
+        latency = (time.perf_counter() - start) * 1000
+    
+    if not result.ok:
+        print(error_message(result, all_errors))
+        if result.profile:
+            print(profile_summary([result.profile]))
+        sys.exit(1)
+    
+    print(success_message(result, latency))
+    if result.profile:
+        print(profile_summary([result.profile]))
+
+def error_message(result, all_errors: bool = False, prefix: str = '') -> str:
+    # With all_errors, a syntax error is reported as every syntax error in
+    # the file, one file:line:column line each, found by a recovering parse.
+    if not all_errors or not result.error.startswith('Syntax Error'):
+        return prefix + result.error
+    from src.parser import diagnose
+    with open(result.input_file) as f:
+        diagnostics = diagnose(f.read())
+    lines = [f"{result.input_file}:{diagnostic}" for diagnostic in diagnostics]
+    lines.append(f"{len(diagnostics)} syntax error{'' if len(diagnostics) == 1 else 's'} in {result.input_file}")
+    return "\n".join(lines)
+
+def profile_summary(reports: list) -> str:
+    from src.profiling import format_report, merge_reports
+    if len(reports) == 1:
+        return f"Profile of {reports[0]['name']}:\n" + format_report(reports[0])
+    return f"Profile of {len(reports)} files (times summed, peaks the largest):\n" + format_report(merge_reports(reports))
+
+def success_message(result, latency: float = None) -> str:
+    message = f"Successfully compiled '{result.input_file}' to '{result.output_file}'"
+    if result.cache_hit:
+        message += " (cached)"
+    if latency is not None:
+        message += f" [daemon, {latency:.1f} ms]"
+    if result.optimizer_stats:
+        message += "\n  " + optimizer_summary(result.optimizer_stats)
+    return message
+
+def optimizer_summary(stats: dict) -> str:
+    summary = (f"Optimizer removed {stats['nodes']} nodes: {stats['declarations']} declarations, "
+               f"{stats['stores']} dead stores, {stats['unreachable']} unreachable and "
+               f"{stats['statements']} empty statements")
+    if 'hoisted' in stats:
+        summary += (f"; hoisted {stats['hoisted']} loop-invariant expressions and reduced "
+                    f"{stats['strength_reduced']} multiplications to additions")
+    return summary
+
+def run_server(socket_path: str):
+    try:
+        server = create_server(socket_path)
+    except (RuntimeError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    # Stop cleanly (removing the socket) on SIGTERM as well as Ctrl+C.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"voltc daemon listening on {socket_path} (Ctrl+C to stop)")
+    try:
+        serve(server)
+    except KeyboardInterrupt:
+        pass
+
+def run_volt(input_file: str, opt_level: int = 0, max_iterations: int = None, engine: str = 'interpreter'):
+    # Runs the program in-process: .voltc files and --vm on the bytecode VM,
+    # --python as a compiled Python function, anything else with the
+    # interpreter. The exit status is the program's own, as it would be for
+    # the compiled binary.
+    from src.bytecode import Bytecode, compile_bytecode
+    from src.driver import parse_file
+    from src.interpreter import CompileError, Interpreter, VoltRuntimeError
+    from src.optimizer import optimize_program
+    from src.pycodegen import compile_python, run_code
+    from src.vm import VM
     if not os.path.exists(input_file):
         print(f"Error: File '{input_file}' not found")
         sys.exit(1)
     
-    with open(input_file, 'r') as f:
-        source_code = f.read()
-    
     try:
-        lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
-        
-        parser = Parser(tokens)
-        ast = parser.parse()
-        
-        codegen = CodeGenerator()
-        cpp_code = codegen.generate(ast)
-        
-        if output_file is None:
-            output_file = input_file.replace('.volt', '.cpp')
-        
-        with open(output_file, 'w') as f:
-            f.write(cpp_code)
-        
-        print(f"Successfully compiled '{input_file}' to '{output_file}'")
-        
+        if input_file.endswith(TARGET_EXTENSIONS['bytecode']):
+            run = partial(VM(sys.stdout, max_iterations).run, Bytecode.load(input_file))
+        elif engine == 'vm':
+            program = optimize_program(parse_file(input_file), opt_level)
+            run = partial(VM(sys.stdout, max_iterations).run, compile_bytecode(program))
+        elif engine == 'python':
+            program = optimize_program(parse_file(input_file), opt_level)
+            run = partial(run_code, compile_python(program, max_iterations), sys.stdout)
+        else:
+            program = optimize_program(parse_file(input_file), opt_level)
+            run = Interpreter(sys.stdout, max_iterations).compile(program)
+    except ValueError as e:
+        print(f"Error: {input_file}: {e}")
+        sys.exit(1)
     except SyntaxError as e:
         print(f"Syntax Error: {e}")
         sys.exit(1)
-    except Exception as e:
+    except (CompileError, RecursionError) as e:
         print(f"Error: {e}")
         sys.exit(1)
+    
+    try:
+        status = run()
+    except (VoltRuntimeError, RecursionError) as e:
+        sys.stdout.flush()
+        print(f"Runtime Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(status)
+
+def build_run_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='voltc.py run',
+        description="Run a VoltScript program without a C++ toolchain",
+    )
+    parser.add_argument('input', help=".volt source or .voltc bytecode file to run")
+    parser.add_argument('-O0', dest='opt_level', action='store_const', const=0, default=0,
+                        help="do not optimize (default)")
+    parser.add_argument('-O', '-O1', dest='opt_level', action='store_const', const=1, help="optimize as voltc -O1")
+    parser.add_argument('-O2', dest='opt_level', action='store_const', const=2, help="optimize as voltc -O2")
+    parser.add_argument('-O3', dest='opt_level', action='store_const', const=3, help="optimize as voltc -O3")
+    parser.add_argument('--vm', dest='engine', action='store_const', const='vm', default='interpreter',
+                        help="compile to bytecode and run it on the VM")
+    parser.add_argument('--python', dest='engine', action='store_const', const='python',
+                        help="translate to Python and run the compiled code")
+    parser.add_argument('--max-iterations', type=int, metavar='N',
+                        help="stop with an error after N loop iterations (default: no limit)")
+    return parser
+
+def run_http_service(args):
+    import asyncio
+    from src.service import serve_http
+    def ready(address):
+        print(f"voltc compile service listening on http://{address[0]}:{address[1]} "
+              f"({args.workers} workers, queue {args.queue}, timeout {args.timeout:g} s; Ctrl+C to stop)", flush=True)
+    
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        asyncio.run(serve_http(args.host, args.port, args.workers, args.queue, args.timeout,
+                               max_body=args.max_body * 1024 * 1024, ready=ready))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='voltc.py serve',
+        description="Serve the /compile API over HTTP from an asyncio event loop and a pool of compile processes",
+    )
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="port to listen on, 0 for any free port (default: 8000)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="compile worker processes (default: CPU count)")
+    parser.add_argument('--queue', type=int, default=64, metavar='N',
+                        help="requests that may wait for a worker before the rest get 429 (default: 64)")
+    parser.add_argument('--timeout', type=float, default=10.0, metavar='SECONDS',
+                        help="per-request limit on waiting plus compiling, answered with 504 (default: 10)")
+    parser.add_argument('--max-body', type=int, default=16, metavar='MB',
+                        help="largest request body accepted, answered with 413 (default: 16)")
+    return parser
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='voltc.py',
+        description="VoltScript Compiler",
+        usage="python voltc.py <input.volt> [output.cpp]\n"
+              "       python voltc.py [-O] [--target cpp|bytecode|python] [--timings | --profile] [--all-errors] [--mmap] [-j N] <file | directory | glob> ...\n"
+              "       python voltc.py --server [--socket PATH]\n"
+              "       python voltc.py run [-O] [--vm | --python] <input.volt | input.voltc>\n"
+              "       python voltc.py serve [--port PORT] [--workers N] [--queue N] [--timeout SECONDS]",
+    )
+    parser.add_argument('inputs', nargs='*', help=".volt files, directories or glob patterns")
+    parser.add_argument('-o', '--output', help="output file (single input only)")
+    parser.add_argument('--target', choices=sorted(TARGET_EXTENSIONS), default='cpp',
+                        help="generate C++ source (default), .voltc bytecode for voltc.py run, or a Python script")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('-O0', dest='opt_level', action='store_const', const=0, default=0,
+                        help="do not optimize (default)")
+    parser.add_argument('-O', '-O1', dest='opt_level', action='store_const', const=1,
+                        help="fold constants and remove constant branches before generating C++")
+    parser.add_argument('-O2', dest='opt_level', action='store_const', const=2,
+                        help="-O1, and remove unreachable code, dead stores and unused variables")
+    parser.add_argument('-O3', dest='opt_level', action='store_const', const=3,
+                        help="-O2, and hoist loop-invariant expressions and strength-reduce induction variables")
+    parser.add_argument('--no-cache', action='store_true', help="always recompile, bypassing the output cache")
+    parser.add_argument('--cache-dir', help="cache directory (default: $VOLTC_CACHE_DIR, then $XDG_CACHE_HOME/voltc, then ~/.cache/voltc)")
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help="evict least recently used entries beyond this size (default: 256)")
+    parser.add_argument('--server', action='store_true',
+                        help="run as a daemon that keeps the compiler loaded and serves other voltc runs")
+    parser.add_argument('--socket', help="daemon socket path (default: $VOLTC_SOCKET or $XDG_RUNTIME_DIR/voltc-UID.sock)")
+    parser.add_argument('--no-server', action='store_true', help="compile in this process even if a daemon is running")
+    parser.add_argument('--timings', dest='profile', action='store_const', const='timings',
+                        help="report the time, token and AST node counts and output size of each phase "
+                             "(compiles in-process, bypassing the cache)")
+    parser.add_argument('--profile', dest='profile', action='store_const', const='memory',
+                        help="--timings, and trace the peak allocation of each phase with tracemalloc (slower)")
+    parser.add_argument('--all-errors', action='store_true',
+                        help="report every syntax error in a file that fails to parse, not just the first")
+    parser.add_argument('--mmap', action='store_true',
+                        help="lex ASCII input files in place from a memory mapping instead of reading them as text")
+    return parser
 
 def main():
     if len(sys.argv) < 2:
@@ -45,10 +236,86 @@ def main():
         print("Usage: python voltc.py <input.volt> [output.cpp]")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    if sys.argv[1] == 'run':
+        args = build_run_parser().parse_args(sys.argv[2:])
+        run_volt(args.input, args.opt_level, args.max_iterations, args.engine)
+        return
+    if sys.argv[1] == 'serve':
+        run_http_service(build_serve_parser().parse_args(sys.argv[2:]))
+        return
     
-    compile_volt(input_file, output_file)
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args()
+    socket_path = args.socket or default_socket_path()
+    if args.server:
+        run_server(socket_path)
+        return
+    if not args.inputs:
+        arg_parser.error("the following arguments are required: inputs")
+    if args.no_server or args.profile:
+        socket_path = None
+    
+    # Keep the original two-argument form: voltc.py input.volt output.cpp
+    if args.output is None and len(args.inputs) == 2 and args.inputs[1].endswith(TARGET_EXTENSIONS[args.target]):
+        args.output = args.inputs.pop()
+    
+    cache = None
+    if not args.no_cache and not args.profile:
+        cache = CompileCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    
+    input_files = expand_inputs(args.inputs)
+    if len(input_files) == 1:
+        compile_volt(input_files[0], args.output, cache, socket_path, args.opt_level, args.target, args.profile,
+                     args.all_errors, args.mmap)
+        return
+    
+    if args.output is not None:
+        print("Error: -o/--output can only be used with a single input file")
+        sys.exit(1)
+    
+    # A running daemon compiles the batch across its own worker processes and
+    # reports how long each file took; otherwise the files are compiled here
+    # across worker processes.
+    start = time.perf_counter()
+    results = request_compile(socket_path, [(input_file, None) for input_file in input_files], cache,
+                              args.opt_level, args.target, use_mmap=args.mmap, jobs=args.jobs)
+    if results is None:
+        from src.driver import compile_many
+        results = ((result, None) for result in compile_many(input_files, args.jobs, cache, args.opt_level,
+                                                             args.target, args.profile, args.mmap))
+    
+    failures = []
+    hits = misses = 0
+    removed = {}
+    reports = []
+    for result, latency in results:
+        if result.profile:
+            reports.append(result.profile)
+        if result.ok:
+            print(success_message(result, latency))
+        else:
+            print(error_message(result, args.all_errors, f"{result.input_file}: "))
+            failures.append(result)
+        for name, count in (result.optimizer_stats or {}).items():
+            removed[name] = removed.get(name, 0) + count
+        if result.cache_hit:
+            hits += 1
+        elif result.cache_hit is False:
+            misses += 1
+    
+    print(f"\nCompiled {len(input_files) - len(failures)} of {len(input_files)} files "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if cache is not None:
+        print(f"Cache: {hits} hits, {misses} misses")
+    if removed:
+        print(optimizer_summary(removed))
+    if reports:
+        print(profile_summary(reports))
+    if failures:
+        print(f"{len(failures)} failed:")
+        for result in failures:
+            print(f"  {result.input_file}: {result.error}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()